@@ -0,0 +1,250 @@
+import argparse
+import collections
+import contextlib
+import glob
+import os
+import sys
+import tempfile
+import time
+
+# No tkinter or PIL here, this runs on headless CI runners
+from capture_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, CaptureCache
+from coverage_pipeline import coverage_succeeded, run_coverage
+from coverage_store import CoverageStore
+from gtest_report import GTestReportGenerator
+from live_log import IDLE_TIMEOUT, LiveLog, is_socket_source, socket_address
+from log_index import LogDump
+from path_resolver import load_resolver
+from progress import Progress, console_printer
+from test_impact import IMPACT_NAME, build_test_map, save_test_map
+from timing import TRACE_NAME, Timings, timed
+from worker_pool import default_jobs, map_ordered
+
+
+# One log's work for process_log.  reports_dir is the log's own root,
+# <output>/<log name>.  With follow (an idle timeout), the log is read
+# while it is written, until stop_at_end finds the end of a dump if set.
+# With dump, only that dump of the log is captured.  With test_map, the
+# per-test dumps are mapped to the tests they follow.  path_map is the
+# PathResolver config of the build tree, if any, and cache the
+# CaptureCache shared by all jobs (None without one).  workers is the
+# number of processes this log may use for its own stages.  With
+# store_path, the coverage is kept there as run_name.
+LogJob = collections.namedtuple('LogJob', [
+    'log_path', 'reports_dir', 'coverage', 'tests', 'show_progress', 'record_timings', 'follow', 'stop_at_end',
+    'store_path', 'run_name', 'replace_run', 'durations_baseline', 'dump', 'test_map', 'path_map', 'cache',
+    'workers'])
+
+
+def expand_logs(patterns):
+    # Log files named on the command line, with globs expanded here so that
+    # quoted patterns work on every shell.  Keeps the order, drops repeats.
+    logs = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for log_path in matches:
+            if log_path not in logs:
+                logs.append(log_path)
+    return logs
+
+
+def _name_parts(log_path):
+    # Directory names and stem of a log, tcp://host:port as host_port
+    if is_socket_source(log_path):
+        host, port = socket_address(log_path)
+        return [f"{host}_{port}"]
+    directories, file_name = os.path.split(os.path.abspath(log_path))
+    return [part for part in directories.replace('\\', '/').split('/') if part and not part.endswith(':')] + \
+        [os.path.splitext(file_name)[0]]
+
+
+def report_roots(logs):
+    # The directory under the output that each log writes its reports to:
+    # the log's name, with as many of its parent directories as it takes
+    # to tell logs of the same name apart (board1/log.txt and
+    # board2/log.txt -> board1_log and board2_log)
+    parts = {log_path: _name_parts(log_path) for log_path in logs}
+    depths = dict.fromkeys(logs, 1)
+    while True:
+        roots = {log_path: '_'.join(parts[log_path][-depth:]) for log_path, depth in depths.items()}
+        sharing = collections.defaultdict(list)
+        for log_path, root in roots.items():
+            sharing[root].append(log_path)
+        clashes = [log_path for group in sharing.values() if len(group) > 1 for log_path in group]
+        if not clashes:
+            return roots
+        longer = [log_path for log_path in clashes if depths[log_path] < len(parts[log_path])]
+        if not longer:
+            # The same file under two spellings, it is reported twice
+            for index, log_path in enumerate(clashes):
+                roots[log_path] = f"{parts[log_path][-1]}_{index}"
+            return roots
+        for log_path in longer:
+            depths[log_path] += 1
+
+
+def run_name(log_path, root, follow=False):
+    # Name of a log's run in the store: its report root and when the log
+    # was written, so board1/log.txt and board2/log.txt, or last night's
+    # log.txt and tonight's, are kept apart.  A followed log is still being
+    # written, it is named after the start of the report.
+    written = time.time() if follow or is_socket_source(log_path) else os.path.getmtime(log_path)
+    return f"{root}@{time.strftime('%Y%m%d-%H%M%S', time.localtime(written))}"
+
+
+def process_log(job):
+    # Runs in a worker: the coverage and/or test report of one LogJob,
+    # all written below job.reports_dir.  Returns (log path, output lines,
+    # success).
+    progress = Progress()
+    if job.show_progress:
+        progress.subscribe(console_printer(f"{os.path.basename(job.log_path)}: "))
+    timings = Timings() if job.record_timings else None
+    module_names = []
+    output = []
+    success = True
+
+    try:
+        log_source = test_log = job.log_path
+        if job.follow is not None:
+            log_source = LiveLog(job.log_path, idle_timeout=job.follow, stop_at_end=job.stop_at_end)
+            if is_socket_source(job.log_path):
+                # What the socket sends is saved for the test report
+                os.makedirs(job.reports_dir, exist_ok=True)
+                log_source.copy_to = test_log = os.path.join(job.reports_dir, f"{log_source.name}.txt")
+                output.append(f"Log saved to {test_log}")
+            if not job.coverage:
+                log_source.drain()
+        elif job.dump is not None:
+            log_source = LogDump(job.log_path, job.dump)
+
+        if job.coverage:
+            resolver = load_resolver(job.path_map)
+            # Tracefiles go to a private directory, other jobs may capture
+            # the same objects at the same time
+            with tempfile.TemporaryDirectory() as info_dir, \
+                    (CoverageStore(job.store_path) if job.store_path else contextlib.nullcontext()) as store:
+                application_name, messages = run_coverage(log_source, job.reports_dir, job.workers,
+                                                          info_dir=info_dir, progress=progress, timings=timings,
+                                                          store=store, run_name=job.run_name, resolver=resolver,
+                                                          cache=job.cache, replace_run=job.replace_run)
+            output.extend(messages)
+            if not coverage_succeeded(application_name, messages):
+                success = False
+            if application_name is not None:
+                module_names.append(application_name)
+
+            if job.test_map and application_name is not None:
+                with timed(timings, 'impact'):
+                    impact, messages = build_test_map(test_log, job.workers, progress=progress, resolver=resolver)
+                output.extend(messages)
+                impact_path = save_test_map(os.path.join(job.reports_dir, application_name, IMPACT_NAME), impact)
+                output.append(f"Test map: {len(impact['tests'])} tests, {len(impact['suites'])} suites in {impact_path}")
+
+        if job.tests:
+            generator = GTestReportGenerator(job.reports_dir, job.workers)
+            module_name, (suites, passed, failed), regressions = generator.handle_testreport(
+                test_log, progress=progress, timings=timings, baseline_path=job.durations_baseline)
+            if module_name is None:
+                output.append("No module name found in the test output")
+                success = False
+            else:
+                module_names.append(module_name)
+                output.append(f"Test report: {suites} suites, {passed} passed, {failed} failed")
+                for test_suite, duration_ms, before in regressions:
+                    output.append(f"Slower: {test_suite} took {duration_ms} ms, was {before} ms")
+    except Exception as e:
+        output.append(f"ERROR: {e}")
+        success = False
+
+    if timings is not None:
+        output.extend(timings.lines())
+        if module_names:
+            # Next to the reports, under the module of the first one written
+            trace_path = os.path.join(job.reports_dir, module_names[0], TRACE_NAME)
+            output.append(f"Timings: {timings.write_trace(trace_path)}")
+
+    return job.log_path, output, success
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate coverage and test reports for many logs without the GUI")
+    parser.add_argument('logs', nargs='+', help="log files or glob patterns (e.g. 'logs/*.txt')")
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs(),
+                        help="worker processes, shared among the logs (default: one per CPU)")
+    parser.add_argument('-o', '--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Reports'),
+                        help="directory that receives <log>/<module>/CoverageReport and <log>/<module>/TestReport, "
+                             "<log> being the log's name")
+    parser.add_argument('--no-coverage', action='store_true', help="skip the coverage reports")
+    parser.add_argument('--no-tests', action='store_true', help="skip the test reports")
+    parser.add_argument('--progress', action='store_true', help="print the progress of every stage to stderr")
+    parser.add_argument('--follow', action='store_true',
+                        help="read each log while it is being written; a log can also be tcp://host:port "
+                             "(e.g. the J-Link RTT telnet server), whose output is saved to <output>/<host>_<port>/<host>_<port>.txt")
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                        help=f"with --follow, seconds without new data that end a log (default: {IDLE_TIMEOUT:g})")
+    parser.add_argument('--stop-at-end', action='store_true',
+                        help="with --follow, stop reading at the first 'Gcov End' instead of waiting for the idle "
+                             "timeout, for targets that dump once and print nothing useful after it")
+    parser.add_argument('--dump', type=int, metavar='N',
+                        help="only capture dump N (from 0) of logs that hold several, through the index "
+                             "log_index.py keeps next to the log")
+    parser.add_argument('--test-map', action='store_true',
+                        help=f"map every test to the lines it runs, for logs with a coverage dump after each test, "
+                             f"into <output>/<log>/<module>/{IMPACT_NAME} (see test_impact.py)")
+    parser.add_argument('--path-map', metavar='JSON',
+                        help="map the paths the target printed onto the local build tree with this config of "
+                             "prefix rewrites and build directories (see path_resolver.py)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR,
+                        help=f"keep captured objects here and reuse them while the build and the counters are the same "
+                             f"(default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), metavar='MB',
+                        help="least recently used objects leave the cache past this size (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="capture every object")
+    parser.add_argument('--store', metavar='DB',
+                        help="also keep the coverage of each log in this SQLite file, as a run named "
+                             "<log>@<time the log was written> (see coverage_store.py)")
+    parser.add_argument('--store-replace', action='store_true',
+                        help="replace runs of the same name in the store instead of reporting them as errors")
+    parser.add_argument('--durations-baseline', metavar='JSON',
+                        help="compare the suite durations with this test_durations.json instead of the one the "
+                             "previous run left in <output>/<log>/<module>/TestReport")
+    parser.add_argument('--timings', action='store_true',
+                        help=f"time every stage and write a Chrome trace to <output>/<log>/<module>/{TRACE_NAME}")
+    args = parser.parse_args(argv)
+
+    logs = expand_logs(args.logs)
+    if not logs:
+        parser.error("no log files match")
+    if args.dump is not None and args.follow:
+        parser.error("--dump needs the whole log, it cannot be used with --follow")
+    if args.test_map and args.no_coverage:
+        parser.error("--test-map is part of the coverage step, it cannot be used with --no-coverage")
+    if args.path_map and not os.path.exists(args.path_map):
+        parser.error(f"{args.path_map} does not exist")
+
+    cache = None if args.no_cache else CaptureCache(args.cache, args.cache_size * 1024 * 1024)
+    # The CPUs left over when there are fewer logs than jobs go to the
+    # stages of each log
+    jobs = max(1, args.jobs)
+    workers = max(1, jobs // len(logs))
+    # Every log has its own root, logs of the same module never share a tree
+    roots = report_roots(logs)
+    log_jobs = [LogJob(log_path, os.path.join(args.output, roots[log_path]), not args.no_coverage, not args.no_tests,
+                       args.progress, args.timings, args.idle_timeout if args.follow else None, args.stop_at_end,
+                       args.store, run_name(log_path, roots[log_path], args.follow), args.store_replace,
+                       args.durations_baseline, args.dump, args.test_map, args.path_map, cache, workers)
+                for log_path in logs]
+    failed = 0
+    for log_path, output, success in map_ordered(process_log, log_jobs, min(jobs, len(logs))):
+        print(f"== {log_path}")
+        for line in output:
+            print(line)
+        failed += not success
+
+    print(f"{len(logs)} logs, {failed} problems")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
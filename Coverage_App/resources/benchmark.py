@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from functools import partial
+
+from capture_cache import CaptureCache
+from coverage_pipeline import capture_object, merge_info_files
+from coverage_report import write_coverage_report
+from gtest_report import GTestReportGenerator
+from log_index import scan_log
+from serial_log import iter_gcda_blocks
+from synthetic_logs import add_config_arguments, config_from_arguments, generate
+from timing import Span, peak_rss
+from worker_pool import map_ordered
+
+
+# Bumped when the layout of the results changes
+BENCHMARK_FORMAT_VERSION = 1
+
+# A stage is slower than the baseline past this share, and by more than
+# NOISE_SECONDS, which short stages easily vary by.  With one job all work
+# is done in this process and its CPU time is compared, shared CI runners
+# make the wall time vary far more.
+DEFAULT_TOLERANCE = 0.25
+NOISE_SECONDS = 0.05
+NOISE_BYTES = 1000000
+
+
+def _decode(log_path):
+    return list(iter_gcda_blocks(log_path))
+
+
+def _capture(blocks, info_dir, jobs, cache=None):
+    os.makedirs(info_dir, exist_ok=True)
+    capture = partial(capture_object, info_dir=info_dir, cache=cache)
+    return [info_path for info_path, _ in map_ordered(capture, blocks, jobs) if info_path is not None]
+
+
+def _render(coverages, report_dir):
+    # Into an empty directory, or the pages of the last repeat are reused
+    shutil.rmtree(report_dir, ignore_errors=True)
+    return write_coverage_report(coverages, report_dir)
+
+
+def _test_parse(log_path, reports_dir):
+    generator = GTestReportGenerator(reports_dir)
+    with open(log_path, 'r', errors='replace') as log_file:
+        return generator, generator.parse_gtest_output(log_file)
+
+
+def _test_render(generator, parsed, jobs):
+    shutil.rmtree(os.path.join(generator.reports_dir, generator.module_name, 'TestReport'), ignore_errors=True)
+    test_suite_data = parsed[0]
+    regressions = generator.generate_timing_reports(test_suite_data)
+    generator.generate_main_html_report(*parsed, regressions)
+    generator.generate_machine_readable_reports(*parsed)
+    generator.generate_suite_html_reports(test_suite_data, jobs)
+    return len(test_suite_data)
+
+
+def _measure(function, repeat):
+    # (result, best wall and CPU seconds of `repeat` runs, peak of the
+    # Python heap in one more run).  The heap is traced apart, tracing
+    # makes the run itself several times slower.
+    best = None
+    for _ in range(repeat):
+        span = Span('stage')
+        result = function()
+        span.finish()
+        if best is None or span.wall < best.wall:
+            best = span
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, best.wall, best.cpu, peak
+
+
+def _stage(results, name, function, repeat, items, unit, size=None):
+    # Times one stage into results['stages'].  items and size may be
+    # callables of the stage's result.  Returns the result.
+    result, wall, cpu, peak = _measure(function, repeat)
+    items = items(result) if callable(items) else items
+    stage = {'seconds': round(wall, 6), 'cpu_seconds': round(cpu, 6), 'items': items, 'unit': unit,
+             'items_per_second': round(items / wall, 1) if wall > 0 else None,
+             'peak_memory_bytes': peak}
+    if size is not None:
+        stage['bytes'] = size
+        stage['megabytes_per_second'] = round(size / wall / 1e6, 3) if wall > 0 else None
+    results['stages'][name] = stage
+    return result
+
+
+def run_benchmark(directory, config, repeat=1, jobs=1):
+    # Generates the logs in directory and times every stage of both reports
+    # on them.  Returns the results, ready for json.dump.
+    log_path, inputs = generate(directory, config)
+    results = {'version': BENCHMARK_FORMAT_VERSION,
+               'config': config.as_dict(),
+               'inputs': inputs,
+               'environment': {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                               'system': platform.system(), 'machine': platform.machine(),
+                               'cpus': os.cpu_count(), 'jobs': jobs, 'repeat': repeat},
+               'stages': {}}
+    log_bytes = inputs['log_bytes']
+
+    _stage(results, 'split', lambda: scan_log(log_path)[0], repeat, len, 'objects', log_bytes)
+    blocks = _stage(results, 'decode', lambda: _decode(log_path), repeat, len, 'objects', log_bytes)
+    info_files = _stage(results, 'capture', lambda: _capture(blocks, os.path.join(directory, 'info'), jobs),
+                        repeat, len, 'objects', inputs['gcda_bytes'])
+
+    # Filled once, then every object comes from the cache
+    cache = CaptureCache(os.path.join(directory, 'cache'))
+    _capture(blocks, os.path.join(directory, 'cached'), jobs, cache)
+    _stage(results, 'capture_cached', lambda: _capture(blocks, os.path.join(directory, 'cached'), jobs, cache),
+           repeat, len, 'objects', inputs['gcda_bytes'])
+
+    coverages = _stage(results, 'merge', lambda: merge_info_files(info_files), repeat, len(info_files), 'files')
+    report_dir = os.path.join(directory, 'Reports', config.module, 'CoverageReport')
+    _stage(results, 'render', lambda: _render(coverages, report_dir), repeat, len(coverages), 'pages')
+
+    reports_dir = os.path.join(directory, 'Reports')
+    generator, parsed = _stage(results, 'test_parse', lambda: _test_parse(log_path, reports_dir), repeat,
+                               inputs['tests'], 'tests', log_bytes)
+    _stage(results, 'test_render', lambda: _test_render(generator, parsed, jobs), repeat, len(parsed[0]), 'pages')
+
+    results['peak_rss_bytes'] = peak_rss()
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Lines naming the stages that got slower or use more memory than in
+    # the baseline
+    if baseline.get('version') != BENCHMARK_FORMAT_VERSION:
+        return [f"Baseline is a version {baseline.get('version')} result, expected {BENCHMARK_FORMAT_VERSION}"]
+    if baseline.get('config') != results['config']:
+        return ["Baseline was measured at another scale, the stages cannot be compared"]
+    key = 'cpu_seconds' if results['environment']['jobs'] == 1 == baseline['environment']['jobs'] else 'seconds'
+    problems = []
+    for name, stage in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+        if stage[key] > before[key] * (1 + tolerance) and stage[key] - before[key] > NOISE_SECONDS:
+            problems.append(f"Slower: {name} took {stage[key]:.3f} s, was {before[key]:.3f} s "
+                            f"(+{(stage[key] / before[key] - 1) * 100:.0f}%)")
+        if stage['peak_memory_bytes'] > before['peak_memory_bytes'] * (1 + tolerance) \
+                and stage['peak_memory_bytes'] - before['peak_memory_bytes'] > NOISE_BYTES:
+            problems.append(f"More memory: {name} peaked at {stage['peak_memory_bytes'] / 1e6:.1f} MB, "
+                            f"was {before['peak_memory_bytes'] / 1e6:.1f} MB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every stage of the coverage and test reports on a synthetic "
+                                                 "log and write the results as JSON")
+    add_config_arguments(parser)
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="worker processes for the capture and the test pages (default: %(default)s)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs of each stage, the fastest counts (default: %(default)s)")
+    parser.add_argument('-o', '--output', help="write the results here instead of to stdout")
+    parser.add_argument('--baseline', metavar='JSON', help="compare with these earlier results, exit 1 on a regression")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="share a stage may be slower or larger than the baseline (default: %(default)s)")
+    parser.add_argument('--keep', metavar='DIR', help="generate into DIR and keep it, instead of a temporary directory")
+    args = parser.parse_args(argv)
+
+    config = config_from_arguments(args)
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        results = run_benchmark(args.keep, config, max(1, args.repeat), max(1, args.jobs))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            results = run_benchmark(directory, config, max(1, args.repeat), max(1, args.jobs))
+
+    text = json.dumps(results, indent=1, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text)
+    else:
+        sys.stdout.write(text)
+    for name, stage in results['stages'].items():
+        rate = f", {stage['megabytes_per_second']} MB/s" if 'megabytes_per_second' in stage else ''
+        print(f"{name}: {stage['seconds']:.3f} s, {stage['items_per_second']} {stage['unit']}/s{rate}, "
+              f"{stage['peak_memory_bytes'] / 1e6:.1f} MB", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            problems = compare(results, json.load(baseline_file), args.tolerance)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
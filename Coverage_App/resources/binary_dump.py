@@ -0,0 +1,125 @@
+import mmap
+import os
+
+from gcov_format import GCOV_DATA_MAGIC
+from serial_log import GcdaBlock
+
+
+# With GCOV_OPT_OUTPUT_BINARY_FILE / GCOV_OPT_OUTPUT_BINARY_MEMORY __gcov_exit
+# writes, for every object:
+#     <path of the .gcda> NUL
+#     <byte count, 4 bytes, MSB first>
+#     <raw gcda bytes>
+# and finishes the stream with "Gcov End" NUL.  The memory variant puts the
+# same stream in RAM at gcov_output_buffer, read out over the debugger.
+BINARY_MEMORY_ADDRESS = 0x42000000
+
+END_MARKER = b'Gcov End\0'
+
+# Longest path we look for before deciding there is no record here
+MAX_PATH_LENGTH = 4096
+
+# Every payload starts with the gcda magic, in the target's byte order
+_GCOV_DATA_MAGICS = (GCOV_DATA_MAGIC.to_bytes(4, 'little'), GCOV_DATA_MAGIC.to_bytes(4, 'big'))
+
+
+def is_binary_dump(path):
+    # A binary dump starts with a NUL-terminated .gcda path (or the end
+    # marker if nothing was compiled for coverage).  Serial logs start with
+    # J-Link banner text and have line breaks long before any NUL.
+    with open(path, 'rb') as dump_file:
+        head = dump_file.read(MAX_PATH_LENGTH + 1)
+    return head.startswith(END_MARKER) or _path_at(head, 0) is not None
+
+
+def iter_binary_blocks(path, image_address=BINARY_MEMORY_ADDRESS, progress=None):
+    # Memory-maps a binary output file or RAM image and yields a GcdaBlock
+    # per object whose data is a memoryview into the mapping, so no payload
+    # is copied.  `image_address` is the target address the first byte of
+    # a RAM image was read from, when the image starts below the buffer.
+    with open(path, 'rb') as dump_file:
+        if os.fstat(dump_file.fileno()).st_size == 0:
+            return
+        # The mapping stays alive as long as a payload view refers to it
+        view = memoryview(mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    pos = BINARY_MEMORY_ADDRESS - image_address
+    found = 0
+    while 0 <= pos < len(view):
+        if progress is not None:
+            progress.update('decode', pos, len(view), 'bytes')
+        if view[pos:pos + len(END_MARKER)] == END_MARKER:
+            break
+
+        path_end = _path_at(view, pos)
+        if path_end is None:
+            # Image cut short, or not a dump at all
+            break
+        block_path = os.fsdecode(bytes(view[pos:path_end]))
+        start = path_end + 5
+
+        size = _payload_size(view, path_end + 1, start)
+        if size is None:
+            # No length fits, hand over what is left so it gets reported
+            yield GcdaBlock(block_path, _stored_size(view[path_end + 1:start]), view[start:])
+            pos = len(view)
+            break
+        found += 1
+        if progress is not None:
+            progress.update('blocks', found, None, 'blocks')
+        yield GcdaBlock(block_path, size, view[start:start + size])
+        pos = start + size
+
+    if progress is not None:
+        progress.update('decode', min(max(pos, 0), len(view)), len(view), 'bytes', final=True)
+        progress.update('blocks', found, None, 'blocks', final=True)
+
+
+def _path_at(data, pos):
+    # End of the NUL-terminated .gcda path starting at pos, or None
+    head = bytes(data[pos:pos + MAX_PATH_LENGTH + 1])
+    end = head.find(b'\0')
+    if end <= 0 or not head[:end].endswith(b'.gcda') or min(head[:end]) < 0x20:
+        return None
+    return pos + end
+
+
+def _record_at(data, pos):
+    # Whether a whole object record (path, length, gcda magic) starts at pos
+    path_end = _path_at(data, pos)
+    if path_end is None:
+        return False
+    return bytes(data[path_end + 5:path_end + 9]) in _GCOV_DATA_MAGICS
+
+
+def _stored_size(length_bytes):
+    return int.from_bytes(bytes(length_bytes), 'big') if len(length_bytes) == 4 else 0
+
+
+def _candidate_sizes(length_bytes):
+    # Existing firmware stores bytesNeeded / 255 instead of / 256 in the
+    # third byte.  The top and bottom bytes are right either way, so the
+    # size is the plain reading or one of the middle bytes the old firmware
+    # would have turned into the stored one.
+    if len(length_bytes) != 4:
+        return []
+    top, upper, middle, low = bytes(length_bytes)
+    high = (top << 24) | (upper << 16)
+    sizes = {high | (middle << 8) | low}
+    for guess in range(256):
+        size = high | (guess << 8) | low
+        if (size // 255) & 0xff == middle:
+            sizes.add(size)
+    return sorted(sizes)
+
+
+def _payload_size(view, length_pos, start):
+    # The smallest size whose payload is followed by another record or the
+    # end marker.  A larger one can only fit by swallowing whole records.
+    for size in _candidate_sizes(view[length_pos:length_pos + 4]):
+        end = start + size
+        if end > len(view):
+            break
+        if view[end:end + len(END_MARKER)] == END_MARKER or end == len(view) or _record_at(view, end):
+            return size
+    return None
@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import zlib
+
+
+# Next to the scripts, like the Reports directory
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.capture_cache')
+
+# Least recently used entries go once the cache holds more than this
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+# Bumped when the layout of an entry changes
+CACHE_FORMAT_VERSION = 1
+
+# The capture is done by these modules, a change to them changes every key
+_TOOL_MODULES = ('gcov_format.py', 'lcov_info.py')
+
+_ENTRY_SUFFIX = '.info.z'
+
+_tool_version = None
+_gcno_hashes = {}   # (path, size, mtime_ns) -> hash, per process
+
+
+def tool_version():
+    # Hash of the capture code, so that entries of an older parser are not used
+    global _tool_version
+    if _tool_version is None:
+        digest = hashlib.sha256(f"capture cache {CACHE_FORMAT_VERSION}".encode())
+        for module in _TOOL_MODULES:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module), 'rb') as module_file:
+                digest.update(module_file.read())
+        _tool_version = digest.hexdigest()
+    return _tool_version
+
+
+def _gcno_hash(gcno_path):
+    stat = os.stat(gcno_path)
+    known = (gcno_path, stat.st_size, stat.st_mtime_ns)
+    if known not in _gcno_hashes:
+        with open(gcno_path, 'rb') as gcno_file:
+            _gcno_hashes[known] = hashlib.sha256(gcno_file.read()).hexdigest()
+    return _gcno_hashes[known]
+
+
+class CaptureCache:
+    # Tracefile text of captured objects, on disk under the hash of the
+    # .gcno, the .gcda and the capture code.  Objects that come back with
+    # the same build and the same counters are not captured again.  Entries
+    # are zlib compressed; reading one touches its mtime, and trim() removes
+    # the least recently used ones past max_bytes.  Workers of several
+    # processes share a cache: entries are written to a temporary file and
+    # renamed into place.
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, block, gcno_path):
+        # Key of a block, None when it cannot be captured
+        if block.path is None or not block.is_complete() or not block.checksum_ok():
+            return None
+        try:
+            gcno_hash = _gcno_hash(gcno_path)
+        except OSError:
+            return None
+        digest = hashlib.sha256(tool_version().encode())
+        # Relative source paths in the .gcno are taken from its directory
+        digest.update(os.path.dirname(gcno_path).encode())
+        digest.update(gcno_hash.encode())
+        digest.update(block.data)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        # The tracefile text of a key, or None
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as entry_file:
+                text = zlib.decompress(entry_file.read()).decode()
+            os.utime(path)
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+        return text
+
+    def put(self, key, text):
+        path = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(descriptor, 'wb') as entry_file:
+                entry_file.write(zlib.compress(text.encode(), 6))
+            os.replace(temporary, path)
+        except OSError:
+            # A full or read-only disk only costs the next run the capture
+            pass
+
+    def entries(self):
+        # (mtime, size, path) of every entry, not the scans kept alongside
+        found = []
+        for directory, _, files in os.walk(self.directory):
+            for file_name in files:
+                if not file_name.endswith(_ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+        return found
+
+    def trim(self, max_bytes=None):
+        # Removes the least recently used entries until the cache fits.
+        # Returns the number of entries removed.
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the size of the capture cache or empty it")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR, help=f"cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--trim', type=int, metavar='MB', help="remove the least recently used entries past MB")
+    parser.add_argument('--clear', action='store_true', help="remove every entry")
+    args = parser.parse_args(argv)
+
+    cache = CaptureCache(args.cache)
+    if args.clear or args.trim is not None:
+        removed = cache.trim(0 if args.clear else args.trim * 1024 * 1024)
+        print(f"{removed} entries removed")
+    entries = cache.entries()
+    print(f"{len(entries)} entries, {sum(size for _, size, _ in entries) / (1024 * 1024):.1f} MB in {args.cache}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
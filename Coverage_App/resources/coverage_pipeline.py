@@ -0,0 +1,271 @@
+import collections
+import hashlib
+import os
+from functools import partial
+
+from binary_dump import is_binary_dump, iter_binary_blocks
+from coverage_report import write_coverage_report
+from gcov_format import GcovFormatError, capture_gcda, expand_sparse_counters
+from lcov_info import format_record
+from live_log import LiveLog
+from log_index import LogDump
+from path_resolver import PathResolver, rewrite_path
+from serial_log import iter_gcda_blocks
+from timing import TimedCall, timed
+from tracefile_merge import APPLICATION_PATTERNS, TracefileMerger
+from worker_pool import map_ordered
+
+
+# GDB script that dumps the damaged objects again, next to the reports
+REDUMP_NAME = 'redump.gdb'
+
+
+def capture_block(block):
+    # Coverage records for one decoded block, read against the .gcno that
+    # the build left next to the object.  Returns (records, message).
+    if block.path is None:
+        return None, f"No file name found for {block.expected_size} byte block"
+    if not block.is_complete():
+        return None, f"ERROR: {block.path} has {len(block.data)} bytes, expected {block.expected_size}"
+    if not block.checksum_ok():
+        return None, f"ERROR: {block.path} fails its CRC check"
+
+    gcno_path = _gcno_path(block.path)
+    if not os.path.exists(gcno_path):
+        return None, f"No matching path found for {block.name}"
+
+    try:
+        records = capture_gcda(expand_sparse_counters(block.data, block.path), gcno_path, block.path)
+    except GcovFormatError as e:
+        return None, f"ERROR: {e}"
+    return records, f"Captured: {block.name}"
+
+
+def _gcno_path(gcda_path):
+    return gcda_path[:-len('.gcda')] + '.gcno'
+
+
+def _rewrite_sources(text, rewrite):
+    # Tracefile text with the rules applied to its SF: lines
+    return ''.join('SF:' + rewrite_path(line[3:-1], rewrite) + '\n' if line.startswith('SF:') else line
+                   for line in text.splitlines(keepends=True))
+
+
+def iter_blocks(log_path, progress=None):
+    # The app accepts the RTT hex dump log as well as the binary output
+    # file / RAM image of GCOV_OPT_OUTPUT_BINARY_FILE and _MEMORY.  A
+    # LiveLog is decoded while the target is still dumping, a LogDump is
+    # read through the log's index.
+    if isinstance(log_path, (LiveLog, LogDump)):
+        return log_path.blocks(progress)
+    if is_binary_dump(log_path):
+        return iter_binary_blocks(log_path, progress=progress)
+    return iter_gcda_blocks(log_path, progress)
+
+
+def log_name(log_path):
+    # logs/nightly-0412.txt -> nightly-0412
+    if isinstance(log_path, (LiveLog, LogDump)):
+        return log_path.name
+    return os.path.splitext(os.path.basename(log_path))[0]
+
+
+def capture_object(block, info_dir=None, rewrite=None, cache=None, index=None):
+    # Runs in a worker: capture one object and write its tracefile next to
+    # it, as `lcov --capture` did, or into info_dir when given.  index, the
+    # block's place in the log, keeps the tracefiles of an object dumped
+    # several times apart.  The
+    # (target prefix, local prefix) rules of `rewrite` apply to the source
+    # paths.  With a CaptureCache, an object already captured with the same
+    # .gcno and counters is copied from it.  Returns (tracefile or None,
+    # message).
+    key = cache.key(block, _gcno_path(block.path)) if cache is not None and block.path else None
+    text = cache.get(key) if key is not None else None
+    if text is not None:
+        message = f"Cached: {block.name}"
+    else:
+        records, message = capture_block(block)
+        if records is None:
+            return None, message
+        text = ''.join(format_record(coverage) for coverage in sorted(records, key=lambda item: item.source))
+        if key is not None:
+            cache.put(key, text)
+    if rewrite:
+        text = _rewrite_sources(text, rewrite)
+
+    suffix = '.info' if index is None else f'-{index}.info'
+    if info_dir is None:
+        info_path = block.path[:-len('.gcda')] + suffix
+    else:
+        # Objects in different directories can share a name
+        directory_hash = hashlib.sha1(os.path.dirname(block.path).encode()).hexdigest()[:8]
+        info_path = os.path.join(info_dir, f"{block.name[:-len('.gcda')]}-{directory_hash}{suffix}")
+    with open(info_path, 'w') as info_file:
+        info_file.write(text)
+    return info_path, message
+
+
+def _capture_numbered(capture, numbered):
+    # capture (capture_object, maybe timed) of an (index, block) pair
+    index, block = numbered
+    return capture(block, index=index)
+
+
+def _record_paths(blocks, paths):
+    # Passes the blocks on, remembering their paths in dispatch order
+    for block in blocks:
+        paths.append(block.path)
+        yield block
+
+
+def capture_log(log_path, jobs=1, info_dir=None, progress=None, timings=None, resolver=None, cache=None):
+    # Decode the serial log, binary dump or LiveLog once and capture the objects on
+    # `jobs` worker processes.  Results are collected in log order, so the
+    # tracefiles and messages are the same whatever the number of workers.
+    # With timings, every decoded block and captured object gets a span.
+    # Every dump of an object counts, each from its own tracefile: with
+    # __gcov_clear between the dumps their counters add up to the whole
+    # run.  An object that failed (short, CRC mismatch, unreadable) and is
+    # dumped again later in the log, by __gcov_dump_file, counts from the
+    # later dump.
+    # The PathResolver finds the local objects of the paths the target
+    # printed, by default they are used as they are.  With a CaptureCache,
+    # unchanged objects are not captured again; it is trimmed at the end.
+    # Returns the tracefiles, the application name, the output messages and
+    # the (target) paths of the objects that are still damaged.
+    info_files = []
+    messages = []
+    damaged = {}  # path -> index of its error in messages
+    application_name = None
+    if resolver is None:
+        resolver = PathResolver()
+
+    capture = partial(capture_object, info_dir=info_dir, rewrite=resolver.rewrite, cache=cache)
+    blocks = iter_blocks(log_path, progress)
+    if timings is not None:
+        capture = TimedCall(capture, 'object')
+        blocks = timings.iterate('decode', blocks)
+    paths = collections.deque()
+
+    # The target paths are recorded before they are resolved, the redump
+    # script and the application name need them
+    blocks = enumerate(resolver.resolve_blocks(_record_paths(blocks, paths)))
+    for result in map_ordered(partial(_capture_numbered, capture), blocks, jobs):
+        if timings is not None:
+            result, span = result
+            timings.add(span)
+        info_path, message = result
+        path = paths.popleft()
+        messages.append(message)
+        if progress is not None:
+            progress.update('capture', len(messages), None, 'objects')
+        if info_path is None:
+            if path is not None and message.startswith("ERROR"):
+                damaged[path] = len(messages) - 1
+            continue
+        if path in damaged:
+            failed = damaged.pop(path)
+            messages[failed] = f"Damaged, dumped again later: {os.path.basename(path)}"
+
+        info_files.append(info_path)
+        if application_name is None:
+            application_name = resolver.application_name(path)
+
+    if progress is not None:
+        progress.update('capture', len(messages), len(messages), 'objects', final=True)
+    if cache is not None:
+        cached = sum(1 for message in messages if message.startswith("Cached"))
+        cache.trim()
+        messages.append(f"Capture cache: {cached} of {len(messages)} objects reused")
+
+    if info_files and not application_name:
+        # Objects outside an Application/ tree, name the report after the log
+        application_name = log_name(log_path)
+    return info_files, application_name, messages, list(damaged)
+
+
+def coverage_succeeded(application_name, messages):
+    # Whether a run_coverage result is good: coverage data was found and no
+    # message is an error.  The GUI and batch_report.py both decide by this.
+    return application_name is not None and not any(message.startswith("ERROR") for message in messages)
+
+
+def write_redump_script(path, gcda_paths, log_path):
+    # GDB commands that make the target dump the objects again
+    # (GCOV_OPT_PROVIDE_REDUMP).  Their output, appended to the log, replaces
+    # the damaged blocks on the next run.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    log = log_path.source if isinstance(log_path, (LiveLog, LogDump)) else log_path
+    with open(path, 'w') as script:
+        script.write(f"# Objects damaged in transfer in {log}\n")
+        script.write("# In the debugger session of the target: source redump.gdb\n")
+        for gcda_path in gcda_paths:
+            script.write(f'call __gcov_dump_file("{gcda_path}")\n')
+    return path
+
+
+def merge_info_files(info_files, patterns=APPLICATION_PATTERNS, progress=None, timings=None):
+    # The tracefiles of all objects merged into FileCoverage records
+    merger = TracefileMerger(patterns)
+    with timed(timings, 'merge', len(info_files)):
+        for merged, info_path in enumerate(info_files, 1):
+            merger.add_tracefile(info_path)
+            if progress is not None:
+                progress.update('merge', merged, len(info_files), 'files')
+        return list(merger.coverages())
+
+
+def build_coverage_report(info_files, report_dir, patterns=APPLICATION_PATTERNS, progress=None, timings=None):
+    # Merge the tracefiles of all objects and bring the HTML report in
+    # report_dir up to date.  Returns (pages drawn, pages reused).
+    coverages = merge_info_files(info_files, patterns, progress, timings)
+    with timed(timings, 'render', len(coverages)):
+        return write_coverage_report(coverages, report_dir, progress=progress)
+
+
+def run_coverage(log_path, reports_dir, jobs=1, info_dir=None, progress=None, timings=None, store=None, run_name=None,
+                 resolver=None, cache=None, replace_run=False):
+    # The whole coverage step for one log: decode, capture, merge and draw
+    # <reports_dir>/<application>/CoverageReport.  With a CoverageStore,
+    # the merged counters are also kept there as run_name (default: the
+    # log's name); a run of that name already there is an error unless
+    # replace_run is set.  A PathResolver maps the target's paths onto the local
+    # build tree and picks the sources the report keeps.  A CaptureCache
+    # keeps the captured objects for the next run.
+    # Returns the application name (None without coverage data) and the messages.
+    if resolver is None:
+        resolver = PathResolver()
+    with timed(timings, 'capture') as span:
+        info_files, application_name, messages, damaged = capture_log(log_path, jobs, info_dir, progress, timings,
+                                                                      resolver, cache)
+        if span is not None:
+            span.items = len(messages)
+    script = os.path.join(reports_dir, application_name or log_name(log_path), REDUMP_NAME)
+    if damaged:
+        write_redump_script(script, damaged, log_path)
+        names = ', '.join(os.path.basename(path) for path in damaged)
+        messages.append(f"ERROR: damaged in transfer: {names}; dump them again with {script}")
+    elif os.path.exists(script):
+        # Left from an earlier run of this log
+        os.remove(script)
+    if not info_files:
+        messages.append("No coverage data found in the log")
+        return None, messages
+
+    coverages = merge_info_files(info_files, resolver.keep, progress, timings)
+    if store is not None:
+        run_name = run_name or log_name(log_path)
+        try:
+            with timed(timings, 'store', len(coverages)):
+                log = log_path.source if isinstance(log_path, (LiveLog, LogDump)) else log_path
+                store.add_run(run_name, coverages, application_name, log, replace_run)
+            messages.append(f"Stored as run {run_name} in {store.path}")
+        except ValueError as e:
+            # The report is still drawn
+            messages.append(f"ERROR: {e}")
+
+    report_dir = os.path.join(reports_dir, application_name, 'CoverageReport')
+    with timed(timings, 'render', len(coverages)):
+        drawn, reused = write_coverage_report(coverages, report_dir, progress=progress)
+    messages.append(f"Coverage report: {drawn} pages drawn, {reused} unchanged")
+    return application_name, messages
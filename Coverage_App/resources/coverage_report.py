@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+
+from lcov_info import format_record
+from templates import SOURCES, write_page
+
+
+# Bump when the pages change, so the next run redraws all of them
+REPORT_FORMAT_VERSION = 2
+
+# Directory shown for sources at the top of the tree, whose pages would
+# otherwise share the report's own index.html
+TOP_DIRECTORY = 'root'
+
+MANIFEST_NAME = 'coverage_manifest.json'
+
+# Per-file and total line, function and branch counts, for CI gates
+SUMMARY_NAME = 'coverage_summary.json'
+
+STYLE = '''
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                    background-color: #f4f4f4;
+                }
+
+                h1, h2 {
+                    color: #007BFF;
+                    text-align: center;
+                }
+
+                table {
+                    border-collapse: collapse;
+                    width: 80%;
+                    margin-top: 20px;
+                    margin-left: auto;
+                    margin-right: auto;
+                }
+
+                th, td {
+                    border: 1px solid #ddd;
+                    padding: 6px 12px;
+                    text-align: left;
+                }
+
+                th {
+                    background-color: #007BFF;
+                    color: white;
+                }
+
+                a {
+                    text-decoration: none;
+                    color: #007BFF;
+                }
+
+                td.high { background-color: #c7f0c7; }
+                td.medium { background-color: #f7f0a8; }
+                td.low { background-color: #f7c0c0; }
+
+                table.source {
+                    width: 100%;
+                    font-family: monospace;
+                    white-space: pre;
+                }
+
+                table.source td {
+                    border: none;
+                    padding: 0 8px;
+                }
+
+                tr.hit td.count { background-color: #c7f0c7; }
+                tr.miss td.count, tr.miss td.code { background-color: #f7c0c0; }
+                td.line, td.count, td.branch { text-align: right; color: #555; }
+'''
+
+SOURCES['coverage_summary.html'] = '''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>{{ title }}</title>
+            <style>{{ style }}</style>
+        </head>
+        <body>
+            <h1>{{ title }}</h1>
+            {% if up %}<p><a href="{{ up }}">Top level</a></p>{% endif %}
+            <table>
+                <tr>
+                    <th>{{ heading }}</th>
+                    <th>Lines</th>
+                    <th>Functions</th>
+                    <th>Branches</th>
+                </tr>
+                {% for name, link, summary in rows %}
+                    <tr>
+                        <td><a href="{{ link }}">{{ name|e }}</a></td>
+                        {% for kind in ('lines', 'functions', 'branches') %}
+                            {% set found = summary[kind + '_found'] %}
+                            {% set hit = summary[kind + '_hit'] %}
+                            {% set rate = (100.0 * hit / found) if found else 100.0 %}
+                            <td class="{{ 'high' if rate >= 90 else 'medium' if rate >= 75 else 'low' }}">
+                                {{ '%.1f' % rate }} % ({{ hit }} / {{ found }})
+                            </td>
+                        {% endfor %}
+                    </tr>
+                {% endfor %}
+                <tr>
+                    <th>Total</th>
+                    {% for kind in ('lines', 'functions', 'branches') %}
+                        {% set found = total[kind + '_found'] %}
+                        {% set hit = total[kind + '_hit'] %}
+                        <th>{{ '%.1f' % ((100.0 * hit / found) if found else 100.0) }} % ({{ hit }} / {{ found }})</th>
+                    {% endfor %}
+                </tr>
+            </table>
+        </body>
+        </html>
+'''
+
+SOURCES['coverage_source.html'] = '''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>{{ source|e }}</title>
+            <style>{{ style }}</style>
+        </head>
+        <body>
+            <h2>{{ source|e }}</h2>
+            <p><a href="{{ up }}">Top level</a> - <a href="index.html">{{ directory|e }}</a></p>
+
+            <table>
+                <tr>
+                    <th>Function</th>
+                    <th>Line</th>
+                    <th>Hits</th>
+                </tr>
+                {% for name, line, hits in functions %}
+                    <tr>
+                        <td class="{{ 'high' if hits else 'low' }}">{{ name|e }}</td>
+                        <td>{{ line }}</td>
+                        <td>{{ hits }}</td>
+                    </tr>
+                {% endfor %}
+            </table>
+
+            {% if not available %}<p>Source file not available.</p>{% endif %}
+            <table class="source">
+                {% for line, hits, branches, code in rows %}
+                    <tr{% if hits is not none %} class="{{ 'hit' if hits else 'miss' }}"{% endif %}>
+                        <td class="line">{{ line }}</td>
+                        <td class="branch">{{ branches }}</td>
+                        <td class="count">{{ '' if hits is none else hits }}</td>
+                        <td class="code">{{ code|e }}</td>
+                    </tr>
+                {% endfor %}
+            </table>
+        </body>
+        </html>
+'''
+
+
+def summarize(coverage):
+    return {
+        'lines_found': len(coverage.lines),
+        'lines_hit': sum(1 for hits in coverage.lines.values() if hits > 0),
+        'functions_found': len(coverage.functions),
+        'functions_hit': sum(1 for _, hits in coverage.functions.values() if hits > 0),
+        'branches_found': len(coverage.branches),
+        'branches_hit': sum(1 for taken in coverage.branches.values() if taken),
+    }
+
+
+def _add_summaries(summaries):
+    total = dict.fromkeys(('lines_found', 'lines_hit', 'functions_found',
+                           'functions_hit', 'branches_found', 'branches_hit'), 0)
+    for summary in summaries:
+        for key in total:
+            total[key] += summary[key]
+    return total
+
+
+def _read_source(source):
+    try:
+        with open(source, 'rb') as source_file:
+            return source_file.read()
+    except OSError:
+        return None
+
+
+def _page_hash(coverage, source_text):
+    # Everything a source page is drawn from
+    digest = hashlib.sha256(f'{REPORT_FORMAT_VERSION}\n'.encode())
+    digest.update(format_record(coverage).encode())
+    digest.update(b'\0' if source_text is None else b'\1' + source_text)
+    return digest.hexdigest()
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != REPORT_FORMAT_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+
+def _page_paths(sources):
+    # source -> (directory name shown in the report, page path in the report).
+    # Directories are named relative to the parent of their common prefix,
+    # the way genhtml lists them.  Relative and absolute paths (or paths on
+    # different drives) have no common prefix and are named in full.
+    directories = [os.path.dirname(source) for source in sources]
+    try:
+        base = os.path.dirname(os.path.commonpath(directories)) if directories else ''
+    except ValueError:
+        base = ''
+    paths = {}
+    for source, directory in zip(sources, directories):
+        name = os.path.relpath(directory, base) if base else directory.lstrip('/')
+        if name in ('', '.'):
+            name = TOP_DIRECTORY
+        paths[source] = (name, os.path.join(name, os.path.basename(source) + '.gcov.html'))
+    return paths
+
+
+def _write_source_page(full_page_path, coverage, source_text, directory, page_path):
+    branches_by_line = {}
+    for (line, _, _), taken in sorted(coverage.branches.items()):
+        branches_by_line.setdefault(line, []).append('#' if taken is None else '+' if taken else '-')
+
+    if source_text is None:
+        code_lines = [''] * max(coverage.lines, default=0)
+    else:
+        code_lines = source_text.decode('utf-8', 'replace').splitlines()
+
+    rows = [(number, coverage.lines.get(number), ''.join(branches_by_line.get(number, ())), code)
+            for number, code in enumerate(code_lines, 1)]
+    functions = sorted(((name, line, hits) for name, (line, hits) in coverage.functions.items()),
+                       key=lambda item: (item[1], item[0]))
+
+    write_page(full_page_path, 'coverage_source.html', style=STYLE, source=coverage.source, directory=directory,
+               up=os.path.relpath('index.html', os.path.dirname(page_path)),
+               functions=functions, rows=rows, available=source_text is not None)
+
+
+def write_coverage_report(coverages, output_dir, title='Coverage Report', progress=None):
+    # HTML report of the given FileCoverage records in output_dir, the
+    # layout genhtml used: index.html, one index.html per directory and
+    # one page per source file.  The manifest from the previous run keeps
+    # a hash of each page's inputs (counters and source text), and only
+    # pages whose hash changed are drawn again; the summaries are always
+    # rewritten.  Returns (pages drawn, pages reused).
+    coverages = {coverage.source: coverage for coverage in coverages}
+    previous = _load_manifest(output_dir)
+    paths = _page_paths(sorted(coverages))
+
+    manifest = {}
+    drawn = reused = 0
+    for rendered, (source, coverage) in enumerate(sorted(coverages.items())):
+        if progress is not None:
+            progress.update('render', rendered, len(coverages), 'pages')
+        directory, page_path = paths[source]
+        source_text = _read_source(source)
+        page_hash = _page_hash(coverage, source_text)
+        full_page_path = os.path.join(output_dir, page_path)
+
+        entry = previous.get(source)
+        if entry and entry['hash'] == page_hash and entry['page'] == page_path and os.path.exists(full_page_path):
+            manifest[source] = entry
+            reused += 1
+            continue
+
+        os.makedirs(os.path.dirname(full_page_path), exist_ok=True)
+        _write_source_page(full_page_path, coverage, source_text, directory, page_path)
+        manifest[source] = {'hash': page_hash, 'page': page_path,
+                            'directory': directory, 'summary': summarize(coverage)}
+        drawn += 1
+
+    # Pages of sources that are no longer in the report, or that moved
+    # because the common prefix of the sources changed
+    pages = {entry['page'] for entry in manifest.values()}
+    for entry in previous.values():
+        if entry['page'] not in pages:
+            stale_path = os.path.join(output_dir, entry['page'])
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    _write_summaries(manifest, output_dir, title)
+    _write_summary_json(manifest, output_dir, title)
+    if progress is not None:
+        progress.update('render', len(coverages), len(coverages), 'pages', final=True)
+
+    # Directory pages of directories that are gone
+    for directory in {entry['directory'] for entry in previous.values()}:
+        stale_path = os.path.join(output_dir, directory, 'index.html')
+        if all(entry['directory'] != directory for entry in manifest.values()) and os.path.exists(stale_path):
+            os.remove(stale_path)
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump({'version': REPORT_FORMAT_VERSION, 'files': manifest}, manifest_file, indent=1, sort_keys=True)
+
+    return drawn, reused
+
+
+def _write_summary_json(manifest, output_dir, title):
+    # {"version", "title", "totals": {...}, "files": {source: {"page", the
+    # summarize() counts}}}, one file per line
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    totals = _add_summaries(entry['summary'] for entry in manifest.values())
+    with open(os.path.join(output_dir, SUMMARY_NAME), 'w', buffering=1 << 16) as summary_file:
+        summary_file.write(f'{{"version":{REPORT_FORMAT_VERSION},"title":{dumps(title)},"totals":{dumps(totals)},"files":{{')
+        for index, (source, entry) in enumerate(sorted(manifest.items())):
+            summary_file.write((',\n' if index else '\n') + f'{dumps(source)}:{dumps(dict(entry["summary"], page=entry["page"]))}')
+        summary_file.write('\n}}\n')
+
+
+def _write_summaries(manifest, output_dir, title):
+    directories = {}
+    for source, entry in sorted(manifest.items()):
+        directories.setdefault(entry['directory'], []).append((source, entry))
+
+    index_rows = []
+    for directory, entries in sorted(directories.items()):
+        rows = [(os.path.basename(source), os.path.basename(entry['page']), entry['summary'])
+                for source, entry in entries]
+        total = _add_summaries(summary for _, _, summary in rows)
+        write_page(os.path.join(output_dir, directory, 'index.html'), 'coverage_summary.html',
+                   style=STYLE, title=f'{title} - {directory}', heading='File',
+                   up=os.path.relpath('index.html', directory), rows=rows, total=total)
+        index_rows.append((directory, os.path.join(directory, 'index.html'), total))
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_page(os.path.join(output_dir, 'index.html'), 'coverage_summary.html',
+               style=STYLE, title=title, heading='Directory', up=None, rows=index_rows,
+               total=_add_summaries(summary for _, _, summary in index_rows))
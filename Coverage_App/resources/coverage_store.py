@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+from array import array
+
+from coverage_report import write_coverage_report
+from lcov_info import FileCoverage, write_tracefile
+from tracefile_merge import TracefileMerger
+
+
+# Bumped when the table layout or the counter encoding changes
+STORE_FORMAT_VERSION = 1
+
+# Seconds a writer waits for another process that holds the database
+BUSY_TIMEOUT = 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    module TEXT,
+    log TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_module ON runs (module, id);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS counters (
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    source INTEGER NOT NULL REFERENCES sources (id),
+    lines BLOB NOT NULL,
+    functions BLOB NOT NULL,
+    branches BLOB NOT NULL,
+    PRIMARY KEY (run, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS counters_source ON counters (source, run);
+'''
+
+# Branch counters are stored plus one, so that 0 can stand for '-'
+_NOT_EVALUATED = 0
+
+
+def _pack(values):
+    # A list of integers as zlib compressed little endian int64s.  Line
+    # numbers are delta coded by the callers, so most bytes are zero.
+    packed = array('q', values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return zlib.compress(packed.tobytes(), 6)
+
+
+def _unpack(blob):
+    values = array('q')
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def encode_coverage(coverage):
+    # FileCoverage -> (lines, functions, branches) blobs.
+    # lines: line number deltas and hits, interleaved.
+    # branches: line deltas, block, branch and taken + 1, interleaved.
+    # functions: zlib compressed JSON of [name, line, hits] rows.
+    lines = []
+    previous = 0
+    for line, hits in sorted(coverage.lines.items()):
+        lines += (line - previous, hits)
+        previous = line
+
+    branches = []
+    previous = 0
+    for (line, block, branch), taken in sorted(coverage.branches.items()):
+        branches += (line - previous, block, branch, _NOT_EVALUATED if taken is None else taken + 1)
+        previous = line
+
+    functions = sorted([name, line, hits] for name, (line, hits) in coverage.functions.items())
+    return (_pack(lines), zlib.compress(json.dumps(functions, separators=(',', ':')).encode()),
+            _pack(branches))
+
+
+def decode_coverage(source, lines, functions, branches):
+    coverage = FileCoverage(source)
+    values = _unpack(lines)
+    line = 0
+    for index in range(0, len(values), 2):
+        line += values[index]
+        coverage.lines[line] = values[index + 1]
+
+    values = _unpack(branches)
+    line = 0
+    for index in range(0, len(values), 4):
+        line += values[index]
+        taken = values[index + 3]
+        coverage.branches[(line, values[index + 1], values[index + 2])] = None if taken == _NOT_EVALUATED else taken - 1
+
+    coverage.functions = {name: [line, hits] for name, line, hits in json.loads(zlib.decompress(functions))}
+    return coverage
+
+
+class CoverageStore:
+    # Coverage of many runs in one SQLite file: the merged counters of
+    # every source file of every run, so that runs can be combined later
+    # without their logs or tracefiles.  Runs have a unique name and the
+    # module they belong to.
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            self.connection.execute(f'PRAGMA user_version = {STORE_FORMAT_VERSION}')
+        elif version != STORE_FORMAT_VERSION:
+            raise ValueError(f"{path} is a version {version} coverage store, expected {STORE_FORMAT_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_run(self, name, coverages, module=None, log=None, replace=False):
+        # Stores the FileCoverage records of one run.  Returns the run id.
+        # A run of the same name is an error, unless replace is set.
+        with self.connection:
+            if replace:
+                self.connection.execute('DELETE FROM runs WHERE name = ?', (name,))
+            elif self.connection.execute('SELECT 1 FROM runs WHERE name = ?', (name,)).fetchone():
+                raise ValueError(f"A run named {name} is already stored in {self.path}")
+            run_id = self.connection.execute('INSERT INTO runs (name, module, log, created) VALUES (?, ?, ?, ?)',
+                                             (name, module, log, time.time())).lastrowid
+            rows = []
+            for coverage in coverages:
+                self.connection.execute('INSERT OR IGNORE INTO sources (path) VALUES (?)', (coverage.source,))
+                source_id = self.connection.execute('SELECT id FROM sources WHERE path = ?',
+                                                    (coverage.source,)).fetchone()[0]
+                rows.append((run_id, source_id) + encode_coverage(coverage))
+            self.connection.executemany('INSERT INTO counters VALUES (?, ?, ?, ?, ?)', rows)
+        return run_id
+
+    def remove_run(self, name):
+        with self.connection:
+            return self.connection.execute('DELETE FROM runs WHERE name = ?', (name,)).rowcount
+
+    def runs(self, module=None):
+        # [(name, module, log, created, files)] in the order they were added
+        query = ('SELECT name, module, log, created, (SELECT COUNT(*) FROM counters WHERE run = runs.id) '
+                 'FROM runs')
+        if module is not None:
+            return self.connection.execute(query + ' WHERE module = ? ORDER BY id', (module,)).fetchall()
+        return self.connection.execute(query + ' ORDER BY id').fetchall()
+
+    def _run_ids(self, names=None, module=None):
+        # Ids of the named runs, or all runs (of the module); unknown names are an error
+        if names is None:
+            return [run[0] for run in self.connection.execute(
+                'SELECT id FROM runs WHERE ? IS NULL OR module = ? ORDER BY id', (module, module))]
+        ids = []
+        for name in names:
+            row = self.connection.execute('SELECT id FROM runs WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                raise KeyError(f"No run named {name}")
+            ids.append(row[0])
+        return ids
+
+    def _counters(self, run_ids, sources=None):
+        # (run id, FileCoverage) of the runs, one source at a time so that a
+        # caller can combine them without holding every run in memory
+        if not run_ids:
+            return
+        placeholders = ','.join('?' * len(run_ids))
+        query = (f'SELECT counters.run, sources.path, counters.lines, counters.functions, counters.branches '
+                 f'FROM counters JOIN sources ON sources.id = counters.source '
+                 f'WHERE counters.run IN ({placeholders})')
+        parameters = list(run_ids)
+        if sources is not None:
+            query += f' AND sources.path IN ({",".join("?" * len(sources))})'
+            parameters += list(sources)
+        for run_id, source, lines, functions, branches in self.connection.execute(
+                query + ' ORDER BY sources.path, counters.run', parameters):
+            yield run_id, decode_coverage(source, lines, functions, branches)
+
+    def _by_source(self, run_ids, sources=None):
+        # source -> {run id: FileCoverage}, one source at a time
+        current = None
+        per_run = {}
+        for run_id, coverage in self._counters(run_ids, sources):
+            if coverage.source != current:
+                if per_run:
+                    yield current, per_run
+                current, per_run = coverage.source, {}
+            per_run[run_id] = coverage
+        if per_run:
+            yield current, per_run
+
+    def union(self, names=None, module=None, patterns=None, sources=None):
+        # Counters summed over the runs, what merging all their tracefiles
+        # would give.  FileCoverage records sorted by source.
+        merger = TracefileMerger(patterns)
+        for _, coverage in self._counters(self._run_ids(names, module), sources):
+            merger.add_coverage(coverage)
+        return list(merger.coverages())
+
+    def intersection(self, names=None, module=None, sources=None):
+        # What every one of the runs executed: each counter is its smallest
+        # value over the runs, so anything a run missed (or a source a run
+        # does not have) is 0
+        run_ids = self._run_ids(names, module)
+        coverages = []
+        for source, per_run in self._by_source(run_ids, sources):
+            runs = [per_run.get(run_id) for run_id in run_ids]
+            coverage = FileCoverage(source)
+            if None in runs:
+                first = next(run for run in runs if run is not None)
+                coverage.lines = dict.fromkeys(first.lines, 0)
+                coverage.functions = {name: [line, 0] for name, (line, _) in first.functions.items()}
+                coverage.branches = {key: None if taken is None else 0 for key, taken in first.branches.items()}
+            else:
+                first = runs[0]
+                coverage.lines = {line: min(run.lines.get(line, 0) for run in runs) for line in first.lines}
+                coverage.functions = {name: [line, min(run.functions.get(name, (0, 0))[1] for run in runs)]
+                                      for name, (line, _) in first.functions.items()}
+                coverage.branches = {key: None if taken is None else min(run.branches.get(key) or 0 for run in runs)
+                                     for key, taken in first.branches.items()}
+            coverages.append(coverage)
+        return coverages
+
+    def delta(self, name, baseline=None, sources=None):
+        # What the run covered that none of the baseline runs did: its
+        # counters where every baseline run has 0, and 0 elsewhere.  The
+        # baseline defaults to the runs of the same module added before it.
+        run_id = self._run_ids([name])[0]
+        if baseline is None:
+            module = self.connection.execute('SELECT module FROM runs WHERE id = ?', (run_id,)).fetchone()[0]
+            baseline_ids = [other for other in self._run_ids(module=module) if other < run_id]
+        else:
+            baseline_ids = self._run_ids(baseline)
+
+        before = {}
+        for _, coverage in self._counters(baseline_ids, sources):
+            merged = before.get(coverage.source)
+            if merged is None:
+                before[coverage.source] = coverage
+            else:
+                merged.add(coverage)
+
+        coverages = []
+        for _, coverage in self._counters([run_id], sources):
+            old = before.get(coverage.source)
+            if old is not None:
+                coverage.lines = {line: 0 if old.lines.get(line) else hits for line, hits in coverage.lines.items()}
+                coverage.functions = {function: [line, 0 if old.functions.get(function, (0, 0))[1] else hits]
+                                      for function, (line, hits) in coverage.functions.items()}
+                coverage.branches = {key: taken if taken is None or not old.branches.get(key) else 0
+                                     for key, taken in coverage.branches.items()}
+            coverages.append(coverage)
+        return coverages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Combine the coverage runs kept in a coverage store")
+    parser.add_argument('store', help="SQLite file written by batch_report.py --store")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('runs', help="list the stored runs").add_argument('--module')
+
+    for command, description in (('union', "coverage of any of the runs"),
+                                 ('intersection', "coverage of every one of the runs"),
+                                 ('delta', "coverage of one run that its baseline did not have")):
+        query = commands.add_parser(command, help=description)
+        if command == 'delta':
+            query.add_argument('run', help="name of the run")
+            query.add_argument('--baseline', nargs='+', help="runs to compare with (default: the earlier runs of its module)")
+        else:
+            query.add_argument('--runs', nargs='+', help="names of the runs (default: all runs of --module)")
+            query.add_argument('--module', help="only the runs of this module")
+        query.add_argument('-o', '--output', help="directory for the HTML report")
+        query.add_argument('--tracefile', help="also write the result as an lcov tracefile")
+    args = parser.parse_args(argv)
+
+    if args.command != 'runs' and not args.output and not args.tracefile:
+        parser.error("give --output and/or --tracefile")
+    if not os.path.exists(args.store):
+        parser.error(f"{args.store} does not exist")
+
+    with CoverageStore(args.store) as store:
+        if args.command == 'runs':
+            for name, module, log, created, files in store.runs(args.module):
+                print(f"{name}\t{module or '-'}\t{files} files\t{time.strftime('%Y-%m-%d %H:%M', time.localtime(created))}\t{log or ''}")
+            return 0
+
+        try:
+            if args.command == 'union':
+                coverages = store.union(args.runs, args.module)
+            elif args.command == 'intersection':
+                coverages = store.intersection(args.runs, args.module)
+            else:
+                coverages = store.delta(args.run, args.baseline)
+        except KeyError as e:
+            print(f"ERROR: {e.args[0]}")
+            return 1
+
+    if not coverages:
+        print("No coverage data found in the store")
+        return 1
+    if args.tracefile:
+        write_tracefile(args.tracefile, coverages)
+    if args.output:
+        drawn, reused = write_coverage_report(coverages, args.output)
+        print(f"Coverage report: {drawn} pages drawn, {reused} unchanged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
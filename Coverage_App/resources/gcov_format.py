@@ -0,0 +1,492 @@
+import os
+import struct
+
+from lcov_info import FileCoverage
+
+
+# Compare to gcc/gcov-io.h and coverage/gcov_gcc.h
+GCOV_DATA_MAGIC = 0x67636461    # "gcda"
+GCOV_NOTE_MAGIC = 0x67636e6f    # "gcno"
+GCOV_TAG_FUNCTION = 0x01000000
+GCOV_TAG_BLOCKS = 0x01410000
+GCOV_TAG_ARCS = 0x01430000
+GCOV_TAG_LINES = 0x01450000
+GCOV_TAG_COUNTER_BASE = 0x01a10000
+GCOV_TAG_OBJECT_SUMMARY = 0xa1000000
+GCOV_TAG_PROGRAM_SUMMARY = 0xa3000000
+
+# GCOV_TAG_FOR_COUNTER(0), the arc counters are the only ones coverage needs
+GCOV_TAG_COUNTER_ARCS = GCOV_TAG_COUNTER_BASE
+
+# GCOV_OPT_SPARSE_COUNTERS sets this bit of a counter tag (the low 16 bits
+# of gcc's tags are always zero) and sends the number of counters followed
+# by (index, value) of the nonzero ones
+GCOV_TAG_SPARSE_FLAG = 0x00000001
+
+GCOV_ARC_ON_TREE = 1
+GCOV_ARC_FAKE = 2
+
+ENTRY_BLOCK = 0
+
+
+class GcovFormatError(Exception):
+    pass
+
+
+def gcc_major_version(version):
+    # The version word is four characters, most significant first:
+    # 'A75*' is gcc 7.5, 'B13*' is gcc 11.3, '407*' is gcc 4.7
+    first = (version >> 24) & 0xff
+    second = (version >> 16) & 0xff
+    if first >= ord('A'):
+        return (first - ord('A')) * 10 + second - ord('0')
+    return first - ord('0')
+
+
+class _Reader:
+    def __init__(self, data, name, magic):
+        self.data = data
+        self.name = name
+        self.pos = 0
+
+        if len(data) < 12:
+            raise GcovFormatError(f"{name}: file too short")
+        if struct.unpack_from('<I', data)[0] == magic:
+            self.order = '<'
+        elif struct.unpack_from('>I', data)[0] == magic:
+            self.order = '>'
+        else:
+            raise GcovFormatError(f"{name}: not a gcov file")
+        self.pos = 4
+
+        self.version = self.unsigned()
+        self.major = gcc_major_version(self.version)
+        # gcc 12 switched record lengths and strings from words to bytes
+        self.byte_lengths = self.major >= 12
+
+    def remaining(self):
+        return len(self.data) - self.pos
+
+    def unsigned(self):
+        if self.pos + 4 > len(self.data):
+            raise GcovFormatError(f"{self.name}: unexpected end of file")
+        value = struct.unpack_from(self.order + 'I', self.data, self.pos)[0]
+        self.pos += 4
+        return value
+
+    def counters(self, count):
+        size = count * 8
+        if self.pos + size > len(self.data):
+            raise GcovFormatError(f"{self.name}: unexpected end of file")
+        if self.order == '<':
+            values = list(struct.unpack_from(f'<{count}Q', self.data, self.pos))
+        else:
+            # Low word first, each word in the target's byte order
+            words = struct.unpack_from(f'>{count * 2}I', self.data, self.pos)
+            values = [words[i] | (words[i + 1] << 32) for i in range(0, count * 2, 2)]
+        self.pos += size
+        return values
+
+    def string(self):
+        length = self.unsigned()
+        size = length if self.byte_lengths else length * 4
+        if self.pos + size > len(self.data):
+            raise GcovFormatError(f"{self.name}: unexpected end of file")
+        raw = bytes(self.data[self.pos:self.pos + size])
+        self.pos += size
+        return raw.split(b'\0', 1)[0].decode('utf-8', 'replace')
+
+    def record_size(self, length):
+        return length if self.byte_lengths else length * 4
+
+
+class GcovFunction:
+    def __init__(self, ident, lineno_checksum, cfg_checksum, name, source, start_line, artificial):
+        self.ident = ident
+        self.lineno_checksum = lineno_checksum
+        self.cfg_checksum = cfg_checksum
+        self.name = name
+        self.source = source
+        self.start_line = start_line
+        self.artificial = artificial
+        self.block_count = 0
+        self.arcs = []          # [source block, destination block, flags]
+        self.block_lines = {}   # block -> [(source, line), ...]
+
+
+class GcovNotes:
+    def __init__(self, version, stamp, cwd, functions):
+        self.version = version
+        self.stamp = stamp
+        self.cwd = cwd
+        self.functions = functions
+
+
+class GcovCounts:
+    def __init__(self, version, stamp, functions):
+        self.version = version
+        self.stamp = stamp
+        self.functions = functions   # ident -> (lineno checksum, cfg checksum, arc counters)
+
+
+def read_notes(data, name='', base_dir=''):
+    # Parse a .gcno file (gcc 4.7 and later)
+    reader = _Reader(data, name, GCOV_NOTE_MAGIC)
+    stamp = reader.unsigned()
+    cwd = base_dir
+    if reader.major >= 12:
+        reader.unsigned()           # checksum
+    if reader.major >= 8:
+        cwd = reader.string() or base_dir
+        reader.unsigned()           # supports has_unexecuted_blocks
+
+    functions = []
+    function = None
+    while reader.remaining() >= 8:
+        tag = reader.unsigned()
+        length = reader.unsigned()
+        end = reader.pos + reader.record_size(length)
+
+        if tag == GCOV_TAG_FUNCTION:
+            ident = reader.unsigned()
+            lineno_checksum = reader.unsigned()
+            cfg_checksum = reader.unsigned()
+            function_name = reader.string()
+            artificial = reader.unsigned() if reader.major >= 8 else 0
+            source = reader.string()
+            start_line = reader.unsigned()
+            function = GcovFunction(ident, lineno_checksum, cfg_checksum, function_name,
+                                    _source_path(cwd, source), start_line, artificial)
+            functions.append(function)
+        elif function is None:
+            pass
+        elif tag == GCOV_TAG_BLOCKS:
+            if reader.major >= 8:
+                function.block_count = reader.unsigned()
+            else:
+                function.block_count = length
+        elif tag == GCOV_TAG_ARCS:
+            src = reader.unsigned()
+            for _ in range((reader.record_size(length) - 4) // 8):
+                dest = reader.unsigned()
+                flags = reader.unsigned()
+                function.arcs.append([src, dest, flags])
+        elif tag == GCOV_TAG_LINES:
+            block = reader.unsigned()
+            lines = function.block_lines.setdefault(block, [])
+            source = function.source
+            while reader.pos < end:
+                line = reader.unsigned()
+                if line:
+                    lines.append((source, line))
+                    continue
+                file_name = reader.string()
+                if not file_name:
+                    break
+                source = _source_path(cwd, file_name)
+
+        reader.pos = end
+
+    return GcovNotes(reader.version, stamp, cwd, functions)
+
+
+def read_counts(data, name=''):
+    # Parse a .gcda file, either from gcc's libgcov or from __gcov_exit
+    reader = _Reader(data, name, GCOV_DATA_MAGIC)
+    stamp = reader.unsigned()
+    if reader.major >= 12 and reader.remaining() >= 4:
+        # libgcov writes a checksum here since gcc 12, gcov_convert_to_gcda does not
+        next_word = struct.unpack_from(reader.order + 'I', reader.data, reader.pos)[0]
+        if next_word not in (GCOV_TAG_FUNCTION, GCOV_TAG_OBJECT_SUMMARY):
+            reader.unsigned()
+
+    functions = {}
+    current = None
+    while reader.remaining() >= 8:
+        tag = reader.unsigned()
+        length = reader.unsigned()
+
+        if tag == GCOV_TAG_FUNCTION and reader.byte_lengths and length == 3:
+            # gcov_convert_to_gcda always counts in words, whatever the compiler
+            reader.byte_lengths = False
+
+        # gcc 12 writes a negative length for a counter section that is all zero
+        signed_length = length - (1 << 32) if length & 0x80000000 else length
+        size = reader.record_size(signed_length)
+        end = reader.pos + max(size, 0)
+
+        if tag == GCOV_TAG_FUNCTION:
+            if length:
+                ident = reader.unsigned()
+                lineno_checksum = reader.unsigned()
+                cfg_checksum = reader.unsigned()
+                current = functions[ident] = (lineno_checksum, cfg_checksum, [])
+            else:
+                current = None
+        elif tag == GCOV_TAG_COUNTER_ARCS and current is not None:
+            if size < 0:
+                current[2].extend([0] * (-size // 8))
+            else:
+                current[2].extend(reader.counters(size // 8))
+
+        reader.pos = end
+
+    return GcovCounts(reader.version, stamp, functions)
+
+
+def _is_firmware_record(tag):
+    # The records gcov_convert_to_gcda writes: functions and counters
+    tag &= ~GCOV_TAG_SPARSE_FLAG
+    return tag == GCOV_TAG_FUNCTION or (tag & 0xffff == 0 and tag >= GCOV_TAG_COUNTER_BASE and tag >> 24 == 0x01)
+
+
+def expand_sparse_counters(data, name=''):
+    # The .gcda bytes gcov_convert_to_gcda would have written without
+    # GCOV_OPT_SPARSE_COUNTERS, identical to the full dump.  Data without
+    # sparse records is returned as it is, and so is anything that is not
+    # laid out like the firmware's output (lengths in words, the first
+    # function right after the stamp), such as libgcov's own .gcda files.
+    reader = _Reader(data, name, GCOV_DATA_MAGIC)
+    reader.unsigned()
+    word = struct.Struct(reader.order + 'I')
+    if reader.remaining() >= 4 and word.unpack_from(data, reader.pos)[0] != GCOV_TAG_FUNCTION:
+        return data
+
+    pieces = []
+    copied = 0
+    while reader.remaining() >= 8:
+        start = reader.pos
+        tag = reader.unsigned()
+        length = reader.unsigned()
+        if not _is_firmware_record(tag):
+            return data
+        if not tag & GCOV_TAG_SPARSE_FLAG:
+            reader.pos += length * 4
+            continue
+
+        count = reader.unsigned()
+        pairs = (length - 1) // 3
+        if length != 1 + pairs * 3 or reader.remaining() < pairs * 12:
+            raise GcovFormatError(f"{name}: bad sparse counter record")
+        words = [0] * (count * 2)
+        for _ in range(pairs):
+            index = reader.unsigned()
+            if index >= count:
+                raise GcovFormatError(f"{name}: sparse counter {index} of {count}")
+            words[index * 2] = reader.unsigned()
+            words[index * 2 + 1] = reader.unsigned()
+        pieces.append(data[copied:start])
+        pieces.append(struct.pack(f'{reader.order}{count * 2 + 2}I',
+                                  tag & ~GCOV_TAG_SPARSE_FLAG, count * 2, *words))
+        copied = reader.pos
+
+    if not pieces:
+        return data
+    pieces.append(data[copied:])
+    return b''.join(pieces)
+
+
+def _source_path(cwd, file_name):
+    if cwd and not os.path.isabs(file_name):
+        file_name = os.path.join(cwd, file_name)
+    return os.path.normpath(file_name)
+
+
+def _solve_arc_counts(function, counters):
+    # Arcs on the spanning tree have no counter; work them out from flow
+    # conservation (what enters a block leaves it), like gcov's solve_flow_graph.
+    if function.block_count <= ENTRY_BLOCK:
+        raise GcovFormatError(f"{function.name}: no blocks")
+    for block in function.block_lines:
+        if block >= function.block_count:
+            raise GcovFormatError(f"{function.name}: lines of unknown block {block}")
+    arc_counts = [None] * len(function.arcs)
+    succs = [[] for _ in range(function.block_count)]
+    preds = [[] for _ in range(function.block_count)]
+    next_counter = 0
+    for index, (src, dest, flags) in enumerate(function.arcs):
+        if src >= function.block_count or dest >= function.block_count:
+            raise GcovFormatError(f"{function.name}: arc to unknown block")
+        succs[src].append(index)
+        preds[dest].append(index)
+        if not flags & GCOV_ARC_ON_TREE:
+            if next_counter >= len(counters):
+                raise GcovFormatError(f"{function.name}: profile mismatch")
+            arc_counts[index] = counters[next_counter]
+            next_counter += 1
+    if next_counter != len(counters):
+        raise GcovFormatError(f"{function.name}: profile mismatch")
+
+    block_counts = [None] * function.block_count
+    pending = list(range(function.block_count))
+    while pending:
+        progress = False
+        still_pending = []
+        for block in pending:
+            if block_counts[block] is None and not preds[block] and not succs[block]:
+                block_counts[block] = 0
+            if block_counts[block] is None:
+                for arcs in (preds[block], succs[block]):
+                    if arcs and all(arc_counts[arc] is not None for arc in arcs):
+                        block_counts[block] = sum(arc_counts[arc] for arc in arcs)
+                        progress = True
+                        break
+            if block_counts[block] is None:
+                still_pending.append(block)
+                continue
+            for arcs in (preds[block], succs[block]):
+                unknown = [arc for arc in arcs if arc_counts[arc] is None]
+                if len(unknown) == 1:
+                    known = sum(arc_counts[arc] for arc in arcs if arc_counts[arc] is not None)
+                    arc_counts[unknown[0]] = max(block_counts[block] - known, 0)
+                    progress = True
+                elif unknown:
+                    still_pending.append(block)
+                    break
+        pending = still_pending
+        if pending and not progress:
+            raise GcovFormatError(f"{function.name}: graph is unsolvable")
+
+    return arc_counts, block_counts, preds, succs
+
+
+def _owner_line(lines):
+    # Highest line of the last source file named in the block
+    source = lines[-1][0]
+    return source, max(line for line_source, line in lines if line_source == source)
+
+
+def _cycles_count(function, blocks, arc_counts, succs):
+    # Port of gcov's get_cycles_count(): find the elementary cycles among the
+    # blocks of one line (Johnson's circuit search) and add the smallest arc
+    # count of each, taking it off the arcs of that cycle as we go.
+    cs_count = {arc: arc_counts[arc] for block in blocks for arc in succs[block]}
+    total = 0
+
+    def line_arcs(block, start):
+        for arc in sorted(succs[block], key=lambda arc: function.arcs[arc][1]):
+            dest = function.arcs[arc][1]
+            if dest >= start and dest in blocks and cs_count[arc] > 0:
+                yield arc, dest
+
+    def unblock(block, blocked, block_lists):
+        if block not in blocked:
+            return
+        index = blocked.index(block)
+        del blocked[index]
+        for waiting in block_lists.pop(index):
+            unblock(waiting, blocked, block_lists)
+
+    def circuit(block, start, path, blocked, block_lists):
+        nonlocal total
+        found = False
+        blocked.append(block)
+        block_lists.append([])
+        for arc, dest in line_arcs(block, start):
+            path.append(arc)
+            if dest == start:
+                cycle = min(cs_count[step] for step in path)
+                total += cycle
+                for step in path:
+                    cs_count[step] -= cycle
+                found = True
+            elif all(cs_count[step] > 0 for step in path) and dest not in blocked:
+                found = circuit(dest, start, path, blocked, block_lists) or found
+            path.pop()
+
+        if found:
+            unblock(block, blocked, block_lists)
+        else:
+            for arc, dest in line_arcs(block, start):
+                if dest in blocked:
+                    waiting = block_lists[blocked.index(dest)]
+                    if block not in waiting:
+                        waiting.append(block)
+        return found
+
+    for start in blocks:
+        circuit(start, start, [], [], [])
+    return total
+
+
+def compute_coverage(notes, counts):
+    # Combine notes and counts into FileCoverage objects keyed by source path
+    if counts is not None and counts.stamp != notes.stamp:
+        raise GcovFormatError("stamp mismatch with notes file")
+
+    files = {}
+
+    def file_for(source):
+        coverage = files.get(source)
+        if coverage is None:
+            coverage = files[source] = FileCoverage(source)
+        return coverage
+
+    for function in notes.functions:
+        if function.artificial:
+            continue
+
+        counters = []
+        if counts is not None and function.ident in counts.functions:
+            lineno_checksum, cfg_checksum, counters = counts.functions[function.ident]
+            if (lineno_checksum, cfg_checksum) != (function.lineno_checksum, function.cfg_checksum):
+                raise GcovFormatError(f"{function.name}: profile mismatch")
+        if not counters:
+            counters = [0] * sum(1 for _, _, flags in function.arcs if not flags & GCOV_ARC_ON_TREE)
+
+        arc_counts, block_counts, preds, succs = _solve_arc_counts(function, counters)
+
+        file_for(function.source).add_function(function.name, function.start_line, block_counts[ENTRY_BLOCK])
+
+        # gcov hands every block to the last line it covers (line lists are
+        # kept sorted).  Such a line counts the arcs entering its blocks from
+        # elsewhere plus the loops that stay on it; a line that owns no block
+        # just adds up the blocks it appears in.
+        owned_blocks = {}
+        block_sums = {}
+        for block, lines in function.block_lines.items():
+            if not lines:
+                continue
+            for key in set(lines):
+                block_sums[key] = block_sums.get(key, 0) + block_counts[block]
+            owner = _owner_line(lines)
+            owned_blocks.setdefault(owner, set()).add(block)
+
+        for key, total in block_sums.items():
+            blocks = owned_blocks.get(key)
+            if blocks:
+                entered = sum(arc_counts[arc] for block in blocks for arc in preds[block]
+                              if function.arcs[arc][0] not in blocks)
+                total = entered + _cycles_count(function, blocks, arc_counts, succs)
+            file_for(key[0]).add_line(key[1], total)
+
+        # Branches are reported on the line that owns the block they leave
+        branch_blocks = {}
+        for block in sorted(function.block_lines):
+            lines = function.block_lines[block]
+            if not lines:
+                continue
+            arcs = [arc for arc in succs[block] if not function.arcs[arc][2] & GCOV_ARC_FAKE]
+            if len(arcs) < 2:
+                continue
+            arcs.sort(key=lambda arc: function.arcs[arc][1])
+            source, line = _owner_line(lines)
+            branch_block = branch_blocks.get((source, line), 0)
+            branch_blocks[(source, line)] = branch_block + 1
+            for branch, arc in enumerate(arcs):
+                taken = arc_counts[arc] if block_counts[block] else None
+                file_for(source).add_branch(line, branch_block, branch, taken)
+
+    return files
+
+
+def capture_gcda(gcda_data, gcno_path, name=''):
+    # Coverage of one object from its .gcda bytes and the .gcno on disk
+    with open(gcno_path, 'rb') as gcno_file:
+        notes = read_notes(gcno_file.read(), gcno_path, os.path.dirname(gcno_path))
+    counts = read_counts(gcda_data, name or gcno_path)
+    try:
+        return list(compute_coverage(notes, counts).values())
+    except GcovFormatError as e:
+        # Name the object, the message only has the function
+        raise GcovFormatError(f"{name or gcno_path}: {e}") from None
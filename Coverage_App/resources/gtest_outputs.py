@@ -0,0 +1,63 @@
+import json
+from xml.sax.saxutils import quoteattr
+
+
+# Written next to main_test_report.html
+JUNIT_NAME = 'test_results.xml'
+JSON_NAME = 'test_results.json'
+
+# Test status in the parsed suite data -> JSON status
+_JSON_STATUS = {"Pass": "passed", "Fail": "failed", None: "no result"}
+
+
+def _seconds(duration_ms):
+    return f'{duration_ms / 1000:.3f}'
+
+
+def write_junit_xml(path, module_name, test_suite_data):
+    # JUnit XML (the Jenkins / GitLab flavour) of parse_gtest_output's
+    # suite records, written one test case at a time.  A test that was
+    # started but has no OK or FAILED line, because the target crashed or
+    # the log was cut, is reported as an error.
+    tests = sum(suite[1] for suite in test_suite_data)
+    failures = sum(suite[2] for suite in test_suite_data)
+    errors = sum(1 for suite in test_suite_data for test_case in suite[4] if test_case["status"] is None)
+    with open(path, 'w', encoding='utf-8', buffering=1 << 16) as xml_file:
+        xml_file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        xml_file.write(f'<testsuites name={quoteattr(module_name or "")} tests="{tests}" '
+                       f'failures="{failures}" errors="{errors}">\n')
+        for test_suite, test_case_count, failed_count, _, test_cases, duration_ms in test_suite_data:
+            suite_errors = sum(1 for test_case in test_cases if test_case["status"] is None)
+            time = f' time="{_seconds(duration_ms)}"' if duration_ms is not None else ''
+            xml_file.write(f'  <testsuite name={quoteattr(test_suite)} tests="{test_case_count}" '
+                           f'failures="{failed_count}" errors="{suite_errors}"{time}>\n')
+            for test_case in test_cases:
+                time = f' time="{_seconds(test_case["duration_ms"])}"' if test_case["duration_ms"] is not None else ''
+                opening = f'    <testcase classname={quoteattr(test_suite)} name={quoteattr(test_case["name"])}{time}'
+                if test_case["status"] == "Pass":
+                    xml_file.write(opening + '/>\n')
+                elif test_case["status"] == "Fail":
+                    xml_file.write(opening + '>\n      <failure message="Failed"/>\n    </testcase>\n')
+                else:
+                    xml_file.write(opening + '>\n      <error message="No result in the log"/>\n    </testcase>\n')
+            xml_file.write('  </testsuite>\n')
+        xml_file.write('</testsuites>\n')
+
+
+def write_results_json(path, module_name, test_suite_data, total_test_suites, total_test_cases,
+                       total_passed_testcase, total_failed_testcase):
+    # The same records as compact JSON, one suite per line:
+    # {"module", "totals": {...}, "suites": [{"name", "tests", "passed",
+    # "failed", "duration_ms", "cases": [{"name", "status", "duration_ms"}]}]}
+    totals = {'suites': total_test_suites, 'tests': total_test_cases,
+              'passed': total_passed_testcase, 'failed': total_failed_testcase}
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    with open(path, 'w', encoding='utf-8', buffering=1 << 16) as json_file:
+        json_file.write(f'{{"module":{dumps(module_name)},"totals":{dumps(totals)},"suites":[')
+        for index, (test_suite, test_case_count, failed_count, passed_count, test_cases, duration_ms) in enumerate(test_suite_data):
+            suite = {'name': test_suite, 'tests': test_case_count, 'passed': passed_count, 'failed': failed_count,
+                     'duration_ms': duration_ms,
+                     'cases': [{'name': test_case["name"], 'status': _JSON_STATUS[test_case["status"]],
+                                'duration_ms': test_case["duration_ms"]} for test_case in test_cases]}
+            json_file.write((',\n' if index else '\n') + dumps(suite))
+        json_file.write('\n]}\n')
@@ -0,0 +1,576 @@
+import heapq
+import json
+import os
+import re
+
+from gtest_outputs import JSON_NAME, JUNIT_NAME, write_junit_xml, write_results_json
+from templates import SOURCES, write_page
+from timing import TimedCall, timed
+from worker_pool import map_ordered
+
+
+TOTAL_TESTS_RE = re.compile(r'Running (\d+) tests? from (\d+) test suites?')
+MODULE_NAME_RE = re.compile(r'/Application/(\w+)/UnitTest/')
+SUITE_NAME_RE = re.compile(r'from (\S+)')
+# "(12 ms)" after OK / FAILED, "(34 ms total)" on a suite footer
+DURATION_RE = re.compile(r'\((-?\d+) ms(?: total)?\)\s*$')
+
+# Anything outside 0 ms .. a day comes from a wrapped or unset RTT timer
+# (DemoTest.txt has 170506269550 ms and negative totals) and is dropped
+MAX_DURATION_MS = 24 * 3600 * 1000
+
+# Tests listed on the slowest tests page
+SLOWEST_TESTS = 50
+
+# Bounds (ms) of the duration histogram on the suite pages
+HISTOGRAM_BOUNDS = (1, 10, 100, 1000, 10000)
+
+# A suite regressed when it took this much longer than in the previous run,
+# both relatively and in ms (short suites jitter by a few ms)
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_MS = 5
+
+# Per-suite and per-test durations of the last run, next to the report
+DURATIONS_NAME = 'test_durations.json'
+
+# Suite pages handed to a worker at a time
+SUITES_PER_BATCH = 100
+
+# Characters read between two progress updates
+PROGRESS_STEP = 1 << 20
+
+SOURCES['main_test_report.html'] = '''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Test Report</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                    background-color: #f4f4f4;
+                }
+
+                h1 {
+                    color: #007BFF;
+                    text-align: center;
+                }
+
+                h2 {
+                    color: #333;
+                    text-align: center;
+                }
+
+                table {
+                    border-collapse: collapse;
+                    width: 80%;
+                    margin-top: 20px;
+                    margin-left: auto;
+                    margin-right: auto;
+                }
+
+                th, td {
+                    border: 1px solid #ddd;
+                    padding: 12px;
+                    text-align: left;
+                }
+
+                th {
+                    background-color: #007BFF;
+                    color: white;
+                }
+
+                a {
+                    text-decoration: none;
+                    color: #007BFF;
+                }
+
+                .total-info {
+                    font-weight: bold;
+                    font-size: 18px;
+                    margin-bottom: 20px;
+                    text-align: center;
+                }
+                .tab { 
+                    display: inline-block; 
+                    margin-left: 150px; 
+                } 
+
+                span.regressed {
+                    color: #dc3545;
+                    font-weight: bold;
+                }
+            </style>
+        </head>
+        <body>
+            <h1>Test Report</h1>
+            <div class="total-info">
+                <p>Total Test Suites: {{ total_test_suites }}
+                <span class="tab"></span>
+                Total Test Cases: {{ total_test_cases }}</p>
+                Total Pass: {{ total_passed_testcase }}</p>
+                Total Fail: {{ total_failed_testcase }}</p>
+                <a href="slowest_tests.html">Slowest Tests</a>
+            </div>
+
+            <table>
+                <tr>
+                    <th>Test Suite</th>
+                    <th>Number of Test Cases</th>
+                    <th>Number of Passed Test Cases</th>
+                    <th>Number of Failed Test Cases</th>
+                    <th>Duration</th>
+                </tr>
+                {% for test_suite, test_case_count, failed_count, passed_count, _, duration_ms in test_suite_data %}
+                    <tr>
+                        <td><a href="{{ test_suite }}.html" style="color: {% if failed_count > 0 %}red{% else %}#007BFF{% endif %}">{{ test_suite }}</a></td>
+                        <td>{{ test_case_count }}</td>
+                        <td>{{ passed_count }}</td>
+                        <td>{{ failed_count }}</td>
+                        <td>
+                            {% if duration_ms is not none %}{{ duration_ms }} ms{% else %}-{% endif %}
+                            {% if test_suite in regressions %}
+                                <span class="regressed">slower, was {{ regressions[test_suite] }} ms</span>
+                            {% endif %}
+                        </td>
+                    </tr>
+                {% endfor %}
+            </table>
+        </body>
+        </html>
+        '''
+
+SOURCES['suite_test_report.html'] = '''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>{{ test_suite }} Test Suite</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                    background-color: #f4f4f4;
+                }
+
+                h2 {
+                    color: #333;
+                    text-align: center;
+                }
+
+                h3 {
+                    color: #333;
+                    text-align: center;
+                }
+
+                table {
+                    border-collapse: collapse;
+                    width: 80%;
+                    margin-top: 20px;
+                    margin-left: auto;
+                    margin-right: auto;
+                }
+
+                th, td {
+                    border: 1px solid #ddd;
+                    padding: 12px;
+                    text-align: left;
+                }
+
+                th {
+                    background-color: #007BFF;
+                    color: white;
+                }
+
+                td.test-case-name {
+                    color: #007BFF;
+                }
+
+                span.pass {
+                    color: #28a745;
+                    font-weight: bold;
+                }
+
+                span.fail {
+                    color: #dc3545;
+                    font-weight: bold;
+                }
+
+                div.bar {
+                    background-color: #007BFF;
+                    height: 12px;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Total Test Cases in {{ test_suite }}: {{ test_case_count }}</h2>
+            <h3>Number of Passed Test Cases: {{ passed_count }}</h3>
+            <h3>Number of Failed Test Cases: {{ failed_count }}</h3>
+
+            <table>
+                <tr>
+                    <th>Duration</th>
+                    <th>Test Cases</th>
+                    <th></th>
+                </tr>
+                {% for label, count in histogram %}
+                    <tr>
+                        <td>{{ label }}</td>
+                        <td>{{ count }}</td>
+                        <td><div class="bar" style="width: {{ (100 * count / histogram_max) | round(1) }}%"></div></td>
+                    </tr>
+                {% endfor %}
+            </table>
+
+            <table>
+                <tr>
+                    <th>Test Case Name</th>
+                    <th>Status</th>
+                    <th>Duration</th>
+                </tr>
+                {% for test_case in test_cases %}
+                    <tr>
+                        <td class="test-case-name">{{ test_case["name"] }}</td>
+                        <td>
+                            {% if test_case["status"] == "Pass" %}
+                                <span class="pass">Pass</span>
+                            {% else %}
+                                <span class="fail">Fail</span>
+                            {% endif %}
+                        </td>
+                        <td>{% if test_case["duration_ms"] is not none %}{{ test_case["duration_ms"] }} ms{% else %}-{% endif %}</td>
+                    </tr>
+                {% endfor %}
+            </table>
+        </body>
+        </html>
+        '''
+
+SOURCES['slowest_tests.html'] = '''
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Slowest Tests</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                    background-color: #f4f4f4;
+                }
+
+                h2 {
+                    color: #333;
+                    text-align: center;
+                }
+
+                table {
+                    border-collapse: collapse;
+                    width: 80%;
+                    margin-top: 20px;
+                    margin-left: auto;
+                    margin-right: auto;
+                }
+
+                th, td {
+                    border: 1px solid #ddd;
+                    padding: 12px;
+                    text-align: left;
+                }
+
+                th {
+                    background-color: #007BFF;
+                    color: white;
+                }
+
+                a {
+                    text-decoration: none;
+                    color: #007BFF;
+                }
+            </style>
+        </head>
+        <body>
+            <h2>Slowest {{ tests | length }} Tests</h2>
+            {% if unknown %}<h2>{{ unknown }} tests without a usable duration</h2>{% endif %}
+
+            <table>
+                <tr>
+                    <th>Test Suite</th>
+                    <th>Test Case Name</th>
+                    <th>Status</th>
+                    <th>Duration</th>
+                </tr>
+                {% for test_suite, test_case in tests %}
+                    <tr>
+                        <td><a href="{{ test_suite }}.html">{{ test_suite }}</a></td>
+                        <td>{{ test_case["name"] }}</td>
+                        <td>{{ test_case["status"] or "-" }}</td>
+                        <td>{{ test_case["duration_ms"] }} ms</td>
+                    </tr>
+                {% endfor %}
+            </table>
+        </body>
+        </html>
+        '''
+
+
+def parse_duration(line):
+    # The "(N ms)" at the end of a line, None if missing or implausible
+    duration_match = DURATION_RE.search(line)
+    if not duration_match:
+        return None
+    duration_ms = int(duration_match.group(1))
+    return duration_ms if 0 <= duration_ms <= MAX_DURATION_MS else None
+
+
+def duration_histogram(test_cases):
+    # [(label, number of tests)] over HISTOGRAM_BOUNDS, tests without a
+    # usable duration last
+    labels = [f"< {HISTOGRAM_BOUNDS[0]} ms"]
+    labels += [f"{low} - {high} ms" for low, high in zip(HISTOGRAM_BOUNDS, HISTOGRAM_BOUNDS[1:])]
+    labels += [f">= {HISTOGRAM_BOUNDS[-1]} ms", "unknown"]
+    counts = [0] * len(labels)
+    for test_case in test_cases:
+        duration_ms = test_case.get("duration_ms")
+        if duration_ms is None:
+            counts[-1] += 1
+        else:
+            counts[sum(1 for bound in HISTOGRAM_BOUNDS if duration_ms >= bound)] += 1
+    return list(zip(labels, counts))
+
+
+def load_durations(path):
+    # {'suites': {suite: ms}, 'tests': {"suite.test": ms}} of an earlier
+    # run, empty when there is none
+    try:
+        with open(path) as durations_file:
+            return json.load(durations_file)
+    except (OSError, ValueError):
+        return {'suites': {}, 'tests': {}}
+
+
+def find_regressions(test_suite_data, previous):
+    # {suite: previous ms} of the suites that took REGRESSION_RATIO times
+    # longer, and REGRESSION_MIN_MS more, than in `previous`
+    regressions = {}
+    previous_suites = previous.get('suites', {})
+    for test_suite, _, _, _, _, duration_ms in test_suite_data:
+        before = previous_suites.get(test_suite)
+        if duration_ms is None or before is None:
+            continue
+        if duration_ms > before * REGRESSION_RATIO and duration_ms - before >= REGRESSION_MIN_MS:
+            regressions[test_suite] = before
+    return regressions
+
+
+def find_module_name(log_path):
+    # Module of the first "Running main()" line, reading no further than that
+    with open(log_path, 'r', errors='replace') as log_file:
+        for line in log_file:
+            if "Running main()" in line:
+                module_name_match = MODULE_NAME_RE.search(line)
+                return module_name_match.group(1) if module_name_match else None
+    return None
+
+
+def _set_duration(test_case, line):
+    # The summary at the end repeats FAILED lines without a duration
+    duration_ms = parse_duration(line)
+    if duration_ms is not None:
+        test_case["duration_ms"] = duration_ms
+
+
+def _suite_duration(footer_ms, test_cases):
+    # The footer's total, or the sum of the tests when every one is known
+    if footer_ms is not None:
+        return footer_ms
+    durations = [test_case["duration_ms"] for test_case in test_cases]
+    if not durations or None in durations:
+        return None
+    return sum(durations)
+
+
+def _write_suite_pages(batch):
+    # Runs in a worker: one batch of suite pages into full_path
+    full_path, test_suite_data = batch
+    for test_suite, test_case_count, failed_count, passed_count, test_cases, duration_ms in test_suite_data:
+        histogram = duration_histogram(test_cases)
+        write_page(os.path.join(full_path, f'{test_suite}.html'), 'suite_test_report.html',
+                   test_suite=test_suite, test_case_count=test_case_count, failed_count=failed_count, passed_count=passed_count, test_cases=test_cases,
+                   histogram=histogram, histogram_max=max(count for _, count in histogram) or 1)
+    return len(test_suite_data)
+
+
+def _reporting_reads(lines, total, progress):
+    # Passes the lines through, publishing how much of the log was read
+    read = reported = 0
+    for line in lines:
+        read += len(line)
+        if read - reported >= PROGRESS_STEP:
+            reported = read
+            progress.update('parse', read, total, 'bytes')
+        yield line
+    progress.update('parse', read, total, 'bytes', final=True)
+
+
+class GTestReportGenerator:
+    def __init__(self, reports_dir=None, jobs=1):
+        self.submodulepath='States'
+        self.jobs = jobs  # Worker processes for the suite pages
+        # Reports/<module>/TestReport is written below this directory
+        self.reports_dir = reports_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Reports')
+        self.module_name = None
+    def parse_gtest_output(self,gtest_output):
+        # gtest_output is any iterable of lines, normally the open log file.
+        # The log is read once and only the per-suite records are kept, so
+        # memory does not grow with the hex dump that follows the tests.
+        total_test_cases = 0
+        total_test_suites = 0
+        total_test_info_seen = False
+        total_failed_testcase = 0
+        total_passed_testcase = 0
+
+        test_suite_data = []
+        current_test_suite = None
+        test_cases = []
+        failed_test_cases = 0
+        passed_test_cases = 0
+
+        for line in gtest_output:
+            # Hex dump lines ("00000010: 03 00 ...") are most of a log with
+            # coverage data and never hold test output
+            if line[8:9] == ':' or not line.strip():
+                continue
+
+            if not total_test_info_seen and "tests from" in line:
+                # The first such line has the totals
+                total_test_info_seen = True
+                total_test_match = TOTAL_TESTS_RE.search(line)
+                if total_test_match:
+                    total_test_cases = int(total_test_match.group(1))
+                    total_test_suites = int(total_test_match.group(2))
+
+            if "Running main()" in line:
+                # Extract the module name
+                module_name_match = MODULE_NAME_RE.search(line)
+                self.module_name = module_name_match.group(1) if module_name_match else None
+            if "[----------]" in line and ("tests from" in line or "test from" in line):
+                if current_test_suite is not None:
+                    # A footer ("... (34 ms total)") has the suite's duration
+                    duration_ms = _suite_duration(parse_duration(line) if "ms total" in line else None, test_cases)
+                    test_suite_data.append((current_test_suite, len(test_cases), failed_test_cases, passed_test_cases, test_cases, duration_ms))
+                    test_cases = []
+                    total_failed_testcase+=failed_test_cases
+                    total_passed_testcase+=passed_test_cases
+                    failed_test_cases = 0
+                    passed_test_cases = 0
+                current_test_suite_match = SUITE_NAME_RE.search(line)
+                current_test_suite = current_test_suite_match.group(1) if current_test_suite_match else None
+            elif "[ RUN      ]" in line:
+                test_case_name = line.split()[-1].split('.')[-1]  # Extract only the test case name
+                test_cases.append({"name": test_case_name, "status": None, "duration_ms": None})
+            elif "[       OK ]" in line:
+                if test_cases:
+                    test_cases[-1]["status"] = "Pass"
+                    passed_test_cases += 1
+                    _set_duration(test_cases[-1], line)
+            elif "[  FAILED  ]" in line:
+                if test_cases:  # Check if there are any test cases recorded
+                    test_cases[-1]["status"] = "Fail"
+                    failed_test_cases += 1
+                    _set_duration(test_cases[-1], line)
+
+        if current_test_suite is not None:
+            test_suite_data.append((current_test_suite, len(test_cases), failed_test_cases, passed_test_cases, test_cases,
+                                    _suite_duration(None, test_cases)))
+
+        # Remove lines with "total): 0 test cases"
+        test_suite_data = [suite for suite in test_suite_data if suite[1] > 0]
+
+        return test_suite_data, total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase 
+
+
+    def report_path(self):
+        # Reports/<module>/TestReport, created on first use
+        full_path = os.path.abspath(os.path.join(self.reports_dir, self.module_name ,'TestReport'))
+        os.makedirs(full_path, exist_ok=True)
+        return full_path
+
+    def generate_main_html_report(self,test_suite_data, total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase, regressions=None):
+        write_page(os.path.join(self.report_path(), 'main_test_report.html'), 'main_test_report.html',
+                   test_suite_data=test_suite_data, total_test_suites=total_test_suites, total_test_cases=total_test_cases, total_passed_testcase=total_passed_testcase, total_failed_testcase=total_failed_testcase,
+                   regressions=regressions or {})
+
+    def generate_machine_readable_reports(self, test_suite_data, total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase):
+        # test_results.xml (JUnit) and test_results.json for CI tools
+        full_path = self.report_path()
+        write_junit_xml(os.path.join(full_path, JUNIT_NAME), self.module_name, test_suite_data)
+        write_results_json(os.path.join(full_path, JSON_NAME), self.module_name, test_suite_data,
+                           total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase)
+
+    def generate_timing_reports(self, test_suite_data, baseline_path=None):
+        # The slowest tests page, and the durations of this run for the
+        # next one to compare with.  Suites are compared with baseline_path,
+        # by default the durations the previous run left in the report.
+        # Returns {suite: previous ms} of the suites that got slower.
+        full_path = self.report_path()
+        durations_path = os.path.join(full_path, DURATIONS_NAME)
+        regressions = find_regressions(test_suite_data, load_durations(baseline_path or durations_path))
+
+        timed_tests = [(suite[0], test_case) for suite in test_suite_data for test_case in suite[4]
+                       if test_case["duration_ms"] is not None]
+        unknown = sum(suite[1] for suite in test_suite_data) - len(timed_tests)
+        write_page(os.path.join(full_path, 'slowest_tests.html'), 'slowest_tests.html',
+                   tests=heapq.nlargest(SLOWEST_TESTS, timed_tests, key=lambda item: item[1]["duration_ms"]), unknown=unknown)
+
+        durations = {'suites': {suite[0]: suite[5] for suite in test_suite_data if suite[5] is not None},
+                     'tests': {f'{test_suite}.{test_case["name"]}': test_case["duration_ms"] for test_suite, test_case in timed_tests}}
+        with open(durations_path, 'w') as durations_file:
+            json.dump(durations, durations_file, indent=1, sort_keys=True)
+        return regressions
+
+    def generate_suite_html_report(self,test_suite, test_case_count, failed_count, passed_count, test_cases, duration_ms=None):
+        _write_suite_pages((self.report_path(), [(test_suite, test_case_count, failed_count, passed_count, test_cases, duration_ms)]))
+
+    def generate_suite_html_reports(self, test_suite_data, jobs=1, progress=None, timings=None):
+        # All suite pages, in batches spread over `jobs` worker processes
+        full_path = self.report_path()
+        batches = [(full_path, test_suite_data[start:start + SUITES_PER_BATCH])
+                   for start in range(0, len(test_suite_data), SUITES_PER_BATCH)]
+        write_batch = _write_suite_pages if timings is None else TimedCall(_write_suite_pages, 'page batch')
+        written = 0
+        with timed(timings, 'pages', len(test_suite_data)):
+            for pages in map_ordered(write_batch, batches, jobs if len(batches) > 1 else 1):
+                if timings is not None:
+                    pages, span = pages
+                    span.items = pages
+                    timings.add(span)
+                written += pages
+                if progress is not None:
+                    progress.update('pages', written, len(test_suite_data), 'pages')
+
+    def handle_testreport(self, selected_file_path, progress=None, timings=None, baseline_path=None):
+            # Parses the log and writes every page of the test report.
+            # Returns (module name, (suites, passed, failed), regressions),
+            # regressions as (suite, duration ms, baseline ms) by suite.
+            # Without a module name in the log nothing is written and the
+            # name is None.
+            with timed(timings, 'parse') as span, open(selected_file_path , 'r', errors='replace') as file:
+                lines = file if progress is None else _reporting_reads(file, os.path.getsize(selected_file_path), progress)
+                test_suite_data, total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase  = self.parse_gtest_output(lines)
+                if span is not None:
+                    span.items = len(test_suite_data)
+            counts = (len(test_suite_data), total_passed_testcase, total_failed_testcase)
+            if self.module_name is None:
+                return None, counts, []
+            regressions = self.generate_timing_reports(test_suite_data, baseline_path)
+            self.generate_main_html_report(test_suite_data, total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase, regressions)
+            self.generate_machine_readable_reports(test_suite_data, total_test_suites, total_test_cases, total_passed_testcase, total_failed_testcase)
+            self.generate_suite_html_reports(test_suite_data, self.jobs, progress, timings)
+            durations = {suite[0]: suite[5] for suite in test_suite_data}
+            return self.module_name, counts, [(test_suite, durations[test_suite], before)
+                                              for test_suite, before in sorted(regressions.items())]
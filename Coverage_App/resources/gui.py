@@ -0,0 +1,486 @@
+import tkinter as tk
+from tkinter import filedialog
+from tkinter import ttk
+import queue
+import subprocess
+import os
+import time
+
+from progress import Progress
+from timing import TRACE_NAME, Timings
+
+
+# Part of the progress bar (start, end) each pipeline stage fills
+STAGE_SPANS = {
+    'decode': (0, 40),
+    'capture': (40, 75),
+    'merge': (75, 85),
+    'render': (85, 100),
+    'parse': (0, 60),
+    'pages': (60, 100),
+}
+
+# Stages of the test report, the others belong to the coverage report
+TEST_STAGES = ('parse', 'pages')
+
+# Error lines listed on the error screen, the rest are printed only
+MAX_ERRORS_SHOWN = 10
+
+
+class TextFileSelectorApp:
+    def __init__(self, master, gtest_report_generator=None, jobs=1, record_timings=False):
+        self.master = master
+        self.master.title("Report Generator")
+        self.jobs = jobs  # Worker processes used for the coverage capture
+        self.record_timings = record_timings  # Write Reports/<module>/timings.json
+        self.timings = None
+        self.script_running = False  # Flag to track whether the script is running
+        self.generate_button = None  # Initialize to None
+        self.coverage_var = tk.IntVar()
+        self.test_var = tk.IntVar()
+
+        # Initialize frames
+        self.file_selector_frame = tk.Frame(self.master)
+        self.second_screen_frame = None  # Initialize to None
+        self.selected_folder = ''  # Initialize selected_folder
+
+        # Created on first use, the report modules are slow to import
+        self.gtest_report_generator = gtest_report_generator
+
+        # Progress events and finished tasks arrive on the task threads and
+        # are shown from here
+        self.progress_events = queue.Queue()
+        self.blocks_expected = None
+        self.scheduler = None
+        self.pipeline_progress = {}
+
+        # Set up the file selector frame
+        self.setup_file_selector_frame()
+
+    def setup_file_selector_frame(self):
+
+        # Get the absolute path to the script
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+
+        # Specify the relative path to the image file
+        image_path = os.path.join(script_dir, 'open_file_image.png')
+        # Load an image for the Open File button.  Tk reads the PNG itself,
+        # PIL is only needed (and imported) when it has to be resized.
+        open_photo = tk.PhotoImage(file=image_path)  # Replace "open_file_image.png" with your image file
+        if (open_photo.width(), open_photo.height()) != (100, 100):
+            from PIL import Image, ImageTk
+            open_photo = ImageTk.PhotoImage(Image.open(image_path).resize((100, 100)))
+
+        # Create and configure the Open File button with the image and text
+        open_button = tk.Button(self.file_selector_frame, text="Open File", image=open_photo, compound=tk.TOP, command=self.open_file_dialog, bd=0, relief=tk.FLAT)
+        open_button.image = open_photo  # Keep a reference to the image
+        open_button.pack(pady=20)
+
+        # Center the file selector frame within the main window
+        self.file_selector_frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+
+    def open_file_dialog(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("Gcov binary dumps", "*.bin"), ("All files", "*")])
+        if file_path:
+            print(f"Selected file: {file_path}")
+            self.selected_file_path = file_path  # Store the selected file path for later use
+            self.show_second_screen()
+
+    def show_second_screen(self):
+        # Hide the file selector frame
+        self.file_selector_frame.place_forget()
+
+        # Destroy the existing second screen frame if it exists
+        if self.second_screen_frame:
+            self.second_screen_frame.destroy()
+
+        # Extract the module name, the log is only read up to its first "Running main()"
+        from gtest_report import find_module_name
+        self.module_name = find_module_name(self.selected_file_path)
+
+        # Set up the second screen frame
+        self.setup_second_screen_frame(selected_folder=self.selected_folder)
+
+        # Show the second screen frame
+        self.second_screen_frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+
+
+    def setup_second_screen_frame(self, selected_folder):
+        # Create a new instance of the second screen frame
+        self.second_screen_frame = tk.Frame(self.master)
+
+        # Create and configure Coverage Report checkbox
+        coverage_checkbox = tk.Checkbutton(self.second_screen_frame, text="Coverage Report", variable=self.coverage_var, font=("Arial", 15), anchor="w", height=3, width=20)
+        coverage_checkbox.pack()
+
+        # Create and configure Test Report checkbox
+        test_checkbox = tk.Checkbutton(self.second_screen_frame, text="Test Report", variable=self.test_var, font=("Arial", 15), anchor="w", height=3, width=20)
+        test_checkbox.pack()
+
+        # Create progress bar
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(self.second_screen_frame, variable=self.progress_var, maximum=100)
+        self.progress_bar.pack(pady=10)
+        self.progress_label = tk.Label(self.second_screen_frame, text="")
+
+        # Create a frame for Back and Generate buttons
+        button_frame = tk.Frame(self.second_screen_frame)
+
+        # Create and configure the Generate button
+        self.generate_button = tk.Button(button_frame, text="Generate", command=self.generate_reports, bd=0, relief=tk.FLAT, bg="#7f8285", fg="white", font=("Arial", 10))
+        self.generate_button.pack(side="left", padx=10)
+
+        # Create and configure the Back button
+        self.back_button = tk.Button(button_frame, text="Back", command=self.show_file_selector_frame, bd=0, relief=tk.FLAT, bg="#7f8285", fg="white", font=("Arial", 10))
+        self.back_button.pack(side="left", padx=10)
+
+        # Shown next to them while reports are running
+        self.cancel_button = tk.Button(button_frame, text="Cancel", command=self.cancel_reports, bd=0, relief=tk.FLAT, bg="#7f8285", fg="white", font=("Arial", 10))
+
+        # Pack the button frame
+        button_frame.pack(pady=20)
+
+        # Hide the progress bar initially
+        self.progress_bar.pack_forget()
+
+        # Create a menu bar
+        menu_bar = tk.Menu(self.second_screen_frame)
+
+        # Create a "File" menu
+        file_menu = tk.Menu(menu_bar, tearoff=0)
+        file_menu.add_command(label="Coverage Report", command=lambda: self.open_report(selected_folder, "coverage"))
+        file_menu.add_command(label="Test Report", command=lambda: self.open_report(selected_folder, "test"))
+
+        # Add the "File" menu to the menu bar
+        menu_bar.add_cascade(label="Open", menu=file_menu)
+
+        # Set the menu bar for the second screen frame
+        self.master.config(menu=menu_bar)
+
+
+    def perform_operation(self, selected_folder):
+        # Implement your logic to perform an operation with the selected folder
+        print(f"Performing operation with folder: {selected_folder}")
+
+                # Create a new window to display options
+        options_window = tk.Toplevel(self.master)
+        options_window.title("Select Report Type")
+
+        # Create buttons for Test Report and Coverage Report
+        test_button = tk.Button(options_window, text="Test Report", command=lambda: self.open_report(selected_folder, "test"))
+        coverage_button = tk.Button(options_window, text="Coverage Report", command=lambda: self.open_report(selected_folder, "coverage"))
+
+        # Pack the buttons
+        test_button.pack(pady=10)
+        coverage_button.pack(pady=10)
+
+
+    def open_report(self, selected_folder, report_type):
+        # Implement logic to open the selected report type in the default web browser
+        print(f"Opening {report_type} report for folder: {selected_folder}")
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        # Construct the HTML file path based on the selected report type
+        if report_type == "test":
+            selected_folder = "TestReport"
+            html_file_path = os.path.join(script_dir, "Reports", self.module_name, selected_folder, "main_test_report.html")
+        elif report_type == "coverage":
+            selected_folder = "CoverageReport"
+            html_file_path = os.path.join(script_dir, "Reports", self.module_name, selected_folder, "index.html")
+        else:
+            return  # Invalid report type
+
+        # Check if the HTML file exists before opening
+        if os.path.exists(html_file_path):
+            try:
+                # Use subprocess to open the HTML file in the default web browser
+                subprocess.run(["explorer.exe", html_file_path.replace("/", "\\")], check=True)
+            except subprocess.CalledProcessError as e:
+                print(f"Error opening web browser: {e}")
+        else:
+            print(f"{report_type} report not found in {selected_folder}")
+
+
+    def generate_reports(self):
+        # Check the selected checkboxes and run the reports as tasks of one
+        # job, at the same time and off the Tk thread
+        if not hasattr(self, 'selected_file_path') or self.script_running:
+            return
+        if self.coverage_var.get() != 1 and self.test_var.get() != 1:
+            return
+        from scheduler import Scheduler
+
+        # Set the flag to indicate that the script is running
+        self.script_running = True
+        self.generate_button['state'] = tk.DISABLED
+        self.back_button['state'] = tk.DISABLED
+        self.cancel_button['state'] = tk.NORMAL
+        self.cancel_button.pack(side="left", padx=10)
+        self.show_progress_bar()
+        self.timings = Timings() if self.record_timings else None
+
+        self.scheduler = Scheduler()
+        self.pipeline_progress = {}
+        self.blocks_expected = None
+        if self.coverage_var.get() == 1:
+            self.pipeline_progress['coverage'] = 0.0
+            self.scheduler.add('coverage', self.run_coverage_report)
+        if self.test_var.get() == 1:
+            self.pipeline_progress['test'] = 0.0
+            self.scheduler.add('test', self.run_test_report)
+
+        # Follow the progress and the finished tasks from the Tk thread
+        self.update_progress()
+
+    def cancel_reports(self):
+        # Stops the running reports at their next progress event
+        if self.script_running:
+            print("Cancelling...")
+            self.cancel_button['state'] = tk.DISABLED
+            self.scheduler.cancel()
+
+    def task_progress(self, token):
+        # Progress of one task: its events go to the progress bar and check
+        # the task's token, so Cancel also stops a stage at its next event
+        progress = Progress()
+        progress.subscribe(self.progress_events.put)
+        progress.subscribe(token.check)
+        return progress
+
+    def run_test_report(self, token):
+        # Runs as a task: parse the test log and write the test report.
+        # Returns the module name.
+        print("Generating Test Report...")
+        if self.gtest_report_generator is None:
+            from gtest_report import GTestReportGenerator
+            self.gtest_report_generator = GTestReportGenerator(jobs=self.jobs)
+        token.check()
+        module_name, _, _ = self.gtest_report_generator.handle_testreport(self.selected_file_path,
+                                                                          progress=self.task_progress(token),
+                                                                          timings=self.timings)
+        if module_name is None:
+            raise ValueError("No module name found in the test output")
+        return module_name
+
+    def run_coverage_report(self, token):
+        # Runs as a task: decode the serial log, capture the coverage of
+        # every object and draw the report.  Returns (application name,
+        # messages).
+        from coverage_pipeline import run_coverage
+        from capture_cache import CaptureCache
+        from path_resolver import DEFAULT_CONFIG_NAME, load_resolver
+
+        # A path_map.json next to the scripts maps the target's paths onto this build tree
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        config_path = os.path.join(script_dir, DEFAULT_CONFIG_NAME)
+        resolver = load_resolver(config_path if os.path.exists(config_path) else None)
+
+        token.check()
+        return run_coverage(self.selected_file_path, os.path.join(script_dir, "Reports"), self.jobs,
+                            progress=self.task_progress(token), timings=self.timings, resolver=resolver,
+                            cache=CaptureCache())
+
+    def write_timings(self, module_name):
+        # The stages timed so far, next to the module's reports
+        if self.timings is not None and module_name:
+            reports_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Reports")
+            print(f"Timings: {self.timings.write_trace(os.path.join(reports_dir, module_name, TRACE_NAME))}")
+            for line in self.timings.lines():
+                print(line)
+
+    def update_progress(self):
+        # Update the progress bar while the reports are running
+        self.show_progress_events()
+        while True:
+            try:
+                task = self.scheduler.results.get_nowait()
+            except queue.Empty:
+                break
+            print(f"{task.name} report {task.state}")
+            if task.state == 'done':
+                self.pipeline_progress[task.name] = 1.0
+        if self.scheduler.finished:
+            self.process_completed(self.scheduler.tasks)
+        else:
+            # Schedule the next update after a short delay
+            self.master.after(100, self.update_progress)
+
+    def show_progress_events(self):
+        # Move the progress bar to the latest event of the running stages,
+        # the bar is the mean of the reports of the job
+        latest = None
+        while True:
+            try:
+                event = self.progress_events.get_nowait()
+            except queue.Empty:
+                break
+            if event.stage == 'blocks':
+                self.blocks_expected = event.total or event.done
+            elif event.stage in STAGE_SPANS:
+                latest = event
+                fraction = event.fraction
+                if fraction is None and event.stage == 'capture' and self.blocks_expected:
+                    fraction = min(1.0, event.done / self.blocks_expected)
+                start, end = STAGE_SPANS[event.stage]
+                pipeline = 'test' if event.stage in TEST_STAGES else 'coverage'
+                self.pipeline_progress[pipeline] = (start + (end - start) * (fraction or 0.0)) / 100
+        if latest is None:
+            return
+
+        self.progress_var.set(100 * sum(self.pipeline_progress.values()) / len(self.pipeline_progress))
+        self.progress_label.config(text=str(latest))
+
+    def process_completed(self, tasks):
+        # Every task of the job has finished
+        self.script_running = False
+        self.cancel_button.pack_forget()
+        coverage = tasks.get('coverage')
+        test = tasks.get('test')
+        self.write_timings(coverage.result[0] if coverage is not None and coverage.state == 'done'
+                           else test.result if test is not None and test.state == 'done' else None)
+
+        if any(task.state == 'cancelled' for task in tasks.values()):
+            print("Reports cancelled")
+            cancelled_label = tk.Label(self.second_screen_frame, text="Cancelled.", fg="red")
+            cancelled_label.pack(pady=20)
+            self.show_back_button()
+            self.back_button['state'] = tk.NORMAL
+            self.generate_button['state'] = tk.NORMAL
+            return
+
+        from coverage_pipeline import coverage_succeeded
+
+        output = []
+        succeeded = True
+        for task in tasks.values():
+            if task.state == 'failed':
+                output.append(f"ERROR: {task.name} report: {task.error}")
+                succeeded = False
+        if coverage is not None and coverage.state == 'done':
+            output.extend(coverage.result[1])
+            succeeded = succeeded and coverage_succeeded(*coverage.result)
+        process_output = "\n".join(output) + "\n"
+
+        # Check if the reports completed successfully or with an error,
+        # judged like batch_report.py does
+        if not succeeded:
+            # Handle the case where an error occurred
+            self.handle_error(process_output)
+        else:
+            # Update the progress bar to 100%
+            self.progress_var.set(100)
+
+            # Script has completed successfully
+            print("Script completed!")
+
+            # Add code to display the work completed screen
+            if coverage is not None:
+                self.coveragereport_complete_screen()
+            if test is not None:
+                self.testreport_complete_screen()
+            self.show_back_button()
+
+    def handle_error(self, process_output):
+        # Handle the case where an error occurred during script execution
+        print("Script encountered an error!")
+        # Add code to convey the error message to the user
+        error_label = tk.Label(self.second_screen_frame, text="Error occurred during script execution!", fg="red")
+        error_label.pack(pady=20)
+        # Name the damaged objects and where the re-dump script is
+        errors = [line for line in process_output.splitlines() if line.startswith("ERROR")]
+        for line in errors:
+            print(line)
+        if errors:
+            shown = errors[:MAX_ERRORS_SHOWN]
+            if len(errors) > len(shown):
+                shown.append(f"... and {len(errors) - len(shown)} more")
+            details_label = tk.Label(self.second_screen_frame, text="\n".join(shown), fg="red", justify=tk.LEFT,
+                                     wraplength=700)
+            details_label.pack(pady=5)
+        # Show the Back button to allow the user to return to the file selector screen
+        self.show_back_button()
+        # Enable the Back button
+        self.back_button['state'] = tk.NORMAL
+
+    def testreport_complete_screen(self):
+        # Hide the Get Coverage Report button
+        self.generate_button.pack_forget()
+
+        # Enable the Back button
+        self.back_button['state'] = tk.NORMAL
+
+        # Add code to display the work completed screen
+        completed_label = tk.Label(self.second_screen_frame, text="Test Report Generated!")
+        completed_label.pack(pady=20)
+
+    def coveragereport_complete_screen(self):
+        # Hide the Get Coverage Report button
+        self.generate_button.pack_forget()
+
+        # Enable the Back button
+        self.back_button['state'] = tk.NORMAL
+
+        # Add code to display the work completed screen
+        completed_label = tk.Label(self.second_screen_frame, text="Coverage Report Generated!")
+        completed_label.pack(pady=20)
+
+    def show_back_button(self):
+        # Hide the progress bar
+        self.progress_bar.pack_forget()
+        self.progress_label.pack_forget()
+
+        # Show the Back button
+        self.back_button.pack()
+
+    def show_progress_bar(self):
+        # Show the progress bar
+        self.progress_bar.pack()
+        self.progress_label.pack()
+
+    def show_file_selector_frame(self):
+        # Hide the second screen frame
+        self.second_screen_frame.place_forget()
+
+        # Show the file selector frame
+        self.file_selector_frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+
+        # Reset the application state
+        self.reset_application()
+
+    def reset_application(self):
+        # Reset the application state to its initial values
+        self.script_running = False
+
+        # Clear the checkboxes
+        self.coverage_var.set(0)
+        self.test_var.set(0)
+
+        # Reset the progress bar
+        self.progress_var.set(0)
+        self.progress_label.config(text="")
+        self.blocks_expected = None
+
+        # Hide the progress bar
+        self.progress_bar.pack_forget()
+        self.progress_label.pack_forget()
+
+
+def run_gui(jobs=1, started=None, record_timings=False):
+    # Create the main application window
+    root = tk.Tk()
+
+    # Set the size of the main application window
+    root.geometry("500x400")  # Adjust the width and height as needed
+
+    # Initialize the app, the window keeps it alive
+    TextFileSelectorApp(root, jobs=jobs, record_timings=record_timings)
+
+    if started is not None:
+        # Draw the first screen, report how long it took and quit
+        root.update()
+        print(f"Startup: {(time.perf_counter() - started) * 1000:.0f} ms until the window was drawn")
+        root.destroy()
+        return
+
+    # Run the application
+    root.mainloop()
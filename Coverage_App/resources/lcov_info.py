@@ -0,0 +1,65 @@
+class FileCoverage:
+    # Coverage of one source file, the in-memory form of an lcov record
+    def __init__(self, source):
+        self.source = source
+        self.lines = {}        # line number -> hit count
+        self.functions = {}    # function name -> [start line, hit count]
+        self.branches = {}     # (line, block, branch) -> taken count, None if never evaluated
+
+    def add_line(self, line, hits):
+        self.lines[line] = self.lines.get(line, 0) + hits
+
+    def add_function(self, name, line, hits):
+        function = self.functions.get(name)
+        if function is None:
+            self.functions[name] = [line, hits]
+        else:
+            function[1] += hits
+
+    def add_branch(self, line, block, branch, taken):
+        key = (line, block, branch)
+        if key not in self.branches or self.branches[key] is None:
+            self.branches[key] = taken
+        elif taken is not None:
+            self.branches[key] += taken
+
+    def add(self, other):
+        for line, hits in other.lines.items():
+            self.add_line(line, hits)
+        for name, (line, hits) in other.functions.items():
+            self.add_function(name, line, hits)
+        for (line, block, branch), taken in other.branches.items():
+            self.add_branch(line, block, branch, taken)
+
+
+def format_record(coverage, test_name=''):
+    out = [f'TN:{test_name}', f'SF:{coverage.source}']
+
+    functions = sorted(coverage.functions.items(), key=lambda item: (item[1][0], item[0]))
+    for name, (line, _) in functions:
+        out.append(f'FN:{line},{name}')
+    for name, (_, hits) in functions:
+        out.append(f'FNDA:{hits},{name}')
+    out.append(f'FNF:{len(functions)}')
+    out.append(f'FNH:{sum(1 for _, (_, hits) in functions if hits > 0)}')
+
+    branches = sorted(coverage.branches.items())
+    for (line, block, branch), taken in branches:
+        out.append(f'BRDA:{line},{block},{branch},{"-" if taken is None else taken}')
+    out.append(f'BRF:{len(branches)}')
+    out.append(f'BRH:{sum(1 for _, taken in branches if taken)}')
+
+    lines = sorted(coverage.lines.items())
+    for line, hits in lines:
+        out.append(f'DA:{line},{hits}')
+    out.append(f'LF:{len(lines)}')
+    out.append(f'LH:{sum(1 for _, hits in lines if hits > 0)}')
+
+    out.append('end_of_record')
+    return '\n'.join(out) + '\n'
+
+
+def write_tracefile(path, coverages, test_name=''):
+    with open(path, 'w') as info_file:
+        for coverage in sorted(coverages, key=lambda item: item.source):
+            info_file.write(format_record(coverage, test_name))
@@ -0,0 +1,162 @@
+import os
+import queue
+import socket
+import threading
+import time
+
+from serial_log import decode_lines
+
+
+# "tcp://host:port" names the RTT telnet server of a J-Link (or anything
+# speaking plain TCP), everything else a log file that is being written
+TCP_PREFIX = 'tcp://'
+DEFAULT_RTT_PORT = 19021
+
+# A source that sends nothing for this long (seconds) is finished
+IDLE_TIMEOUT = 10.0
+
+# How often a growing file is checked for more data, and how long a
+# socket read waits before looking at the stop flag again
+POLL_INTERVAL = 0.05
+
+# __gcov_exit prints this after each dump.  A log may hold several dumps,
+# or test output after one, so reading only stops there when asked to.
+END_MARKER = b'Gcov End'
+
+
+def is_socket_source(source):
+    return source.startswith(TCP_PREFIX)
+
+
+def socket_address(source):
+    # "tcp://localhost:19021" -> ('localhost', 19021), the port is optional
+    address = source[len(TCP_PREFIX):]
+    host, separator, port = address.rpartition(':')
+    if not separator:
+        return address, DEFAULT_RTT_PORT
+    return host, int(port)
+
+
+def _file_lines(path, idle_timeout, stopped):
+    # Lines of a file that is still being written, from its first byte.
+    # A line is only passed on once its newline arrived.
+    idle_since = time.monotonic()
+    while not os.path.exists(path):
+        if stopped() or time.monotonic() - idle_since >= idle_timeout:
+            return
+        time.sleep(POLL_INTERVAL)
+
+    with open(path, 'rb') as log_file:
+        pending = b''
+        idle_since = time.monotonic()
+        while not stopped():
+            chunk = log_file.readline()
+            if chunk:
+                idle_since = time.monotonic()
+                pending += chunk
+                if pending.endswith(b'\n'):
+                    yield pending
+                    pending = b''
+            elif time.monotonic() - idle_since >= idle_timeout:
+                break
+            else:
+                time.sleep(POLL_INTERVAL)
+        if pending:
+            yield pending
+
+
+def _socket_lines(address, idle_timeout, stopped):
+    # Lines received from a TCP server until it closes the connection
+    with socket.create_connection(address, timeout=idle_timeout) as connection:
+        connection.settimeout(POLL_INTERVAL)
+        pending = b''
+        idle_since = time.monotonic()
+        while not stopped():
+            try:
+                chunk = connection.recv(1 << 16)
+            except socket.timeout:
+                if time.monotonic() - idle_since >= idle_timeout:
+                    break
+                continue
+            if not chunk:
+                break
+            idle_since = time.monotonic()
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line + b'\n'
+        if pending:
+            yield pending
+
+
+class LiveLog:
+    # A log that is read while the target is still writing it: a growing
+    # file or tcp://host:port.  Reading stops when a socket is closed,
+    # after idle_timeout seconds without data, when `stop` (a
+    # threading.Event) is set, or with stop_at_end after the first
+    # "Gcov End" line.  With copy_to, every line read is also saved there,
+    # so the test report can use the log later.
+    def __init__(self, source, copy_to=None, idle_timeout=IDLE_TIMEOUT, stop=None, stop_at_end=False):
+        self.source = source
+        self.copy_to = copy_to
+        self.idle_timeout = idle_timeout
+        self.stop = stop or threading.Event()
+        self.stop_at_end = stop_at_end
+
+    @property
+    def name(self):
+        # Names the report when the objects do not
+        if is_socket_source(self.source):
+            host, port = socket_address(self.source)
+            return f"{host}_{port}"
+        return os.path.splitext(os.path.basename(self.source))[0]
+
+    def _source_lines(self, stopped):
+        if is_socket_source(self.source):
+            return _socket_lines(socket_address(self.source), self.idle_timeout, stopped)
+        return _file_lines(self.source, self.idle_timeout, stopped)
+
+    def _read(self, lines, finished):
+        # Runs on the reader thread, so the target is never kept waiting
+        # while an object is captured
+        copy_file = open(self.copy_to, 'wb') if self.copy_to else None
+        try:
+            for line in self._source_lines(lambda: self.stop.is_set() or finished.is_set()):
+                if copy_file is not None:
+                    copy_file.write(line)
+                lines.put(line)
+                if self.stop_at_end and END_MARKER in line:
+                    break
+        except OSError as e:
+            lines.put(e)
+        finally:
+            if copy_file is not None:
+                copy_file.close()
+            lines.put(None)
+
+    def lines(self):
+        lines = queue.Queue()
+        finished = threading.Event()
+        reader = threading.Thread(target=self._read, args=(lines, finished), daemon=True)
+        reader.start()
+        try:
+            while True:
+                line = lines.get()
+                if line is None:
+                    break
+                if isinstance(line, OSError):
+                    raise line
+                yield line
+        finally:
+            # Also when the consumer gives up early
+            finished.set()
+            reader.join()
+
+    def blocks(self, progress=None):
+        # GcdaBlocks as soon as each one's file name trailer was read
+        return decode_lines(self.lines(), progress)
+
+    def drain(self):
+        # Reads the whole log without decoding it, for the copy
+        for _ in self.lines():
+            pass
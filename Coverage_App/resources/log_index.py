@@ -0,0 +1,228 @@
+import argparse
+import contextlib
+import json
+import mmap
+import os
+import sys
+
+from binary_dump import is_binary_dump
+from serial_log import EMIT_RE, GCDA_PATH_RE, HEXDUMP_RE, PROGRESS_STEP, clean_line, decode_lines
+
+
+# Saved next to the log: <log>.index.json
+INDEX_SUFFIX = '.index.json'
+
+# Bumped when the index layout changes, older indexes are rebuilt
+INDEX_FORMAT_VERSION = 1
+
+
+def index_path(log_path):
+    return log_path + INDEX_SUFFIX
+
+
+# Only the lines that start, end or cancel a block have one of these
+_MARKERS = (b'Emitting', b'Gcov End', b'__gcov_init', b'.gcda')
+
+
+@contextlib.contextmanager
+def map_log(log_file):
+    # The whole open log as a read-only memory map (bytes if it is empty),
+    # unmapped when the with block ends
+    if not os.fstat(log_file.fileno()).st_size:
+        yield b''
+        return
+    with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+def marked_lines(data, markers=_MARKERS):
+    # (start, end, line) of the lines holding one of `markers`, in order.
+    # Each marker is looked for with find(), which skips the data lines in
+    # between far faster than a regular expression would.
+    upcoming = [data.find(marker) for marker in markers]
+    pos = 0
+    while True:
+        found = [position for position in upcoming if position >= 0]
+        if not found:
+            return
+        first = min(found)
+        start = data.rfind(b'\n', 0, first) + 1
+        end = data.find(b'\n', first)
+        end = len(data) if end < 0 else end + 1
+        yield start, end, data[start:end]
+        pos = end
+        for number, position in enumerate(upcoming):
+            if 0 <= position < pos:
+                upcoming[number] = data.find(markers[number], pos)
+
+
+def scan_log(log_path, progress=None):
+    # One pass over a serial log that finds every object block without
+    # decoding it: byte offset of its "Emitting" line, offset just after
+    # the line that ends it, its path and size, and the dump it belongs
+    # to.  Dumps are counted from 0 and end at each "Gcov End", so a log
+    # of several __gcov_exit calls keeps every copy of an object.
+    # Block boundaries follow SerialLogDecoder.
+    entries = []
+    dump = 0
+    current = None
+    with open(log_path, 'rb') as log_file, map_log(log_file) as data:
+        total = len(data)
+        reported = 0
+        for start, end, line in marked_lines(data):
+            if progress is not None and end - reported >= PROGRESS_STEP:
+                reported = end
+                progress.update('decode', end, total, 'bytes')
+            emit_match = EMIT_RE.search(clean_line(line)) if b'Emitting' in line else None
+            if emit_match:
+                if current is not None:
+                    # No trailer, the next block starts right here
+                    current['end'] = start
+                    entries.append(current)
+                path = emit_match.group(2)
+                current = {'dump': dump, 'path': os.fsdecode(path) if path else None, 'offset': start,
+                           'end': None, 'size': int(emit_match.group(1))}
+            elif b'Gcov End' in line:
+                if current is not None:
+                    current['end'] = end
+                    entries.append(current)
+                    current = None
+                dump += 1
+            elif current is None:
+                continue
+            elif b'__gcov_init' in line:
+                # The target restarted in the middle of a dump
+                current = None
+            else:
+                clean = clean_line(line)
+                path_match = GCDA_PATH_RE.search(clean)
+                if path_match and not HEXDUMP_RE.match(clean):
+                    current['path'] = os.fsdecode(path_match.group(0))
+                    current['end'] = end
+                    entries.append(current)
+                    current = None
+    if current is not None:
+        current['end'] = total
+        entries.append(current)
+    if progress is not None:
+        progress.update('decode', total, total, 'bytes', final=True)
+    return entries, dump + (1 if entries and entries[-1]['dump'] == dump else 0)
+
+
+def build_index(log_path, progress=None):
+    # Scans the log and saves the index next to it.  Returns the index.
+    if is_binary_dump(log_path):
+        raise ValueError(f"{log_path} is a binary dump, it is read through a memory map without an index")
+    stat = os.stat(log_path)
+    entries, dumps = scan_log(log_path, progress)
+    index = {'version': INDEX_FORMAT_VERSION, 'log_size': stat.st_size, 'log_mtime_ns': stat.st_mtime_ns,
+             'dumps': dumps, 'objects': entries}
+    with open(index_path(log_path), 'w') as index_file:
+        json.dump(index, index_file, separators=(',', ':'))
+    return index
+
+
+def load_index(log_path, progress=None):
+    # The saved index, or a new one when there is none or the log changed
+    try:
+        with open(index_path(log_path)) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        index = None
+    if index is not None:
+        stat = os.stat(log_path)
+        if (index.get('version') == INDEX_FORMAT_VERSION and index.get('log_size') == stat.st_size
+                and index.get('log_mtime_ns') == stat.st_mtime_ns):
+            return index
+    return build_index(log_path, progress)
+
+
+def read_block(log_file, entry):
+    # The GcdaBlock of one index entry, read from an open log
+    log_file.seek(entry['offset'])
+    lines = log_file.read(entry['end'] - entry['offset']).splitlines(keepends=True)
+    return next(decode_lines(lines), None)
+
+
+def select_entries(index, dump=None, objects=None):
+    # The entries of one dump (all dumps with None), optionally only of the
+    # objects whose path ends with one of `objects`
+    return [entry for entry in index['objects']
+            if (dump is None or entry['dump'] == dump)
+            and (not objects or any(_matches(entry['path'], name) for name in objects))]
+
+
+def iter_indexed_blocks(log_path, dump=None, objects=None, progress=None):
+    # (entry, GcdaBlock) of the selected objects, seeking straight to them
+    entries = select_entries(load_index(log_path), dump, objects)
+    with open(log_path, 'rb') as log_file:
+        for found, entry in enumerate(entries, 1):
+            block = read_block(log_file, entry)
+            if progress is not None:
+                progress.update('blocks', found, len(entries), 'blocks', final=found == len(entries))
+            if block is not None:
+                yield entry, block
+
+
+def _matches(path, name):
+    # "foo.c.gcda" selects ".../foo.c.gcda", like __gcov_dump_file
+    return path is not None and (path == name or path.endswith('/' + name))
+
+
+class LogDump:
+    # One dump of a log that holds several, for run_coverage in place of
+    # the log path
+    def __init__(self, source, dump):
+        self.source = source
+        self.dump = dump
+
+    @property
+    def name(self):
+        return f"{os.path.splitext(os.path.basename(self.source))[0]}-dump{self.dump}"
+
+    def blocks(self, progress=None):
+        return (block for _, block in iter_indexed_blocks(self.source, self.dump, progress=progress))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index the coverage dumps in a serial log, list them or extract "
+                                                 "their .gcda files")
+    parser.add_argument('log', help="RTT / serial log")
+    parser.add_argument('--rebuild', action='store_true', help="scan the log again even if the index is up to date")
+    parser.add_argument('--list', action='store_true', help="print every indexed object")
+    parser.add_argument('--dump', type=int, help="only this dump (counted from 0)")
+    parser.add_argument('--object', nargs='+', metavar='NAME', help="only these objects (path or file name)")
+    parser.add_argument('--extract', metavar='DIR', help="write the objects to DIR/dump<N>/<path of the .gcda>")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        parser.error(f"{args.log} does not exist")
+    try:
+        index = build_index(args.log) if args.rebuild else load_index(args.log)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+    print(f"{index['dumps']} dumps, {len(index['objects'])} objects, index in {index_path(args.log)}")
+
+    if args.list:
+        for entry in select_entries(index, args.dump, args.object):
+            print(f"{entry['dump']}\t{entry['offset']}\t{entry['size']}\t{entry['path'] or '-'}")
+
+    if args.extract:
+        written = 0
+        for entry, block in iter_indexed_blocks(args.log, args.dump, args.object):
+            if block.path is None or not block.is_complete() or not block.checksum_ok():
+                print(f"ERROR: {block.path or 'unnamed block'} in dump {entry['dump']} is damaged, not extracted")
+                continue
+            written += 1
+            # The whole path, objects in different directories can share a name
+            target = os.path.join(args.extract, f"dump{entry['dump']}", block.path.lstrip('/\\'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as gcda_file:
+                gcda_file.write(block.data)
+        print(f"{written} objects written to {args.extract}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import re
+
+from capture_cache import DEFAULT_CACHE_DIR
+from tracefile_merge import APPLICATION_PATTERNS
+
+
+# Read by the GUI when it exists next to the scripts
+DEFAULT_CONFIG_NAME = 'path_map.json'
+
+# Scans of the .gcno files of the build directories, one file per set of
+# directories.  Kept with the capture cache: a file in the tree would
+# change the mtime of the directory it is written to, so the scan would
+# never be used.
+SCAN_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'scans')
+
+# Bumped when the layout of the scan cache changes
+SCAN_CACHE_VERSION = 1
+
+# /home/.../Application/<name>/.../CMakeFiles/... -> <name>, the layout of
+# our CMake trees.  A config can give its own expression, whose first group
+# is the name.
+DEFAULT_APPLICATION_RE = r'Application/([^/]+)'
+
+
+def _normalize(path):
+    return path.replace('\\', '/')
+
+
+class PathResolver:
+    # Finds the local .gcda/.gcno of an object from the path the target
+    # printed.  In turn it tries the path itself, each prefix rewrite rule,
+    # and the .gcno files under the build directories, picking by file name
+    # the one whose directories match the target path furthest.  A config
+    # file holds:
+    #   {"rewrite": [["/home/ci/work/", "/home/me/src/"], ...],
+    #    "build_dirs": ["/home/me/src/build"],
+    #    "application": "Application/([^/]+)",
+    #    "keep": ["*/Application/*"]}
+    # The rewrite rules also apply to the source paths in the .gcno, so the
+    # report reads the sources from the local tree.
+    def __init__(self, rewrite=None, build_dirs=None, application=None, keep=None):
+        self.rewrite = [(_normalize(target), _normalize(local)) for target, local in rewrite or []]
+        self.build_dirs = list(build_dirs or [])
+        self.application_re = re.compile(application or DEFAULT_APPLICATION_RE)
+        self.keep = tuple(keep or APPLICATION_PATTERNS)
+        self._by_name = None
+        self._resolved = {}
+
+    @classmethod
+    def from_config(cls, config_path):
+        with open(config_path) as config_file:
+            config = json.load(config_file)
+        base = os.path.dirname(os.path.abspath(config_path))
+        # Build directories may be given relative to the config file
+        return cls(config.get('rewrite'), [os.path.join(base, path) for path in config.get('build_dirs', [])],
+                   config.get('application'), config.get('keep'))
+
+    def rewrite_path(self, path):
+        return rewrite_path(path, self.rewrite)
+
+    def resolve(self, gcda_path):
+        # Local .gcda path whose .gcno exists, or None
+        if gcda_path not in self._resolved:
+            self._resolved[gcda_path] = self._find(gcda_path)
+        return self._resolved[gcda_path]
+
+    def _find(self, gcda_path):
+        for candidate in (gcda_path, self.rewrite_path(gcda_path)):
+            if os.path.exists(_gcno_path(candidate)):
+                return candidate
+        if not self.build_dirs:
+            return None
+
+        matches = self.scan().get(os.path.basename(_gcno_path(gcda_path)), [])
+        wanted = _normalize(gcda_path).split('/')[:-1]
+        best, best_score, tied = None, -1, False
+        for gcno_path in matches:
+            score = _common_tail(wanted, _normalize(gcno_path).split('/')[:-1])
+            if score > best_score:
+                best, best_score, tied = gcno_path, score, False
+            elif score == best_score:
+                tied = True
+        if best is None or tied:
+            # Two objects of that name fit equally well, guessing could
+            # mix up the coverage of different sources
+            return None
+        return best[:-len('.gcno')] + '.gcda'
+
+    def resolve_blocks(self, blocks):
+        # Passes the blocks on with their path set to the local one
+        for block in blocks:
+            if block.path is not None:
+                block.path = self.resolve(block.path) or block.path
+            yield block
+
+    def application_name(self, gcda_path):
+        # Name of the application an object belongs to, from the target path
+        match = self.application_re.search(_normalize(gcda_path))
+        if match is None:
+            return None
+        name = match.group(1) if match.groups() else match.group(0)
+        return os.path.splitext(name)[0]
+
+    def scan(self):
+        # {.gcno file name: [paths]} of the build directories, kept in a
+        # cache that is used while no directory in the tree has changed
+        if self._by_name is None:
+            self._by_name = self._load_scan() or self._save_scan()
+        return self._by_name
+
+    def _cache_path(self):
+        key = hashlib.sha256(json.dumps(self.build_dirs).encode()).hexdigest()[:16]
+        return os.path.join(SCAN_CACHE_DIR, key + '.json')
+
+    def _load_scan(self):
+        try:
+            with open(self._cache_path()) as cache_file:
+                cache = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if cache.get('version') != SCAN_CACHE_VERSION or cache.get('build_dirs') != self.build_dirs:
+            return None
+        # Adding or removing a file changes the mtime of its directory
+        for directory, mtime_ns in cache['directories'].items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime_ns:
+                    return None
+            except OSError:
+                return None
+        return cache['objects']
+
+    def _save_scan(self):
+        objects = {}
+        directories = {}
+        for build_dir in self.build_dirs:
+            for directory, subdirectories, files in os.walk(build_dir):
+                subdirectories.sort()
+                try:
+                    directories[directory] = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                for file_name in sorted(files):
+                    if file_name.endswith('.gcno'):
+                        objects.setdefault(file_name, []).append(os.path.join(directory, file_name))
+        try:
+            os.makedirs(SCAN_CACHE_DIR, exist_ok=True)
+            with open(self._cache_path(), 'w') as cache_file:
+                json.dump({'version': SCAN_CACHE_VERSION, 'build_dirs': self.build_dirs,
+                           'directories': directories, 'objects': objects}, cache_file, separators=(',', ':'))
+        except OSError:
+            # A read-only disk only costs the next run the scan
+            pass
+        return objects
+
+
+def rewrite_path(path, rules):
+    # The path after the first (target prefix, local prefix) rule it
+    # starts with, unchanged when none fits
+    normalized = _normalize(path)
+    for target, local in rules:
+        if normalized.startswith(target):
+            return local + normalized[len(target):]
+    return path
+
+
+def _gcno_path(gcda_path):
+    return gcda_path[:-len('.gcda')] + '.gcno'
+
+
+def _common_tail(first, second):
+    # Number of trailing directory names two paths share
+    count = 0
+    while count < len(first) and count < len(second) and first[-1 - count] == second[-1 - count]:
+        count += 1
+    return count
+
+
+def load_resolver(config_path=None):
+    # The resolver of a config file, or the one that keeps the target paths
+    return PathResolver.from_config(config_path) if config_path else PathResolver()
@@ -0,0 +1,84 @@
+import sys
+import time
+
+
+# Subscribers hear about a stage at most this often (seconds), apart from
+# its first and last event
+PUBLISH_INTERVAL = 0.1
+
+
+class ProgressEvent:
+    # How far one stage got: `done` of `total` (None while unknown) `unit`s,
+    # `elapsed` seconds after the stage's first event
+    __slots__ = ('stage', 'done', 'total', 'unit', 'elapsed')
+
+    def __init__(self, stage, done, total, unit, elapsed):
+        self.stage = stage
+        self.done = done
+        self.total = total
+        self.unit = unit
+        self.elapsed = elapsed
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return None
+        return min(1.0, self.done / self.total)
+
+    @property
+    def rate(self):
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        if self.unit == 'bytes':
+            done = f"{self.done / 1e6:.1f}"
+            total = f" of {self.total / 1e6:.1f}" if self.total else ""
+            return f"{self.stage}: {done}{total} MB ({self.rate / 1e6:.1f} MB/s)"
+        total = f" of {self.total}" if self.total else ""
+        return f"{self.stage}: {self.done}{total} {self.unit} ({self.rate:.0f}/s)"
+
+
+class Progress:
+    # The pipelines report what they get done through one of these, and any
+    # number of subscribers (the Tk progress bar, a console printer) are
+    # called with a ProgressEvent.  Subscribers run on the thread doing the
+    # work, so a GUI has to hand the events over to its own thread.
+    #
+    # Stages: 'decode' (bytes of the log), 'blocks' (complete gcda blocks
+    # versus announced ones), 'capture' (objects), 'merge' (tracefiles),
+    # 'render' (coverage pages), 'parse' (bytes of the test log) and
+    # 'pages' (test report pages).
+    def __init__(self, interval=PUBLISH_INTERVAL):
+        self.interval = interval
+        self.subscribers = []
+        self.started = {}       # stage -> time of its first event
+        self.published = {}     # stage -> time it was last published
+
+    def reset(self):
+        # Start timing every stage afresh, for the next run
+        self.started.clear()
+        self.published.clear()
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return callback
+
+    def update(self, stage, done, total=None, unit='', final=False):
+        if not self.subscribers:
+            return
+        now = time.perf_counter()
+        started = self.started.setdefault(stage, now)
+        last = self.published.get(stage)
+        if not final and last is not None and now - last < self.interval and done != total:
+            return
+        self.published[stage] = now
+        event = ProgressEvent(stage, done, total, unit, now - started)
+        for callback in self.subscribers:
+            callback(event)
+
+
+def console_printer(prefix='', stream=None):
+    # A subscriber for headless runs: one line per published event
+    def print_event(event):
+        print(f"{prefix}{event}", file=stream or sys.stderr, flush=True)
+    return print_event
@@ -0,0 +1,136 @@
+import queue
+import threading
+
+
+class Cancelled(Exception):
+    # Raised in a task when its job is cancelled
+    pass
+
+
+class CancelToken:
+    # Shared by the tasks of one job, each task gets it as its argument.
+    # A task checks it between its stages; subscribed to the Progress of a
+    # pipeline, it also stops a stage at its next progress event: the
+    # exception unwinds the stage, and map_ordered drops the objects its
+    # workers have not started.
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self, _event=None):
+        if self.event.is_set():
+            raise Cancelled()
+
+
+class Task:
+    # One named piece of work of a Scheduler: function(token) on its own
+    # thread once every task it needs is done.  state is 'waiting',
+    # 'running', 'done', 'failed' or 'cancelled'; result holds the return
+    # value and error the exception.
+    def __init__(self, name, function, needs=()):
+        self.name = name
+        self.function = function
+        self.needs = tuple(needs)
+        self.state = 'waiting'
+        self.result = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.state in ('done', 'failed', 'cancelled')
+
+
+class Scheduler:
+    # Runs the tasks of one job at the same time, each as soon as the tasks
+    # it needs are done.  A task is added once: adding a name again returns
+    # the task already there, so two parts of a job asking for the same
+    # work share it.  Finished tasks are put on `results`, where a GUI
+    # picks them up on its own thread.  cancel() stops every task at its
+    # next check of the token; tasks that need a failed or cancelled one
+    # are cancelled without running.
+    def __init__(self):
+        self.tasks = {}
+        self.results = queue.Queue()
+        self.token = CancelToken()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def add(self, name, function, needs=()):
+        with self._lock:
+            task = self.tasks.get(name)
+            if task is None:
+                task = self.tasks[name] = Task(name, function, needs)
+            ready = self._ready()
+        self._start(ready)
+        return task
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def finished(self):
+        with self._lock:
+            return all(task.finished for task in self.tasks.values())
+
+    def wait(self):
+        # Blocks until every task has finished.  Returns the tasks by name.
+        while True:
+            with self._lock:
+                threads = [thread for thread in self._threads if thread.is_alive()]
+            if not threads:
+                return self.tasks
+            for thread in threads:
+                thread.join()
+
+    def _ready(self):
+        # Marks the waiting tasks that can start or never will.  Called
+        # with the lock held; returns the ones to start.
+        ready = []
+        changed = True
+        while changed:
+            # Again after a cancellation, it may cancel the tasks after it
+            changed = False
+            for task in self.tasks.values():
+                if task.state != 'waiting':
+                    continue
+                needed = [self.tasks.get(name) for name in task.needs]
+                if any(other is not None and other.state in ('failed', 'cancelled') for other in needed) \
+                        or self.token.cancelled:
+                    task.state = 'cancelled'
+                    self.results.put(task)
+                    changed = True
+                elif all(other is not None and other.state == 'done' for other in needed):
+                    task.state = 'running'
+                    ready.append(task)
+        return ready
+
+    def _start(self, tasks):
+        for task in tasks:
+            # Daemon threads, closing the window does not wait for them
+            thread = threading.Thread(target=self._run, args=(task,), name=task.name, daemon=True)
+            with self._lock:
+                self._threads.append(thread)
+            thread.start()
+
+    def _run(self, task):
+        try:
+            task.result = task.function(self.token)
+            state = 'done'
+        except Cancelled:
+            state = 'cancelled'
+        except Exception as e:
+            task.error = e
+            state = 'failed'
+        with self._lock:
+            task.state = state
+            self.results.put(task)
+            # A cancelled or failed task cancels the ones that need it,
+            # which are reported in the same pass
+            ready = self._ready()
+        self._start(ready)
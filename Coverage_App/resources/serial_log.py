@@ -0,0 +1,180 @@
+import binascii
+import os
+import re
+import zlib
+
+
+# Only tab, newline, carriage return and printable ASCII survive, the same
+# set the old `tr -cd '\11\12\15\40-\176'` step kept.  RTT logs are full of
+# NULs and terminal control bytes between the useful lines.
+_KEEP_BYTES = set(b'\t\n\r') | set(range(0x20, 0x7f))
+_DROP_BYTES = bytes(b for b in range(256) if b not in _KEEP_BYTES)
+
+# "Emitting 1988 bytes for /home/.../foo.cpp.gcda" is printed by __gcov_exit
+# before every hex dump.  Older firmware leaves out the " for <path>" part
+# and only prints the path on the line after the dump.
+EMIT_RE = re.compile(rb'Emitting (\d+) bytes(?: for (\S+\.gcda))?')
+
+# "00000010: 03 00 00 00 02 31 b9 65 a1 30 f3 ed 3e b2 bb c0 ", or xxd's
+# groups of two bytes.  A token of another length (a dropped or doubled
+# character) ends the data of its line, the CRC check names the object.
+HEXDUMP_RE = re.compile(rb'([0-9a-fA-F]{8}):((?: +(?:[0-9a-fA-F]{4}|[0-9a-fA-F]{2})(?![0-9a-fA-F]))+)')
+
+GCDA_PATH_RE = re.compile(rb'\S+\.gcda')
+
+# With GCOV_OPT_OUTPUT_SERIAL_BASE64 the data lines are "~" and base64
+BASE64_PREFIX = b'~'
+
+# "CRC32 1a2b3c4d", the zlib CRC-32 of the whole object, follows the data
+# of both serial formats.  Older firmware does not send it.
+CRC_RE = re.compile(rb'CRC32 ([0-9a-fA-F]{8})')
+
+
+def clean_line(line):
+    # A log line without the bytes above and surrounding blanks
+    return line.translate(None, _DROP_BYTES).strip()
+
+
+# Bytes decoded between two progress updates
+PROGRESS_STEP = 1 << 20
+
+
+class GcdaBlock:
+    def __init__(self, path, expected_size, data, crc=None):
+        self.path = path
+        self.expected_size = expected_size
+        self.data = data
+        self.crc = crc  # None when the firmware sent no CRC32 line
+
+    @property
+    def name(self):
+        return os.path.basename(self.path) if self.path else None
+
+    def is_complete(self):
+        return len(self.data) == self.expected_size
+
+    def checksum_ok(self):
+        return self.crc is None or zlib.crc32(self.data) == self.crc
+
+    def __reduce__(self):
+        # data may be a memoryview into a mapped dump, which cannot be
+        # pickled; worker processes get their own copy of the bytes
+        return GcdaBlock, (self.path, self.expected_size, bytes(self.data), self.crc)
+
+
+class SerialLogDecoder:
+    # Turns the lines of an RTT/serial log into GcdaBlock objects.
+    # Lines are fed one at a time so the same decoder works for a whole
+    # file and for a log that is still being written.
+    def __init__(self):
+        self.path = None
+        self.expected_size = None
+        self.data = None
+        self.crc = None
+        self.announced = 0  # "Emitting" headers seen so far
+
+    def feed(self, line):
+        # Returns the block finished by this line, or None
+        line = clean_line(line)
+        if not line:
+            return None
+
+        emit_match = EMIT_RE.search(line)
+        if emit_match:
+            finished = self._finish()
+            self.announced += 1
+            self.expected_size = int(emit_match.group(1))
+            self.path = os.fsdecode(emit_match.group(2)) if emit_match.group(2) else None
+            self.data = bytearray()
+            return finished
+
+        if self.data is None:
+            return None
+
+        if line.startswith(BASE64_PREFIX):
+            try:
+                self.data += binascii.a2b_base64(line[1:])
+            except binascii.Error:
+                # A damaged line; the CRC check will name the object
+                pass
+            return None
+
+        crc_match = CRC_RE.match(line)
+        if crc_match:
+            self.crc = int(crc_match.group(1), 16)
+            return None
+
+        hex_match = HEXDUMP_RE.match(line)
+        if hex_match:
+            self._store(int(hex_match.group(1), 16), bytes.fromhex(hex_match.group(2).decode('ascii')))
+            return None
+
+        if b'__gcov_init' in line:
+            # The target restarted in the middle of a dump, drop what we have
+            self._reset()
+            return None
+
+        path_match = GCDA_PATH_RE.search(line)
+        if path_match:
+            self.path = os.fsdecode(path_match.group(0))
+            return self._finish()
+
+        if b'Gcov End' in line:
+            return self._finish()
+
+        # Anything else is unrelated log output interleaved with the dump
+        return None
+
+    def close(self):
+        return self._finish()
+
+    def _store(self, offset, chunk):
+        end = offset + len(chunk)
+        if offset > len(self.data):
+            # Missing lines, keep the offsets right like `xxd -r` does
+            self.data.extend(bytes(offset - len(self.data)))
+        self.data[offset:end] = chunk
+
+    def _finish(self):
+        if self.data is None:
+            return None
+        block = GcdaBlock(self.path, self.expected_size, bytes(self.data), self.crc)
+        self._reset()
+        return block
+
+    def _reset(self):
+        self.path = None
+        self.expected_size = None
+        self.data = None
+        self.crc = None
+
+
+def decode_lines(lines, progress=None, total=None):
+    # GcdaBlocks of an iterable of log lines (bytes), each one as soon as
+    # the line that ends it was read.  total is the size of the log in
+    # bytes when known.
+    decoder = SerialLogDecoder()
+    decoded = reported = found = 0
+    for line in lines:
+        decoded += len(line)
+        block = decoder.feed(line)
+        if block is not None:
+            found += 1
+            if progress is not None:
+                progress.update('blocks', found, decoder.announced, 'blocks')
+            yield block
+        if progress is not None and decoded - reported >= PROGRESS_STEP:
+            reported = decoded
+            progress.update('decode', decoded, total, 'bytes')
+    block = decoder.close()
+    if block is not None:
+        found += 1
+        yield block
+    if progress is not None:
+        progress.update('decode', decoded, total or decoded, 'bytes', final=True)
+        progress.update('blocks', found, decoder.announced, 'blocks', final=True)
+
+
+def iter_gcda_blocks(log_path, progress=None):
+    with open(log_path, 'rb') as log_file:
+        yield from decode_lines(log_file, progress, os.path.getsize(log_path))
@@ -0,0 +1,289 @@
+import argparse
+import os
+import random
+import struct
+import sys
+import zlib
+
+from gcov_format import (GCOV_ARC_ON_TREE, GCOV_DATA_MAGIC, GCOV_NOTE_MAGIC, GCOV_TAG_ARCS, GCOV_TAG_BLOCKS,
+                         GCOV_TAG_COUNTER_ARCS, GCOV_TAG_FUNCTION, GCOV_TAG_LINES)
+
+
+# 'B13*', gcc 11.3: lengths in words and no checksum, as our firmware builds
+GCOV_VERSION = 0x4231332a
+
+# Bytes per hex dump line, as gcov_public.c prints them
+HEXDUMP_LINE_BYTES = 16
+
+# What J-Link and the target print around the test output
+BANNER = [
+    "SEGGER J-Link V7.86g - Real time terminal output",
+    "SEGGER J-Link V11.0, SN=821002020",
+    "Process: JLinkGDBServerCLExe",
+]
+NOISE = [
+    "SEGGER J-Link V7.86g - Real time terminal output",
+    "Process: JLinkGDBServerCLExe",
+    "Reading all registers",
+    "Read 4 bytes @ address 0x20000400 (Data = 0x00000000)",
+    "WARNING: Failed to read memory @ address 0xDEADBEEF",
+]
+
+
+class LogConfig:
+    # Scale of a synthetic build and log.  Every object has `functions`
+    # functions of `blocks` basic blocks, about half of which branch;
+    # zero_share of the functions never run, so their counters are zero.
+    # noise is the chance of a J-Link line between two dumped objects.
+    def __init__(self, objects=100, functions=20, blocks=12, zero_share=0.3, suites=100, tests=10,
+                 failure_share=0.02, noise=0.05, module='Bench', seed=1):
+        self.objects = objects
+        self.functions = functions
+        self.blocks = blocks
+        self.zero_share = zero_share
+        self.suites = suites
+        self.tests = tests
+        self.failure_share = failure_share
+        self.noise = noise
+        self.module = module
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class _Words:
+    # Little endian gcov words, with gcc's word counted strings
+    def __init__(self):
+        self.words = []
+
+    def add(self, *values):
+        self.words.extend(values)
+
+    def string(self, text):
+        raw = text.encode() + b'\0'
+        raw += b'\0' * (-len(raw) % 4)
+        self.words.append(len(raw) // 4)
+        self.words.extend(struct.unpack(f'<{len(raw) // 4}I', raw))
+
+    def record(self, tag, body):
+        self.words.extend((tag, len(body.words)))
+        self.words.extend(body.words)
+
+    def bytes(self):
+        return struct.pack(f'<{len(self.words)}I', *self.words)
+
+
+def _function_graph(rng, blocks, runs):
+    # Arcs [(source, destination, flags)] and their counts of one function.
+    # Block 0 is the entry, 1 the exit and 2.. the body, in order; a body
+    # block either falls through or branches over the next one.  The arc
+    # of a block that does not branch is on the spanning tree and has no
+    # counter, gcov works it out from the others.
+    last = blocks + 1
+    arcs = [(0, 2, 0)]
+    counts = [runs]
+    entering = {2: runs}
+    for block in range(2, last + 1):
+        count = entering.pop(block, 0)
+        following = block + 1 if block < last else 1
+        if block + 2 <= last and rng.random() < 0.5:
+            taken = rng.randint(0, count) if rng.random() < 0.7 else (0 if rng.random() < 0.5 else count)
+            for destination, arc_count in ((following, count - taken), (block + 2, taken)):
+                arcs.append((block, destination, 0))
+                counts.append(arc_count)
+                entering[destination] = entering.get(destination, 0) + arc_count
+        else:
+            arcs.append((block, following, GCOV_ARC_ON_TREE))
+            counts.append(count)
+            if following != 1:
+                entering[following] = entering.get(following, 0) + count
+    return arcs, counts
+
+
+def make_object(rng, config, cwd, relative_source, stamp):
+    # (.gcno bytes, .gcda bytes, source text, counters, zero counters) of
+    # one object compiled in cwd
+    notes = _Words()
+    notes.add(GCOV_NOTE_MAGIC, GCOV_VERSION, stamp)
+    notes.string(cwd)
+    notes.add(1)                    # has_unexecuted_blocks
+    data = _Words()
+    data.add(GCOV_DATA_MAGIC, GCOV_VERSION, stamp)
+
+    lines = []
+    counters = zeros = 0
+    for number in range(config.functions):
+        ident = number + 1
+        lineno_checksum, cfg_checksum = rng.getrandbits(32), rng.getrandbits(32)
+        runs = 0 if rng.random() < config.zero_share else rng.randint(1, 5000)
+        arcs, counts = _function_graph(rng, config.blocks, runs)
+        start_line = len(lines) + 1
+        lines.append(f"int function_{number}(int x) {{")
+
+        body = _Words()
+        body.add(ident, lineno_checksum, cfg_checksum)
+        body.string(f"function_{number}")
+        body.add(0)                 # artificial
+        body.string(relative_source)
+        body.add(start_line, 1, start_line + config.blocks + 1)
+        notes.record(GCOV_TAG_FUNCTION, body)
+        body = _Words()
+        body.add(config.blocks + 2)
+        notes.record(GCOV_TAG_BLOCKS, body)
+        for block in sorted({arc[0] for arc in arcs}):
+            body = _Words()
+            body.add(block)
+            for source_block, destination, flags in arcs:
+                if source_block == block:
+                    body.add(destination, flags)
+            notes.record(GCOV_TAG_ARCS, body)
+        for block in range(2, config.blocks + 2):
+            body = _Words()
+            body.add(block, 0)
+            body.string(relative_source)
+            body.add(len(lines) + 1, 0, 0)
+            lines.append(f"    x = x * {block} + {number};")
+            notes.record(GCOV_TAG_LINES, body)
+        lines.append("}")
+
+        values = [count for (_, _, flags), count in zip(arcs, counts) if not flags & GCOV_ARC_ON_TREE]
+        counters += len(values)
+        zeros += values.count(0)
+        body = _Words()
+        body.add(ident, lineno_checksum, cfg_checksum)
+        data.record(GCOV_TAG_FUNCTION, body)
+        body = _Words()
+        for value in values:
+            body.add(value & 0xffffffff, value >> 32)
+        data.record(GCOV_TAG_COUNTER_ARCS, body)
+    return notes.bytes(), data.bytes(), '\n'.join(lines) + '\n', counters, zeros
+
+
+def _hexdump_lines(data):
+    for offset in range(0, len(data), HEXDUMP_LINE_BYTES):
+        chunk = data[offset:offset + HEXDUMP_LINE_BYTES]
+        yield f"{offset:08x}: " + ''.join(f"{byte:02x} " for byte in chunk)
+
+
+def _test_lines(rng, config, module_dir):
+    total = config.suites * config.tests
+    yield f"Running main() from {module_dir}/UnitTest/Tests/gtest_main.cpp"
+    yield f"[==========] Running {total} tests from {config.suites} test suites."
+    yield "[----------] Global test environment set-up."
+    failed = []
+    for suite in range(config.suites):
+        name = f"Suite{suite}"
+        yield f"[----------] {config.tests} tests from {name}"
+        suite_ms = 0
+        for test in range(config.tests):
+            test_name = f"{name}.Test{test}"
+            duration_ms = rng.randint(0, 40)
+            suite_ms += duration_ms
+            yield f"[ RUN      ] {test_name}"
+            if rng.random() < config.failure_share:
+                failed.append(test_name)
+                yield f"{module_dir}/UnitTest/Tests/{name}.cpp:{rng.randint(10, 400)}: Failure"
+                yield "Expected equality of these values:"
+                yield f"  {rng.randint(0, 9)}"
+                yield f"[  FAILED  ] {test_name} ({duration_ms} ms)"
+            else:
+                yield f"[       OK ] {test_name} ({duration_ms} ms)"
+        yield f"[----------] {config.tests} tests from {name} ({suite_ms} ms total)"
+        yield ""
+    yield "[----------] Global test environment tear-down"
+    yield f"[==========] {total} tests from {config.suites} test suites ran. ({rng.randint(1000, 9999)} ms total)"
+    yield f"[  PASSED  ] {total - len(failed)} tests."
+    if failed:
+        yield f"[  FAILED  ] {len(failed)} tests, listed below:"
+        for test_name in failed:
+            yield f"[  FAILED  ] {test_name}"
+
+
+def generate(directory, config):
+    # Writes a build tree of .gcno files and sources below directory
+    # (Application/<module>/...) and the RTT log of one test run that dumps
+    # every object, log.txt.  Returns the log path and what it holds.
+    rng = random.Random(config.seed)
+    module_dir = os.path.join(os.path.abspath(directory), 'Application', config.module)
+    object_dir = os.path.join(module_dir, 'build', 'CMakeFiles', f"{config.module.lower()}.dir", 'src')
+    source_dir = os.path.join(module_dir, 'src')
+    os.makedirs(object_dir, exist_ok=True)
+    os.makedirs(source_dir, exist_ok=True)
+    stamp = rng.getrandbits(32)
+
+    log_path = os.path.join(directory, 'log.txt')
+    stats = {'objects': config.objects, 'gcda_bytes': 0, 'counters': 0, 'zero_counters': 0,
+             'suites': config.suites, 'tests': config.suites * config.tests}
+    with open(log_path, 'w', newline='\n') as log:
+        for line in BANNER:
+            log.write(line + '\n')
+        gcda_paths = []
+        for number in range(config.objects):
+            gcda_path = os.path.join(object_dir, f"m{number}.c.gcda")
+            gcda_paths.append(gcda_path)
+            log.write(f"__gcov_init called for {gcda_path}\n")
+        for line in _test_lines(rng, config, module_dir):
+            log.write(line + '\n')
+
+        log.write("gcov_exit\n")
+        for number, gcda_path in enumerate(gcda_paths):
+            source = os.path.join(source_dir, f"m{number}.c")
+            notes, data, source_text, counters, zeros = make_object(
+                rng, config, object_dir, os.path.relpath(source, object_dir), stamp)
+            with open(gcda_path[:-len('.gcda')] + '.gcno', 'wb') as gcno_file:
+                gcno_file.write(notes)
+            with open(source, 'w') as source_file:
+                source_file.write(source_text)
+            stats['gcda_bytes'] += len(data)
+            stats['counters'] += counters
+            stats['zero_counters'] += zeros
+
+            if rng.random() < config.noise:
+                log.write(rng.choice(NOISE) + '\n')
+            log.write(f"Emitting {len(data)} bytes for {gcda_path}\n")
+            for line in _hexdump_lines(data):
+                log.write(line + '\n')
+            log.write(f"\nCRC32 {zlib.crc32(data):08x}\n{gcda_path}\n")
+        log.write("Gcov End\n")
+    stats['log_bytes'] = os.path.getsize(log_path)
+    return log_path, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic build tree and RTT log of a test run, to "
+                                                 "measure the report generators with")
+    parser.add_argument('directory', help="where Application/<module>/ and log.txt are written")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    log_path, stats = generate(args.directory, config_from_arguments(args))
+    print(f"{log_path}: {stats['log_bytes'] / 1e6:.1f} MB, {stats['objects']} objects, "
+          f"{stats['zero_counters']} of {stats['counters']} counters zero, {stats['tests']} tests")
+    return 0
+
+
+def add_config_arguments(parser):
+    # The LogConfig options, shared with benchmark.py
+    default = LogConfig()
+    parser.add_argument('--objects', type=int, default=default.objects, help="objects dumped (default: %(default)s)")
+    parser.add_argument('--functions', type=int, default=default.functions,
+                        help="functions per object (default: %(default)s)")
+    parser.add_argument('--blocks', type=int, default=default.blocks,
+                        help="basic blocks per function, sets the .gcda size (default: %(default)s)")
+    parser.add_argument('--zero-share', type=float, default=default.zero_share,
+                        help="share of functions that never run (default: %(default)s)")
+    parser.add_argument('--suites', type=int, default=default.suites, help="test suites (default: %(default)s)")
+    parser.add_argument('--tests', type=int, default=default.tests, help="tests per suite (default: %(default)s)")
+    parser.add_argument('--noise', type=float, default=default.noise,
+                        help="chance of a J-Link line between two objects (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=default.seed, help="random seed (default: %(default)s)")
+
+
+def config_from_arguments(args):
+    return LogConfig(objects=args.objects, functions=args.functions, blocks=args.blocks, zero_share=args.zero_share,
+                     suites=args.suites, tests=args.tests, noise=args.noise, seed=args.seed)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import functools
+
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+
+# Template name -> source, filled in by the report modules when they load
+SOURCES = {}
+
+# Rendered pages are written in chunks of this many template events
+STREAM_BUFFER = 64
+
+
+@functools.lru_cache(maxsize=None)
+def environment():
+    # One environment per process.  Each template is compiled once and kept
+    # (no size limit, no reload checks), and the compiled code is cached on
+    # disk, so worker processes and later runs skip the compiler too.
+    return Environment(loader=DictLoader(SOURCES), cache_size=-1, auto_reload=False,
+                       bytecode_cache=FileSystemBytecodeCache())
+
+
+def get_template(name):
+    return environment().get_template(name)
+
+
+def write_page(path, name, **context):
+    # Streams the page into a buffered file instead of building it in one string
+    stream = get_template(name).stream(**context)
+    stream.enable_buffering(STREAM_BUFFER)
+    with open(path, 'w', encoding='utf-8', buffering=1 << 16) as page_file:
+        stream.dump(page_file)
@@ -0,0 +1,253 @@
+import argparse
+import collections
+import json
+import os
+import sys
+from functools import partial
+
+from coverage_pipeline import capture_block
+from log_index import load_index, map_log, marked_lines, read_block
+from path_resolver import PathResolver, load_resolver, rewrite_path
+from worker_pool import default_jobs, map_ordered
+
+
+# Written next to the module's reports by batch_report.py --test-map
+IMPACT_NAME = 'test_impact.json'
+
+# Bumped when the layout of the map changes
+IMPACT_FORMAT_VERSION = 1
+
+# gtest lines that move the owner of the coverage dumps that follow
+_RUN_MARKER = b'[ RUN      ]'
+_SUITE_MARKER = b'[----------]'
+
+
+def dump_owners(log_path, index):
+    # {dump number: owner} for the dumps of a log in which the target
+    # called __gcov_clear before and __gcov_exit after each test (or each
+    # suite).  A dump belongs to the test whose "[ RUN ]" line came last
+    # before it, or to the suite whose "(... ms total)" footer did; owners
+    # are ('test', 'Suite.Name') or ('suite', 'Suite').  Dumps before the
+    # first test have no owner.
+    starts = {}
+    for entry in index['objects']:
+        starts.setdefault(entry['dump'], entry['offset'])
+
+    events = []
+    with open(log_path, 'rb') as log_file, map_log(log_file) as data:
+        for start, _, line in marked_lines(data, (_RUN_MARKER, _SUITE_MARKER)):
+            text = line.decode('utf-8', 'replace').strip()
+            if _RUN_MARKER.decode() in text:
+                events.append((start, ('test', text.split()[-1])))
+            elif ' from ' in text:
+                # The header of a suite ends the previous owner, its footer
+                # ("... (34 ms total)") makes the suite the owner
+                name = text.split(' from ', 1)[1].split()[0]
+                events.append((start, ('suite', name) if 'total)' in text else None))
+
+    owners = {}
+    event = 0
+    owner = None
+    for dump, offset in sorted(starts.items(), key=lambda item: item[1]):
+        while event < len(events) and events[event][0] < offset:
+            owner = events[event][1]
+            event += 1
+        if owner is not None:
+            owners[dump] = owner
+    return owners
+
+
+def _hit_lines(block, rewrite=None):
+    # Runs in a worker: {source: [lines run]} of one object
+    records, message = capture_block(block)
+    if records is None:
+        return None, message
+    return {rewrite_path(coverage.source, rewrite or []): sorted(line for line, hits in coverage.lines.items() if hits > 0)
+            for coverage in records}, message
+
+
+def build_test_map(log_path, jobs=1, progress=None, resolver=None):
+    # {'tests': {test: {source: [lines]}}, 'suites': {suite: {...}}} from
+    # the per-test dumps of one log, and the capture messages.  The dumps of
+    # a test that ran more than once are combined.  A PathResolver finds
+    # the local objects as for the coverage report.
+    if resolver is None:
+        resolver = PathResolver()
+    index = load_index(log_path, progress)
+    owners = dump_owners(log_path, index)
+    owned = {'test': {}, 'suite': {}}
+    messages = []
+    block_owners = collections.deque()
+
+    def owned_blocks(log_file):
+        # Only the dumps that follow a test are read
+        for entry in index['objects']:
+            if entry['dump'] in owners:
+                block = read_block(log_file, entry)
+                if block is not None:
+                    block_owners.append(owners[entry['dump']])
+                    yield block
+
+    with open(log_path, 'rb') as log_file:
+        hit_lines = partial(_hit_lines, rewrite=resolver.rewrite)
+        for lines, message in map_ordered(hit_lines, resolver.resolve_blocks(owned_blocks(log_file)), jobs):
+            kind, name = block_owners.popleft()
+            if lines is None:
+                messages.append(message)
+                continue
+            sources = owned[kind].setdefault(name, {})
+            for source, source_lines in lines.items():
+                if source_lines:
+                    sources.setdefault(source, set()).update(source_lines)
+    if not owners:
+        messages.append("No coverage dump follows a test in the log, dump after every test to build a test map")
+
+    test_map = {'version': IMPACT_FORMAT_VERSION,
+                'log': os.path.abspath(log_path),
+                'tests': {name: {source: sorted(lines) for source, lines in sorted(sources.items())}
+                          for name, sources in sorted(owned['test'].items())},
+                'suites': {name: {source: sorted(lines) for source, lines in sorted(sources.items())}
+                           for name, sources in sorted(owned['suite'].items())}}
+    return test_map, messages
+
+
+def save_test_map(path, test_map):
+    with open(path, 'w') as map_file:
+        json.dump(test_map, map_file, separators=(',', ':'))
+    return path
+
+
+def load_test_map(path):
+    with open(path) as map_file:
+        test_map = json.load(map_file)
+    if test_map.get('version') != IMPACT_FORMAT_VERSION:
+        raise ValueError(f"{path} was written by another version, build it again")
+    return test_map
+
+
+def parse_change(change):
+    # "src/led.c" -> ('src/led.c', None), "src/led.c:10-20,31" ->
+    # ('src/led.c', {10, ..., 20, 31}).  Lines are those of the source the
+    # map was built from.
+    path, separator, ranges = change.rpartition(':')
+    if not separator or not ranges or not all(part.replace('-', '', 1).isdigit() for part in ranges.split(',')):
+        return change, None
+    lines = set()
+    for part in ranges.split(','):
+        first, _, last = part.partition('-')
+        lines.update(range(int(first), int(last or first) + 1))
+    return path, lines
+
+
+def _matches(source, path):
+    # Coverage has the build's absolute paths, change lists are relative
+    source = source.replace('\\', '/')
+    path = os.path.normpath(path).replace('\\', '/')
+    return source == path or source.endswith('/' + path)
+
+
+def select_tests(test_map, changes):
+    # The smallest set of tests (and suites, for suite dumps) whose runs
+    # cover every changed line that any test runs, found greedily, and all
+    # tests that touch the changes.  changes is [(path, lines or None)].
+    # Returns (selected, affected, changed paths no test runs), owners as
+    # ('test' or 'suite', name).
+    covered = {}
+    touched = set()
+    for kind, owners in (('test', test_map['tests']), ('suite', test_map['suites'])):
+        for name, sources in owners.items():
+            elements = set()
+            for source, lines in sources.items():
+                for path, changed_lines in changes:
+                    if _matches(source, path):
+                        run = [(source, line) for line in lines if changed_lines is None or line in changed_lines]
+                        if run:
+                            elements.update(run)
+                            touched.add(path)
+            if elements:
+                covered[(kind, name)] = elements
+    untested = [path for path, _ in changes if path not in touched]
+
+    remaining = set().union(*covered.values()) if covered else set()
+    selected = []
+    while remaining:
+        # Most new lines first; ties go to the owner covering less in
+        # total (usually the quicker test), then by name
+        best = min(covered, key=lambda owner: (-len(covered[owner] & remaining), len(covered[owner]), owner[1]))
+        selected.append(best)
+        remaining -= covered[best]
+        if best[0] == 'suite':
+            # Its tests run with it
+            for owner in covered:
+                if owner[0] == 'test' and _in_suite(owner[1], best[1]):
+                    remaining -= covered[owner]
+    suites = [name for kind, name in selected if kind == 'suite']
+    selected = [owner for owner in selected
+                if owner[0] == 'suite' or not any(_in_suite(owner[1], suite) for suite in suites)]
+    return selected, sorted(covered), untested
+
+
+def _in_suite(test, suite):
+    return test.startswith(suite + '.')
+
+
+def gtest_filter(owners):
+    # --gtest_filter value that runs the selected tests and suites
+    return ':'.join(name if kind == 'test' else f"{name}.*" for kind, name in owners)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Map tests to the source lines they run, from a log with a coverage "
+                                                 "dump after every test, and pick the tests to run for a change")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('map', help="build the test map of a log")
+    build.add_argument('log', help="RTT / serial log with per-test dumps")
+    build.add_argument('-o', '--output', default=IMPACT_NAME, help=f"map file to write (default: {IMPACT_NAME})")
+    build.add_argument('-j', '--jobs', type=int, default=default_jobs(), help="objects captured at the same time")
+    build.add_argument('--path-map', metavar='JSON', help="path_resolver.py config of the local build tree")
+
+    select = commands.add_parser('select', help="the tests to run for changed files")
+    select.add_argument('map', help=f"{IMPACT_NAME} written by 'map' or batch_report.py --test-map")
+    select.add_argument('changes', nargs='*', help="changed files, as path or path:first-last,line")
+    select.add_argument('--changed-from', metavar='FILE',
+                        help="read the changes from FILE, one per line ('-' for stdin), e.g. git diff --name-only")
+    select.add_argument('--all', action='store_true', help="every test that runs a changed line, not the smallest set")
+    args = parser.parse_args(argv)
+
+    if args.command == 'map':
+        if not os.path.exists(args.log):
+            parser.error(f"{args.log} does not exist")
+        test_map, messages = build_test_map(args.log, max(1, args.jobs), resolver=load_resolver(args.path_map))
+        for message in messages:
+            print(message)
+        save_test_map(args.output, test_map)
+        print(f"{len(test_map['tests'])} tests, {len(test_map['suites'])} suites mapped in {args.output}")
+        return 0 if test_map['tests'] or test_map['suites'] else 1
+
+    changes = list(args.changes)
+    if args.changed_from:
+        with (sys.stdin if args.changed_from == '-' else open(args.changed_from)) as changes_file:
+            changes.extend(line.strip() for line in changes_file if line.strip())
+    if not changes:
+        parser.error("no changed files given")
+    try:
+        test_map = load_test_map(args.map)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    selected, affected, untested = select_tests(test_map, [parse_change(change) for change in changes])
+    chosen = affected if args.all else selected
+    for kind, name in chosen:
+        print(name if kind == 'test' else f"{name}.*")
+    print(f"--gtest_filter={gtest_filter(chosen)}", file=sys.stderr)
+    print(f"{len(chosen)} of {len(test_map['tests']) + len(test_map['suites'])} tests and suites, "
+          f"{len(affected)} touch the changes", file=sys.stderr)
+    for path in untested:
+        print(f"No test runs {path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Written to Reports/<module> when timings are asked for
+TRACE_NAME = 'timings.json'
+
+
+def peak_rss():
+    # Peak resident set size of this process so far, in bytes (None where
+    # the platform does not tell)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def timed(timings, stage, items=None):
+    # A timed stage of `timings`, or nothing when no timings are collected.
+    # Yields the stage's Span (None without timings).
+    return contextlib.nullcontext() if timings is None else timings.stage(stage, items)
+
+
+class Span:
+    # One timed piece of work: a whole stage, or one item of it (a decoded
+    # block, an object captured in a worker).  `start` is a perf_counter()
+    # reading, which all processes of a run share.
+    __slots__ = ('stage', 'name', 'start', 'wall', 'cpu', 'peak_rss', 'items', 'pid', '_cpu_start')
+
+    def __init__(self, stage, name=None, items=None):
+        self.stage = stage
+        self.name = name or stage
+        self.items = items
+        self.pid = os.getpid()
+        self.peak_rss = None
+        self.wall = self.cpu = 0.0
+        self.start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.start
+        self.cpu = time.process_time() - self._cpu_start
+        self.peak_rss = peak_rss()
+        return self
+
+
+class TimedCall:
+    # Wraps a job for map_ordered: the worker returns (result, Span) so the
+    # job's own wall time, CPU time and memory come back with its result
+    def __init__(self, function, stage):
+        self.function = function
+        self.stage = stage
+
+    def __call__(self, item, **keywords):
+        span = Span(self.stage, getattr(item, 'name', None), 1)
+        result = self.function(item, **keywords)
+        return result, span.finish()
+
+
+class Timings:
+    # Collects the spans of one run and sums them up per stage.  Passed to
+    # the pipelines next to a Progress, and like it optional everywhere.
+    def __init__(self):
+        self.spans = []
+        self.origin = time.perf_counter()
+
+    def add(self, span):
+        self.spans.append(span)
+        return span
+
+    @contextlib.contextmanager
+    def stage(self, stage, items=None):
+        # Times the body; set `items` on the yielded span once known
+        span = Span(stage, items=items)
+        try:
+            yield span
+        finally:
+            self.add(span.finish())
+
+    def iterate(self, stage, items):
+        # Passes the items through, timing how long producing each one took
+        iterator = iter(items)
+        while True:
+            span = Span(stage, items=1)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            span.name = getattr(item, 'name', None) or stage
+            self.add(span.finish())
+            yield item
+
+    def summary(self):
+        # stage -> totals, in the order the stages started.  The wall and
+        # CPU times of per-item spans are sums, so on several workers they
+        # can exceed the wall time of the stage that ran them.
+        stages = {}
+        for span in sorted(self.spans, key=lambda span: span.start):
+            totals = stages.setdefault(span.stage, {'spans': 0, 'wall': 0.0, 'cpu': 0.0,
+                                                    'items': 0, 'peak_rss': None})
+            totals['spans'] += 1
+            totals['wall'] += span.wall
+            totals['cpu'] += span.cpu
+            totals['items'] += span.items or 0
+            if span.peak_rss is not None:
+                totals['peak_rss'] = max(totals['peak_rss'] or 0, span.peak_rss)
+        return stages
+
+    def lines(self):
+        # Human readable summary, one line per stage
+        lines = []
+        for stage, totals in self.summary().items():
+            peak = f", peak {totals['peak_rss'] / 1e6:.0f} MB" if totals['peak_rss'] else ""
+            lines.append(f"{stage}: {totals['wall']:.3f} s wall, {totals['cpu']:.3f} s CPU, "
+                         f"{totals['items']} items in {totals['spans']} spans{peak}")
+        return lines
+
+    def write_trace(self, path):
+        # Chrome trace format (chrome://tracing, Perfetto): one complete
+        # event per span, one row per process.  The per-stage totals ride
+        # along under "stages", which trace viewers ignore.
+        main_pid = os.getpid()
+        events = []
+        for pid in sorted({span.pid for span in self.spans} | {main_pid}):
+            name = 'report' if pid == main_pid else f'worker {pid}'
+            events.append({'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': pid, 'args': {'name': name}})
+        for span in self.spans:
+            events.append({'ph': 'X', 'cat': span.stage, 'name': span.name, 'pid': span.pid, 'tid': span.pid,
+                           'ts': round((span.start - self.origin) * 1e6, 1), 'dur': round(span.wall * 1e6, 1),
+                           'args': {'cpu_ms': round(span.cpu * 1e3, 3), 'peak_rss': span.peak_rss, 'items': span.items}})
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'stages': self.summary()}, trace_file)
+        return path
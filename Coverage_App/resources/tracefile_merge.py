@@ -0,0 +1,131 @@
+from array import array
+from fnmatch import fnmatchcase
+
+from lcov_info import FileCoverage, format_record
+
+
+# What `lcov --extract ... '*/Application/*'` used to keep
+APPLICATION_PATTERNS = ('*/Application/*',)
+
+# Counter value for a line without code / a branch that was never evaluated
+_NONE = -1
+
+
+class _MergedFile:
+    # Counters of one source file summed over all tracefiles.  Lines and
+    # branches live in flat arrays so thousands of inputs cost no more
+    # memory than one.
+    __slots__ = ('lines', 'functions', 'branch_index', 'branches')
+
+    def __init__(self):
+        self.lines = array('q')         # hits by line number, _NONE where there is no code
+        self.functions = {}             # function name -> [start line, hit count]
+        self.branch_index = {}          # (line, block, branch) -> position in branches
+        self.branches = array('q')      # taken counts, _NONE for '-'
+
+    def add_line(self, line, hits):
+        if line >= len(self.lines):
+            self.lines.extend(array('q', [_NONE]) * (line + 1 - len(self.lines)))
+        if self.lines[line] == _NONE:
+            self.lines[line] = hits
+        else:
+            self.lines[line] += hits
+
+    def add_branch(self, key, taken):
+        index = self.branch_index.get(key)
+        if index is None:
+            self.branch_index[key] = len(self.branches)
+            self.branches.append(taken)
+        elif self.branches[index] == _NONE:
+            self.branches[index] = taken
+        elif taken != _NONE:
+            self.branches[index] += taken
+
+    def to_coverage(self, source):
+        coverage = FileCoverage(source)
+        coverage.lines = {line: hits for line, hits in enumerate(self.lines) if hits != _NONE}
+        coverage.functions = {name: list(function) for name, function in self.functions.items()}
+        coverage.branches = {key: None if self.branches[index] == _NONE else self.branches[index]
+                             for key, index in self.branch_index.items()}
+        return coverage
+
+
+class TracefileMerger:
+    # Replaces `lcov --zerocounters`, `lcov -a ... -a ...` and
+    # `lcov --extract`: tracefiles are read one line at a time, records of
+    # sources outside `patterns` are skipped while reading, and the result
+    # is written out once.
+    def __init__(self, patterns=APPLICATION_PATTERNS):
+        self.patterns = patterns
+        self.files = {}
+        self.wanted = {}    # source -> whether it matches the patterns
+
+    def is_wanted(self, source):
+        wanted = self.wanted.get(source)
+        if wanted is None:
+            wanted = not self.patterns or any(fnmatchcase(source, pattern) for pattern in self.patterns)
+            self.wanted[source] = wanted
+        return wanted
+
+    def add_tracefile(self, path):
+        current = None
+        skipping = False
+        with open(path, 'r', errors='replace') as info_file:
+            for line in info_file:
+                tag, _, value = line.rstrip('\r\n').partition(':')
+
+                if tag == 'SF':
+                    skipping = not self.is_wanted(value)
+                    current = None if skipping else self.files.setdefault(value, _MergedFile())
+                elif tag == 'end_of_record':
+                    current = None
+                    skipping = False
+                elif skipping or current is None:
+                    continue
+                elif tag == 'DA':
+                    fields = value.split(',')
+                    current.add_line(int(fields[0]), int(fields[1]))
+                elif tag == 'BRDA':
+                    line_no, block, branch, taken = value.split(',', 3)
+                    current.add_branch((int(line_no), int(block), int(branch)),
+                                       _NONE if taken == '-' else int(taken))
+                elif tag == 'FN':
+                    line_no, name = value.split(',', 1)
+                    current.functions.setdefault(name, [int(line_no), 0])
+                elif tag == 'FNDA':
+                    hits, name = value.split(',', 1)
+                    current.functions.setdefault(name, [0, 0])[1] += int(hits)
+                # TN, the totals (LF, LH, ...) and anything newer lcov adds
+                # are recomputed or not needed
+
+    def add_coverage(self, coverage):
+        # Adds a FileCoverage record, for inputs that are not tracefiles
+        if not self.is_wanted(coverage.source):
+            return
+        current = self.files.setdefault(coverage.source, _MergedFile())
+        for line, hits in coverage.lines.items():
+            current.add_line(line, hits)
+        for name, (line, hits) in coverage.functions.items():
+            current.functions.setdefault(name, [line, 0])[1] += hits
+        for key, taken in coverage.branches.items():
+            current.add_branch(key, _NONE if taken is None else taken)
+
+    def coverages(self):
+        # The merged records as FileCoverage objects, sorted by source
+        for source in sorted(self.files):
+            yield self.files[source].to_coverage(source)
+
+    def write(self, path, test_name=''):
+        with open(path, 'w') as info_file:
+            for coverage in self.coverages():
+                info_file.write(format_record(coverage, test_name))
+        return len(self.files)
+
+
+def merge_tracefiles(paths, output_path, patterns=APPLICATION_PATTERNS):
+    # Combine the tracefiles into output_path, keeping only the sources that
+    # match one of the patterns.  Returns the number of source files written.
+    merger = TracefileMerger(patterns)
+    for path in paths:
+        merger.add_tracefile(path)
+    return merger.write(output_path)
@@ -0,0 +1,38 @@
+import collections
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Items handed to the pool ahead of the one we are waiting for, per worker.
+# Enough to keep every worker busy without queueing a whole log in memory.
+PENDING_PER_WORKER = 4
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+def map_ordered(function, items, jobs=1):
+    # Like map(), but spread over `jobs` worker processes.  Results always
+    # come back in the order of `items`, so the output does not depend on
+    # the number of workers or on which one finishes first.
+    if jobs is None or jobs <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= jobs * PENDING_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BaseException:
+        # Cancelled, failed or abandoned by the caller: the queued items are
+        # dropped and the workers end after the one they are on
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
@@ -0,0 +1,30 @@
+import os
+import sys
+
+# The tools are flat scripts in resources/, imported the way they import
+# each other
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources')
+if RESOURCES_DIR not in sys.path:
+    sys.path.insert(0, RESOURCES_DIR)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def split_log(directory, objects=3):
+    # Generates a synthetic build and log of `objects` objects in directory.
+    # Returns (log path, lines before the dumped objects, {object name: its
+    # lines}, the end marker), to put logs of other shapes together from.
+    from synthetic_logs import LogConfig, generate
+
+    log_path, _ = generate(str(directory), LogConfig(objects=objects, functions=2, blocks=4, suites=1, tests=2))
+    with open(log_path) as log_file:
+        lines = log_file.read().splitlines(keepends=True)
+    head, dumped, name = [], {}, None
+    for line in lines:
+        if line.startswith("Emitting"):
+            name = os.path.basename(line.split()[-1])
+            dumped[name] = []
+        if line.startswith("Gcov End"):
+            break
+        (dumped[name] if name else head).append(line)
+    return log_path, head, dumped, ["Gcov End\n"]
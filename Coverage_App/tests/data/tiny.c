@@ -0,0 +1,18 @@
+static int classify(int x)
+{
+    if (x < 0)
+        return -1;
+    if (x == 0)
+        return 0;
+    return 1;
+}
+
+int main(void)
+{
+    int total = 0;
+    for (int i = -2; i < 3; i++)
+        total += classify(i);
+    if (total > 10)
+        total = 10;
+    return total;
+}
@@ -0,0 +1,64 @@
+import os
+import shutil
+
+from batch_report import main, report_roots
+from coverage_store import CoverageStore
+from synthetic_logs import LogConfig, generate
+
+
+def test_roots_are_the_log_names():
+    assert report_roots(['logs/nightly.txt', 'logs/weekly.log']) == {'logs/nightly.txt': 'nightly',
+                                                                     'logs/weekly.log': 'weekly'}
+
+
+def test_logs_of_the_same_name_get_their_parent_directories():
+    roots = report_roots(['/ci/board1/log.txt', '/ci/board2/log.txt', '/ci/other.txt'])
+    assert roots == {'/ci/board1/log.txt': 'board1_log', '/ci/board2/log.txt': 'board2_log',
+                     '/ci/other.txt': 'other'}
+
+
+def test_same_log_twice_is_numbered():
+    roots = report_roots(['x/log.txt', './x/log.txt'])
+    assert sorted(roots.values()) == ['log_0', 'log_1']
+
+
+def test_socket_source_is_named_after_host_and_port():
+    assert report_roots(['tcp://localhost:19021']) == {'tcp://localhost:19021': 'localhost_19021'}
+
+
+def test_boards_of_the_same_module_write_their_own_trees(tmp_path, capsys):
+    log_path, _ = generate(str(tmp_path), LogConfig(objects=2, functions=2, blocks=4, suites=2, tests=2))
+    logs = []
+    for board in ('board1', 'board2'):
+        os.makedirs(tmp_path / board)
+        logs.append(shutil.copy(log_path, str(tmp_path / board / 'log.txt')))
+    output = tmp_path / 'Reports'
+
+    assert main([*logs, '-o', str(output), '-j', '2', '--no-cache', '--timings']) == 0
+    assert "2 logs, 0 problems" in capsys.readouterr().out
+    for root in ('board1_log', 'board2_log'):
+        module_dir = output / root / 'Bench'
+        assert (module_dir / 'CoverageReport' / 'index.html').exists()
+        assert (module_dir / 'TestReport' / 'main_test_report.html').exists()
+        assert (module_dir / 'timings.json').exists()
+
+
+def test_logs_of_the_same_name_are_stored_as_their_own_runs(tmp_path, capsys):
+    log_path, _ = generate(str(tmp_path), LogConfig(objects=2, functions=2, blocks=4, suites=1, tests=2))
+    logs = []
+    for board in ('board1', 'board2'):
+        os.makedirs(tmp_path / board)
+        logs.append(shutil.copy(log_path, str(tmp_path / board / 'log.txt')))
+    store_path = str(tmp_path / 'runs.db')
+    arguments = [*logs, '-o', str(tmp_path / 'Reports'), '--no-tests', '--no-cache', '--store', store_path]
+
+    assert main(arguments) == 0
+    with CoverageStore(store_path) as store:
+        names = [run[0] for run in store.runs()]
+    assert len(names) == 2
+    assert names[0].startswith('board1_log@') and names[1].startswith('board2_log@')
+
+    # The same logs again are the same runs
+    assert main(arguments) == 1
+    assert "ERROR: A run named board1_log@" in capsys.readouterr().out
+    assert main(arguments + ['--store-replace']) == 0
@@ -0,0 +1,60 @@
+import pytest
+
+from binary_dump import END_MARKER, is_binary_dump, iter_binary_blocks
+from gcov_format import GCOV_DATA_MAGIC
+
+
+def _payload(size):
+    # gcda magic, then zeros, which can never be taken for a record
+    return (GCOV_DATA_MAGIC.to_bytes(4, 'little') + bytes(size))[:size]
+
+
+def _record(path, payload, old_firmware=False):
+    # The firmware's record: path NUL, size MSB first, payload.  Existing
+    # firmware stores size / 255 in the third byte instead of size >> 8.
+    size = len(payload)
+    middle = (size // 255 if old_firmware else size >> 8) & 0xff
+    length = bytes([(size >> 24) & 0xff, (size >> 16) & 0xff, middle, size & 0xff])
+    return path.encode() + b'\0' + length + payload
+
+
+def _write(tmp_path, *records):
+    dump_path = tmp_path / 'gcov_output.bin'
+    dump_path.write_bytes(b''.join(records) + END_MARKER)
+    return str(dump_path)
+
+
+def _blocks(dump_path):
+    return [(block.path, block.expected_size, bytes(block.data)) for block in iter_binary_blocks(dump_path)]
+
+
+@pytest.mark.parametrize('old_firmware', [False, True])
+def test_payload_sizes(tmp_path, old_firmware):
+    # 65000 // 255 is 254, 65000 >> 8 is 253: the third byte differs
+    payloads = [_payload(300), _payload(65000), _payload(70000)]
+    paths = [f'/build/Application/App/m{number}.c.gcda' for number in range(len(payloads))]
+    dump_path = _write(tmp_path, *(_record(path, payload, old_firmware) for path, payload in zip(paths, payloads)))
+    assert is_binary_dump(dump_path)
+    assert _blocks(dump_path) == [(path, len(payload), payload) for path, payload in zip(paths, payloads)]
+
+
+def test_old_firmware_size_that_differs_from_the_plain_reading(tmp_path):
+    payload = _payload(65000)
+    record = _record('/build/a.c.gcda', payload, old_firmware=True)
+    # Read plainly the stored size would be 65000 + 256
+    assert int.from_bytes(record[len('/build/a.c.gcda') + 1:][:4], 'big') != len(payload)
+    assert _blocks(_write(tmp_path, record)) == [('/build/a.c.gcda', 65000, payload)]
+
+
+def test_cut_image_gives_an_incomplete_block(tmp_path):
+    dump_path = tmp_path / 'gcov_output.bin'
+    dump_path.write_bytes(_record('/build/a.c.gcda', _payload(300)) + _record('/build/b.c.gcda', _payload(500))[:200])
+    blocks = list(iter_binary_blocks(str(dump_path)))
+    assert [block.is_complete() for block in blocks] == [True, False]
+    assert blocks[1].path == '/build/b.c.gcda'
+
+
+def test_serial_log_is_not_a_binary_dump(tmp_path):
+    log_path = tmp_path / 'log.txt'
+    log_path.write_bytes(b'SEGGER J-Link V7.86g - Real time terminal output\nEmitting 300 bytes for /a.c.gcda\n')
+    assert not is_binary_dump(str(log_path))
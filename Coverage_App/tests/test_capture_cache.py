@@ -0,0 +1,82 @@
+import os
+import shutil
+
+from capture_cache import CaptureCache
+from conftest import DATA_DIR, split_log
+from coverage_pipeline import capture_log
+from serial_log import GcdaBlock
+
+
+def _tiny(directory):
+    # A block of data/tiny.gcda next to a copy of its .gcno
+    gcno_path = shutil.copy(os.path.join(DATA_DIR, 'tiny.gcno'), str(directory))
+    with open(os.path.join(DATA_DIR, 'tiny.gcda'), 'rb') as gcda_file:
+        data = gcda_file.read()
+    return GcdaBlock(gcno_path[:-len('.gcno')] + '.gcda', len(data), data), gcno_path
+
+
+def test_key_follows_the_gcno_and_the_counters(tmp_path):
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    block, gcno_path = _tiny(tmp_path)
+    key = cache.key(block, gcno_path)
+    assert key is not None and cache.key(block, gcno_path) == key
+
+    other_counters = GcdaBlock(block.path, block.expected_size, block.data[:-1] + b'\x01')
+    assert cache.key(other_counters, gcno_path) != key
+    # The same build in another directory reads its sources from there
+    os.makedirs(tmp_path / 'copy')
+    _, copied_gcno = _tiny(tmp_path / 'copy')
+    assert cache.key(block, copied_gcno) != key
+    with open(gcno_path, 'ab') as gcno_file:
+        gcno_file.write(b'\0\0\0\0')
+    assert cache.key(block, gcno_path) != key
+
+
+def test_blocks_that_cannot_be_captured_have_no_key(tmp_path):
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    block, gcno_path = _tiny(tmp_path)
+    assert cache.key(GcdaBlock(None, block.expected_size, block.data), gcno_path) is None
+    assert cache.key(GcdaBlock(block.path, block.expected_size + 4, block.data), gcno_path) is None
+    assert cache.key(GcdaBlock(block.path, block.expected_size, block.data, crc=0), gcno_path) is None
+    assert cache.key(block, str(tmp_path / 'missing.gcno')) is None
+
+
+def test_entries_read_back(tmp_path):
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    key = 'ab' * 32
+    assert cache.get(key) is None
+    cache.put(key, 'SF:/a/led.c\nDA:1,1\nend_of_record\n')
+    assert cache.get(key) == 'SF:/a/led.c\nDA:1,1\nend_of_record\n'
+
+    # A damaged entry is a miss
+    [(_, _, path)] = cache.entries()
+    with open(path, 'wb') as entry_file:
+        entry_file.write(b'not zlib')
+    assert cache.get(key) is None
+
+
+def test_trim_removes_the_least_recently_used(tmp_path):
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    keys = [f'{number:02x}' * 32 for number in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, 'DA:1,1\n' * 100)
+        # Oldest first, a minute apart
+        path = cache._entry_path(key)
+        os.utime(path, (1000000 + 60 * age, 1000000 + 60 * age))
+    size = cache.entries()[0][1]
+
+    # Reading the oldest makes it the most recently used
+    assert cache.get(keys[0]) is not None
+    assert cache.trim(2 * size) == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.trim(0) == 2 and cache.entries() == []
+
+
+def test_second_capture_reuses_every_object(tmp_path):
+    log_path, _, _, _ = split_log(tmp_path, objects=2)
+    cache = CaptureCache(str(tmp_path / 'cache'))
+    first = capture_log(log_path, cache=cache, info_dir=str(tmp_path))[2]
+    assert "Capture cache: 0 of 2 objects reused" in first
+    second = capture_log(log_path, cache=cache, info_dir=str(tmp_path))[2]
+    assert "Capture cache: 2 of 2 objects reused" in second
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from conftest import split_log
+from coverage_pipeline import capture_log, merge_info_files
+
+
+def _capture(directory, log_path, lines, jobs):
+    with open(log_path, 'w') as log_file:
+        log_file.writelines(lines)
+    info_dir = os.path.join(str(directory), f'info-{jobs}')
+    os.makedirs(info_dir, exist_ok=True)
+    info_files, _, messages, _ = capture_log(log_path, jobs, info_dir)
+    return info_files, messages, {coverage.source: dict(coverage.lines) for coverage in merge_info_files(info_files)}
+
+
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_every_dump_of_an_object_counts(tmp_path, jobs):
+    log_path, head, dumped, end = split_log(tmp_path, objects=2)
+    _, _, once = _capture(tmp_path, log_path, head + dumped['m0.c.gcda'] + dumped['m1.c.gcda'] + end, jobs)
+
+    # A second dump of m0, as after __gcov_clear and another test
+    info_files, messages, twice = _capture(
+        tmp_path, log_path, head + dumped['m0.c.gcda'] + dumped['m1.c.gcda'] + end + dumped['m0.c.gcda'] + end, jobs)
+    assert len(info_files) == len(set(info_files)) == 3
+    assert messages.count("Captured: m0.c.gcda") == 2
+
+    [m0] = [source for source in once if source.endswith('m0.c')]
+    [m1] = [source for source in once if source.endswith('m1.c')]
+    assert twice[m0] == {line: hits * 2 for line, hits in once[m0].items()}
+    assert twice[m1] == once[m1]
@@ -0,0 +1,101 @@
+import json
+import os
+
+from coverage_report import MANIFEST_NAME, SUMMARY_NAME, TOP_DIRECTORY, write_coverage_report
+from lcov_info import FileCoverage
+
+
+def _sources(directory, names):
+    # FileCoverage records of small source files written to directory
+    coverages = []
+    for name in names:
+        path = os.path.join(str(directory), name)
+        os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+        with open(path, 'w') as source_file:
+            source_file.write('int f(void)\n{\n    return 1;\n}\n')
+        coverage = FileCoverage(path)
+        coverage.add_function('f', 1, 1)
+        coverage.add_line(1, 1)
+        coverage.add_line(3, 1)
+        coverages.append(coverage)
+    return coverages
+
+
+def _pages(report_dir):
+    with open(os.path.join(str(report_dir), MANIFEST_NAME)) as manifest_file:
+        return {source: entry['page'] for source, entry in json.load(manifest_file)['files'].items()}
+
+
+def test_unchanged_pages_are_reused(tmp_path):
+    coverages = _sources(tmp_path / 'src', ['app/led.c', 'app/timer.c', 'lib/util.c'])
+    report_dir = tmp_path / 'report'
+    assert write_coverage_report(coverages, str(report_dir)) == (3, 0)
+    assert write_coverage_report(coverages, str(report_dir)) == (0, 3)
+
+    # New counters for one source, or its text changed
+    coverages[0].add_line(3, 1)
+    with open(coverages[1].source, 'a') as source_file:
+        source_file.write('\n')
+    assert write_coverage_report(coverages, str(report_dir)) == (2, 1)
+
+
+def test_pages_of_removed_sources_are_deleted(tmp_path):
+    coverages = _sources(tmp_path / 'src', ['app/led.c', 'app/timer.c', 'lib/util.c', 'drv/spi.c'])
+    report_dir = tmp_path / 'report'
+    write_coverage_report(coverages, str(report_dir))
+    pages = _pages(report_dir)
+    timer_page, spi_page = (report_dir / pages[coverage.source] for coverage in (coverages[1], coverages[3]))
+    assert timer_page.exists() and spi_page.exists()
+
+    assert write_coverage_report([coverages[0], coverages[2]], str(report_dir)) == (0, 2)
+    assert not timer_page.exists() and not spi_page.exists()
+    # drv/ is gone from the report with its only source, app/ stays
+    assert not (spi_page.parent / 'index.html').exists()
+    assert (timer_page.parent / 'index.html').exists()
+    assert all((report_dir / page).exists() for page in _pages(report_dir).values())
+
+
+def test_pages_move_with_the_common_prefix(tmp_path):
+    coverages = _sources(tmp_path / 'src', ['app/led.c', 'lib/util.c'])
+    report_dir = tmp_path / 'report'
+    write_coverage_report(coverages, str(report_dir))
+    before = report_dir / _pages(report_dir)[coverages[0].source]
+
+    # Without lib/, the pages are named from src/app instead of src
+    assert write_coverage_report(coverages[:1], str(report_dir)) == (1, 0)
+    after = report_dir / _pages(report_dir)[coverages[0].source]
+    assert after != before and after.exists() and not before.exists()
+
+
+def test_top_level_sources_have_their_own_directory_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    coverages = _sources('', ['main.c', 'app/led.c'])
+    report_dir = tmp_path / 'report'
+    write_coverage_report(coverages, str(report_dir))
+    assert _pages(report_dir)['main.c'] == os.path.join(TOP_DIRECTORY, 'main.c.gcov.html')
+    with open(report_dir / 'index.html') as index_file:
+        index = index_file.read()
+    assert 'Directory' in index and TOP_DIRECTORY in index and 'app' in index
+
+    # Once main.c leaves, its directory page goes and the report's index stays
+    write_coverage_report(coverages[1:], str(report_dir))
+    assert not (report_dir / TOP_DIRECTORY / 'index.html').exists()
+    assert (report_dir / 'index.html').exists()
+
+
+def test_summary_json_has_the_totals_and_every_file(tmp_path):
+    coverages = _sources(tmp_path / 'src', ['app/led.c', 'lib/util.c'])
+    coverages[1].add_line(4, 0)
+    coverages[1].add_branch(3, 0, 0, 1)
+    coverages[1].add_branch(3, 0, 1, None)
+    report_dir = tmp_path / 'report'
+    write_coverage_report(coverages, str(report_dir), title='Led')
+    with open(report_dir / SUMMARY_NAME) as summary_file:
+        summary = json.load(summary_file)
+
+    assert summary['title'] == 'Led'
+    assert summary['totals'] == {'lines_found': 5, 'lines_hit': 4, 'functions_found': 2, 'functions_hit': 2,
+                                 'branches_found': 2, 'branches_hit': 1}
+    util = summary['files'][coverages[1].source]
+    assert util['page'] == _pages(report_dir)[coverages[1].source]
+    assert (util['lines_found'], util['lines_hit'], util['branches_found']) == (3, 2, 2)
@@ -0,0 +1,84 @@
+import pytest
+
+from coverage_store import CoverageStore
+from lcov_info import FileCoverage
+
+
+def _coverage(source, lines, functions=None, branches=None):
+    coverage = FileCoverage(source)
+    for line, hits in lines.items():
+        coverage.add_line(line, hits)
+    for name, (line, hits) in (functions or {}).items():
+        coverage.add_function(name, line, hits)
+    for (line, block, branch), taken in (branches or {}).items():
+        coverage.add_branch(line, block, branch, taken)
+    return coverage
+
+
+def _lines(coverages):
+    return {coverage.source: coverage.lines for coverage in coverages}
+
+
+def _three_runs(path):
+    # Two Led runs and a Timer run
+    store = CoverageStore(path)
+    store.add_run('led-1', [_coverage('/a/led.c', {1: 1, 2: 0, 3: 2}), _coverage('/a/util.c', {5: 1})], 'Led')
+    store.add_run('led-2', [_coverage('/a/led.c', {1: 3, 2: 1, 3: 0})], 'Led')
+    store.add_run('timer', [_coverage('/a/timer.c', {7: 4})], 'Timer')
+    return store
+
+
+def test_run_reads_back_as_stored(tmp_path):
+    coverage = _coverage('/a/led.c', {1: 1, 2: 0, 1000: 7}, {'led_on': (1, 1), 'led_off': (900, 0)},
+                         {(2, 0, 0): 3, (2, 0, 1): 0, (1000, 1, 0): None})
+    path = str(tmp_path / 'runs.db')
+    with CoverageStore(path) as store:
+        store.add_run('nightly', [coverage], 'Led', '/logs/nightly.txt')
+
+    with CoverageStore(path) as store:
+        [(name, module, log, _, files)] = store.runs()
+        assert (name, module, log, files) == ('nightly', 'Led', '/logs/nightly.txt', 1)
+        [stored] = store.union(['nightly'])
+    assert (stored.source, stored.lines, stored.functions, stored.branches) == \
+        (coverage.source, coverage.lines, coverage.functions, coverage.branches)
+
+
+def test_union_sums_the_runs(tmp_path):
+    with _three_runs(str(tmp_path / 'runs.db')) as store:
+        assert _lines(store.union(module='Led')) == {'/a/led.c': {1: 4, 2: 1, 3: 2}, '/a/util.c': {5: 1}}
+        assert _lines(store.union()) == {'/a/led.c': {1: 4, 2: 1, 3: 2}, '/a/timer.c': {7: 4}, '/a/util.c': {5: 1}}
+        with pytest.raises(KeyError):
+            store.union(['led-3'])
+
+
+def test_intersection_keeps_what_every_run_ran(tmp_path):
+    with _three_runs(str(tmp_path / 'runs.db')) as store:
+        # util.c is not in led-2, so none of it counts
+        assert _lines(store.intersection(module='Led')) == {'/a/led.c': {1: 1, 2: 0, 3: 0}, '/a/util.c': {5: 0}}
+
+
+def test_delta_is_what_the_baseline_did_not_run(tmp_path):
+    with _three_runs(str(tmp_path / 'runs.db')) as store:
+        # The baseline of led-2 is led-1, the earlier run of its module
+        assert _lines(store.delta('led-2')) == {'/a/led.c': {1: 0, 2: 1, 3: 0}}
+        assert _lines(store.delta('led-1', baseline=['led-2'])) == {'/a/led.c': {1: 0, 2: 0, 3: 2},
+                                                                     '/a/util.c': {5: 1}}
+        # Nothing ran before the first run
+        assert _lines(store.delta('led-1')) == {'/a/led.c': {1: 1, 2: 0, 3: 2}, '/a/util.c': {5: 1}}
+
+
+def test_run_of_the_same_name_is_not_replaced(tmp_path):
+    with CoverageStore(str(tmp_path / 'runs.db')) as store:
+        store.add_run('nightly', [_coverage('a.c', {1: 1})], 'Bench')
+        with pytest.raises(ValueError, match='nightly'):
+            store.add_run('nightly', [_coverage('a.c', {1: 5})], 'Bench')
+        assert [run[0] for run in store.runs()] == ['nightly']
+        assert store.union(['nightly'])[0].lines == {1: 1}
+
+
+def test_run_is_replaced_when_asked(tmp_path):
+    with CoverageStore(str(tmp_path / 'runs.db')) as store:
+        store.add_run('nightly', [_coverage('a.c', {1: 1})], 'Bench')
+        store.add_run('nightly', [_coverage('a.c', {1: 5})], 'Bench', replace=True)
+        assert [run[0] for run in store.runs()] == ['nightly']
+        assert store.union(['nightly'])[0].lines == {1: 5}
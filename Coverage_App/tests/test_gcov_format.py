@@ -0,0 +1,83 @@
+import os
+import random
+import re
+import struct
+
+import pytest
+
+from conftest import DATA_DIR
+from gcov_format import GCOV_TAG_BLOCKS, GcovFormatError, capture_gcda
+from synthetic_logs import LogConfig, make_object
+
+# data/tiny.gcno and data/tiny.gcda come from `gcc --coverage -O0 tiny.c`
+# (gcc 12.2) and one run of the program; tiny.c.gcov is `gcov -b tiny.c`
+# of that run, the counts the decoder has to agree with.
+GCNO_PATH = os.path.join(DATA_DIR, 'tiny.gcno')
+GCDA_PATH = os.path.join(DATA_DIR, 'tiny.gcda')
+
+GCOV_LINE_RE = re.compile(r'^\s*(\d+|#####):\s*(\d+):')
+GCOV_FUNCTION_RE = re.compile(r'^function (\S+) called (\d+)')
+
+
+def _gcov_counts():
+    # ({line: hits}, {function: calls}) of the gcov output
+    lines, functions = {}, {}
+    with open(os.path.join(DATA_DIR, 'tiny.c.gcov')) as gcov_file:
+        for text in gcov_file:
+            line_match = GCOV_LINE_RE.match(text)
+            if line_match:
+                hits = line_match.group(1)
+                lines[int(line_match.group(2))] = 0 if hits == '#####' else int(hits)
+            function_match = GCOV_FUNCTION_RE.match(text)
+            if function_match:
+                functions[function_match.group(1)] = int(function_match.group(2))
+    return lines, functions
+
+
+def _gcda_data():
+    with open(GCDA_PATH, 'rb') as gcda_file:
+        return gcda_file.read()
+
+
+def test_line_and_function_counts_match_gcov():
+    records = capture_gcda(_gcda_data(), GCNO_PATH, 'tiny.gcda')
+    assert [os.path.basename(record.source) for record in records] == ['tiny.c']
+    lines, functions = _gcov_counts()
+    assert records[0].lines == lines
+    assert {name: hits for name, (_, hits) in records[0].functions.items()} == functions
+
+
+def test_branch_counts_match_gcov():
+    records = capture_gcda(_gcda_data(), GCNO_PATH, 'tiny.gcda')
+    # "branch 0 taken 40%" of the 5 runs of line 3, and so on
+    assert records[0].branches == {(3, 0, 0): 2, (3, 0, 1): 3, (5, 0, 0): 1, (5, 0, 1): 2,
+                                   (13, 0, 0): 5, (13, 0, 1): 1, (15, 0, 0): 0, (15, 0, 1): 1}
+
+
+@pytest.mark.parametrize('size', [0, 8, 40, 100, 140])
+def test_truncated_gcda_is_a_format_error(size):
+    with pytest.raises(GcovFormatError):
+        capture_gcda(_gcda_data()[:size], GCNO_PATH, 'tiny.gcda')
+
+
+def test_truncated_gcno_is_a_format_error(tmp_path):
+    with open(GCNO_PATH, 'rb') as gcno_file:
+        notes = gcno_file.read()
+    for size in (0, 12, 100, 500, len(notes) - 4):
+        gcno_path = tmp_path / 'tiny.gcno'
+        gcno_path.write_bytes(notes[:size])
+        with pytest.raises(GcovFormatError):
+            capture_gcda(_gcda_data(), str(gcno_path), 'tiny.gcda')
+
+
+def test_lines_of_a_block_past_the_block_count_name_the_object(tmp_path):
+    # A .gcno from another build than the .gcda: the LINES records name
+    # blocks the BLOCKS record does not have
+    notes, data, _, _, _ = make_object(random.Random(1), LogConfig(functions=1, blocks=4), str(tmp_path), 'x.c', 1)
+    words = list(struct.unpack(f'<{len(notes) // 4}I', notes))
+    blocks_tag = words.index(GCOV_TAG_BLOCKS)
+    words[blocks_tag + 2] = 2
+    gcno_path = tmp_path / 'x.gcno'
+    gcno_path.write_bytes(struct.pack(f'<{len(words)}I', *words))
+    with pytest.raises(GcovFormatError, match=r'^x\.gcda: function_0: lines of unknown block'):
+        capture_gcda(data, str(gcno_path), 'x.gcda')
@@ -0,0 +1,60 @@
+import json
+import xml.etree.ElementTree as ElementTree
+
+from gtest_outputs import JSON_NAME, JUNIT_NAME, write_junit_xml, write_results_json
+from gtest_report import GTestReportGenerator
+
+# Two suites: a pass, a failure, a test the target never finished, and
+# names that need escaping
+SUITES = [
+    ('Led<Test>', 3, 1, 1, [{'name': 'On', 'status': 'Pass', 'duration_ms': 3},
+                            {'name': 'Off "quoted"', 'status': 'Fail', 'duration_ms': 1500},
+                            {'name': 'Blink', 'status': None, 'duration_ms': None}], None),
+    ('TimerTest', 1, 0, 1, [{'name': 'Tick', 'status': 'Pass', 'duration_ms': None}], 12)]
+
+
+def test_junit_xml(tmp_path):
+    path = str(tmp_path / JUNIT_NAME)
+    write_junit_xml(path, 'Led & co', SUITES)
+    root = ElementTree.parse(path).getroot()
+    assert root.tag == 'testsuites'
+    assert root.attrib == {'name': 'Led & co', 'tests': '4', 'failures': '1', 'errors': '1'}
+
+    led, timer = root
+    assert led.attrib == {'name': 'Led<Test>', 'tests': '3', 'failures': '1', 'errors': '1'}
+    assert timer.attrib == {'name': 'TimerTest', 'tests': '1', 'failures': '0', 'errors': '0', 'time': '0.012'}
+    on, off, blink = led
+    assert on.attrib == {'classname': 'Led<Test>', 'name': 'On', 'time': '0.003'} and len(on) == 0
+    assert off.attrib['name'] == 'Off "quoted"' and off.attrib['time'] == '1.500'
+    assert [child.tag for child in off] == ['failure']
+    assert 'time' not in blink.attrib and [child.tag for child in blink] == ['error']
+
+
+def test_results_json(tmp_path):
+    path = str(tmp_path / JSON_NAME)
+    write_results_json(path, 'Led', SUITES, 2, 4, 2, 1)
+    with open(path) as json_file:
+        results = json.load(json_file)
+    assert results['module'] == 'Led'
+    assert results['totals'] == {'suites': 2, 'tests': 4, 'passed': 2, 'failed': 1}
+    assert [suite['name'] for suite in results['suites']] == ['Led<Test>', 'TimerTest']
+    led = results['suites'][0]
+    assert (led['tests'], led['passed'], led['failed'], led['duration_ms']) == (3, 1, 1, None)
+    assert led['cases'] == [{'name': 'On', 'status': 'passed', 'duration_ms': 3},
+                            {'name': 'Off "quoted"', 'status': 'failed', 'duration_ms': 1500},
+                            {'name': 'Blink', 'status': 'no result', 'duration_ms': None}]
+
+
+def test_report_writes_both_next_to_the_html(tmp_path):
+    log_path = tmp_path / 'log.txt'
+    log_path.write_text("Running main() from /work/Application/Led/UnitTest/Tests/gtest_main.cpp\n"
+                        "[==========] Running 1 test from 1 test suite.\n"
+                        "[----------] 1 test from LedTest\n"
+                        "[ RUN      ] LedTest.On\n"
+                        "[       OK ] LedTest.On (2 ms)\n"
+                        "[----------] 1 test from LedTest (2 ms total)\n")
+    GTestReportGenerator(str(tmp_path / 'Reports')).handle_testreport(str(log_path))
+    report_dir = tmp_path / 'Reports' / 'Led' / 'TestReport'
+    assert (report_dir / 'main_test_report.html').exists()
+    assert ElementTree.parse(str(report_dir / JUNIT_NAME)).getroot().attrib['tests'] == '1'
+    assert json.loads((report_dir / JSON_NAME).read_text())['totals']['passed'] == 1
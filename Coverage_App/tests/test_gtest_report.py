@@ -0,0 +1,123 @@
+import json
+
+from gtest_report import (DURATIONS_NAME, MAX_DURATION_MS, GTestReportGenerator, duration_histogram,
+                          find_regressions, parse_duration)
+
+LOG = '''\
+Running main() from /work/Application/Led/UnitTest/Tests/gtest_main.cpp
+[==========] Running 3 tests from 2 test suites.
+[----------] Global test environment set-up.
+[----------] 2 tests from LedTest
+[ RUN      ] LedTest.On
+[       OK ] LedTest.On (3 ms)
+[ RUN      ] LedTest.Off
+00000000: 61 64 63 67 2a 33 31 42 f5 b1 65 22 00 00 00 01
+led_test.cpp:42: Failure
+[  FAILED  ] LedTest.Off (7 ms)
+[----------] 2 tests from LedTest (10 ms total)
+
+[----------] 1 test from TimerTest
+[ RUN      ] TimerTest.Tick
+[       OK ] TimerTest.Tick (1 ms)
+[----------] 1 test from TimerTest (1 ms total)
+
+[----------] Global test environment tear-down
+[==========] 3 tests from 2 test suites ran. (11 ms total)
+[  PASSED  ] 2 tests.
+[  FAILED  ] 1 test, listed below:
+[  FAILED  ] LedTest.Off
+
+ 1 FAILED TEST
+Emitting 116 bytes for /work/Application/Led/build/led.c.gcda
+00000000: 61 64 63 67 2a 33 31 42 f5 b1 65 22 00 00 00 01
+'''
+
+
+def _parse(text):
+    generator = GTestReportGenerator()
+    # A generator of lines can only be read once
+    result = generator.parse_gtest_output(line for line in text.splitlines(keepends=True))
+    return generator.module_name, result
+
+
+def test_log_is_parsed_in_one_pass():
+    module_name, (suites, total_suites, total_tests, passed, failed) = _parse(LOG)
+    assert module_name == 'Led'
+    assert (total_suites, total_tests, passed, failed) == (2, 3, 2, 1)
+    assert suites == [
+        ('LedTest', 2, 1, 1, [{'name': 'On', 'status': 'Pass', 'duration_ms': 3},
+                              {'name': 'Off', 'status': 'Fail', 'duration_ms': 7}], 10),
+        ('TimerTest', 1, 0, 1, [{'name': 'Tick', 'status': 'Pass', 'duration_ms': 1}], 1)]
+
+
+def test_summary_does_not_count_failures_again():
+    # The FAILED lines of the summary follow the last suite's footer
+    _, (suites, _, _, _, failed) = _parse(LOG)
+    assert failed == 1
+    assert [suite[0] for suite in suites] == ['LedTest', 'TimerTest']
+
+
+def test_log_cut_short_keeps_the_tests_that_ran():
+    # The target stopped in the middle of a suite, without its footer
+    cut = LOG[:LOG.index('[----------] 1 test from TimerTest (1 ms total)')]
+    _, (suites, _, _, _, _) = _parse(cut)
+    assert [suite[0] for suite in suites] == ['LedTest', 'TimerTest']
+    assert suites[-1] == ('TimerTest', 1, 0, 1, [{'name': 'Tick', 'status': 'Pass', 'duration_ms': 1}], 1)
+
+
+def test_report_of_a_log_without_a_module_is_not_written(tmp_path):
+    log_path = tmp_path / 'log.txt'
+    log_path.write_text(LOG.replace('Running main() from /work/Application/Led/UnitTest/Tests/gtest_main.cpp\n', ''))
+    module_name, counts, regressions = GTestReportGenerator(str(tmp_path / 'Reports')).handle_testreport(str(log_path))
+    assert (module_name, counts, regressions) == (None, (2, 2, 1), [])
+    assert not (tmp_path / 'Reports').exists()
+
+
+def test_durations_are_read_from_the_end_of_the_line():
+    assert parse_duration("[       OK ] LedTest.On (3 ms)\n") == 3
+    assert parse_duration("[----------] 2 tests from LedTest (10 ms total)\n") == 10
+    assert parse_duration("[  FAILED  ] LedTest.Off\n") is None
+    # Garbled RTT output gives no duration rather than a wrong one
+    assert parse_duration("[       OK ] LedTest.On (-4 ms)\n") is None
+    assert parse_duration(f"[       OK ] LedTest.On ({MAX_DURATION_MS + 1} ms)\n") is None
+
+
+def test_suite_without_a_footer_sums_its_tests():
+    log = LOG.replace("[----------] 2 tests from LedTest (10 ms total)\n", "")
+    _, (suites, _, _, _, _) = _parse(log)
+    assert [(suite[0], suite[5]) for suite in suites] == [('LedTest', 10), ('TimerTest', 1)]
+    # Unless one of them has no duration
+    _, (suites, _, _, _, _) = _parse(log.replace("[       OK ] LedTest.On (3 ms)", "[       OK ] LedTest.On"))
+    assert suites[0][5] is None
+
+
+def test_histogram_counts_tests_by_duration():
+    tests = [{'duration_ms': duration_ms} for duration_ms in (0, 1, 5, 10, 99, 100, 20000, None)]
+    assert duration_histogram(tests) == [('< 1 ms', 1), ('1 - 10 ms', 2), ('10 - 100 ms', 2), ('100 - 1000 ms', 1),
+                                         ('1000 - 10000 ms', 0), ('>= 10000 ms', 1), ('unknown', 1)]
+
+
+def test_slower_suites_are_regressions():
+    suites = [('Fast', 1, 0, 1, [], 4), ('Slower', 1, 0, 1, [], 130), ('Jitter', 1, 0, 1, [], 6),
+              ('New', 1, 0, 1, [], 50), ('Unknown', 1, 0, 1, [], None)]
+    previous = {'suites': {'Fast': 4, 'Slower': 100, 'Jitter': 2, 'Unknown': 10}}
+    # Jitter took three times longer, but only 4 ms more
+    assert find_regressions(suites, previous) == {'Slower': 100}
+
+
+def test_report_compares_with_the_previous_run(tmp_path):
+    log_path = tmp_path / 'log.txt'
+    log_path.write_text(LOG)
+    reports_dir = str(tmp_path / 'Reports')
+    assert GTestReportGenerator(reports_dir).handle_testreport(str(log_path))[2] == []
+    durations_path = tmp_path / 'Reports' / 'Led' / 'TestReport' / DURATIONS_NAME
+    assert json.loads(durations_path.read_text()) == {
+        'suites': {'LedTest': 10, 'TimerTest': 1},
+        'tests': {'LedTest.Off': 7, 'LedTest.On': 3, 'TimerTest.Tick': 1}}
+
+    log_path.write_text(LOG.replace("(10 ms total)", "(40 ms total)"))
+    assert GTestReportGenerator(reports_dir).handle_testreport(str(log_path))[2] == [('LedTest', 40, 10)]
+    # The run is compared with a baseline instead when given one
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(json.dumps({'suites': {'LedTest': 40, 'TimerTest': 1}}))
+    assert GTestReportGenerator(reports_dir).handle_testreport(str(log_path), baseline_path=str(baseline_path))[2] == []
@@ -0,0 +1,92 @@
+import socket
+import threading
+import time
+
+from conftest import split_log
+from live_log import LiveLog
+
+
+def _encoded(lines):
+    return ''.join(lines).encode()
+
+
+def test_blocks_are_decoded_while_the_log_grows(tmp_path):
+    log_path, head, objects, end = split_log(tmp_path, objects=2)
+    open(log_path, 'wb').close()
+    first_seen = threading.Event()
+    waited = []
+
+    def write():
+        with open(log_path, 'ab') as log_file:
+            log_file.write(_encoded(head + objects['m0.c.gcda']))
+            log_file.flush()
+            # The first object has to arrive before the rest is written
+            waited.append(first_seen.wait(10))
+            second = _encoded(objects['m1.c.gcda'] + end)
+            # A line is not passed on before its newline
+            log_file.write(second[:5])
+            log_file.flush()
+            time.sleep(0.2)
+            log_file.write(second[5:])
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    copy_path = tmp_path / 'copy.txt'
+    names = []
+    for block in LiveLog(log_path, copy_to=str(copy_path), idle_timeout=1).blocks():
+        names.append(block.name)
+        first_seen.set()
+    writer.join()
+
+    assert waited == [True]
+    assert names == ['m0.c.gcda', 'm1.c.gcda']
+    with open(log_path, 'rb') as log_file:
+        assert copy_path.read_bytes() == log_file.read()
+
+
+def test_stop_at_end_does_not_wait_for_the_idle_timeout(tmp_path):
+    log_path, head, objects, end = split_log(tmp_path, objects=1)
+    with open(log_path, 'w') as log_file:
+        log_file.writelines(head + objects['m0.c.gcda'] + end + ["after the dump\n"])
+
+    started = time.monotonic()
+    lines = list(LiveLog(log_path, idle_timeout=30, stop_at_end=True).lines())
+    assert time.monotonic() - started < 10
+    assert lines[-1] == b'Gcov End\n'
+
+
+def test_stop_event_ends_a_log_that_stays_open(tmp_path):
+    log_path, _, _, _ = split_log(tmp_path, objects=1)
+    stop = threading.Event()
+    live = LiveLog(log_path, idle_timeout=30, stop=stop)
+    started = time.monotonic()
+    read = 0
+    for _ in live.lines():
+        read += 1
+        stop.set()
+    assert read >= 1
+    assert time.monotonic() - started < 10
+
+
+def test_socket_source_is_read_until_it_closes(tmp_path):
+    log_path, head, objects, end = split_log(tmp_path, objects=2)
+    data = _encoded(head + objects['m0.c.gcda'] + objects['m1.c.gcda'] + end)
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+
+    def send():
+        connection, _ = server.accept()
+        with connection:
+            # In pieces that split lines, as RTT does
+            for start in range(0, len(data), 1000):
+                connection.sendall(data[start:start + 1000])
+
+    sender = threading.Thread(target=send)
+    sender.start()
+    copy_path = tmp_path / 'rtt.txt'
+    live = LiveLog(f'tcp://127.0.0.1:{port}', copy_to=str(copy_path), idle_timeout=10)
+    assert live.name == f'127.0.0.1_{port}'
+    assert [block.name for block in live.blocks()] == ['m0.c.gcda', 'm1.c.gcda']
+    sender.join()
+    server.close()
+    assert copy_path.read_bytes() == data
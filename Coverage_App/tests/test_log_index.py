@@ -0,0 +1,73 @@
+import os
+
+from conftest import split_log
+from log_index import INDEX_SUFFIX, LogDump, load_index, map_log, scan_log, select_entries
+from serial_log import decode_lines
+
+
+def _two_dumps(directory):
+    # Dump 0 holds m0 and m1, dump 1 m1 again, after a line of test output
+    log_path, head, objects, end = split_log(directory, objects=2)
+    with open(log_path, 'w') as log_file:
+        log_file.writelines(head + objects['m0.c.gcda'] + objects['m1.c.gcda'] + end
+                            + ["[ RUN      ] LedTest.On\n"] + objects['m1.c.gcda'] + end)
+    return log_path
+
+
+def test_entries_point_at_their_blocks(tmp_path):
+    log_path = _two_dumps(tmp_path)
+    entries, dumps = scan_log(log_path)
+    assert dumps == 2
+    assert [(entry['dump'], os.path.basename(entry['path'])) for entry in entries] == [
+        (0, 'm0.c.gcda'), (0, 'm1.c.gcda'), (1, 'm1.c.gcda')]
+
+    with open(log_path, 'rb') as log_file:
+        data = log_file.read()
+    for entry in entries:
+        block = data[entry['offset']:entry['end']]
+        assert block.startswith(b'Emitting %d bytes for ' % entry['size'])
+        # It ends with the file name trailer
+        assert block.endswith(entry['path'].encode() + b'\n')
+
+
+def test_indexed_blocks_are_those_of_a_full_decode(tmp_path):
+    log_path = _two_dumps(tmp_path)
+    with open(log_path, 'rb') as log_file:
+        decoded = [(block.path, bytes(block.data)) for block in decode_lines(log_file)]
+    indexed = [(block.path, bytes(block.data)) for dump in (0, 1) for block in LogDump(log_path, dump).blocks()]
+    assert indexed == decoded
+    assert [block.name for block in LogDump(log_path, 1).blocks()] == ['m1.c.gcda']
+
+
+def test_restart_in_a_dump_drops_the_block(tmp_path):
+    log_path, head, objects, end = split_log(tmp_path, objects=2)
+    # The target reset while sending m0
+    restart = [line for line in head if line.startswith('__gcov_init')]
+    with open(log_path, 'w') as log_file:
+        log_file.writelines(head + objects['m0.c.gcda'][:3] + restart + objects['m1.c.gcda'] + end)
+    entries, _ = scan_log(log_path)
+    assert [os.path.basename(entry['path']) for entry in entries] == ['m1.c.gcda']
+
+
+def test_index_is_saved_and_rebuilt_when_the_log_changes(tmp_path):
+    log_path = _two_dumps(tmp_path)
+    index = load_index(log_path)
+    assert os.path.exists(log_path + INDEX_SUFFIX)
+    assert len(select_entries(index, dump=1)) == 1
+    assert [entry['dump'] for entry in select_entries(index, objects=['m1.c.gcda'])] == [0, 1]
+
+    with open(log_path, 'a') as log_file:
+        log_file.write("Gcov End\n")
+    assert load_index(log_path)['dumps'] == 3 and load_index(log_path) != index
+
+
+def test_log_is_unmapped_after_use(tmp_path):
+    log_path = _two_dumps(tmp_path)
+    with open(log_path, 'rb') as log_file:
+        with map_log(log_file) as data:
+            assert data[:7] == b'SEGGER '
+        assert data.closed
+
+    empty_path = tmp_path / 'empty.txt'
+    empty_path.write_bytes(b'')
+    assert scan_log(str(empty_path)) == ([], 0)
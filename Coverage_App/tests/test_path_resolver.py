@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+import path_resolver
+from path_resolver import PathResolver, rewrite_path
+from serial_log import GcdaBlock
+
+
+@pytest.fixture(autouse=True)
+def scan_cache(tmp_path, monkeypatch):
+    # Scans go to the test's directory, not next to the scripts
+    monkeypatch.setattr(path_resolver, 'SCAN_CACHE_DIR', str(tmp_path / 'scans'))
+
+
+def _gcno(root, *paths):
+    # Empty .gcno files; returns their .gcda paths
+    gcda_paths = []
+    for path in paths:
+        gcno_path = os.path.join(str(root), path)
+        os.makedirs(os.path.dirname(gcno_path), exist_ok=True)
+        open(gcno_path, 'wb').close()
+        gcda_paths.append(gcno_path[:-len('.gcno')] + '.gcda')
+    return gcda_paths
+
+
+def test_path_that_exists_is_kept(tmp_path):
+    [gcda_path] = _gcno(tmp_path, 'build/led.c.gcno')
+    assert PathResolver().resolve(gcda_path) == gcda_path
+    assert PathResolver().resolve('/ci/build/led.c.gcda') is None
+
+
+def test_prefix_is_rewritten(tmp_path):
+    [gcda_path] = _gcno(tmp_path, 'src/build/led.c.gcno')
+    resolver = PathResolver(rewrite=[('C:\\ci\\work\\', str(tmp_path / 'src') + '/')])
+    assert resolver.resolve('C:\\ci\\work\\build\\led.c.gcda') == gcda_path
+    assert rewrite_path('/other/led.c', resolver.rewrite) == '/other/led.c'
+
+
+def test_build_tree_match_with_the_most_directories_wins(tmp_path):
+    led, _ = _gcno(tmp_path, 'build/Application/Led/CMakeFiles/led.dir/src/util.c.gcno',
+                   'build/Application/Timer/CMakeFiles/timer.dir/src/util.c.gcno')
+    resolver = PathResolver(build_dirs=[str(tmp_path / 'build')])
+    assert resolver.resolve('/ci/work/Application/Led/CMakeFiles/led.dir/src/util.c.gcda') == led
+    assert resolver.resolve('/ci/work/Application/Led/CMakeFiles/led.dir/src/missing.c.gcda') is None
+
+
+def test_tie_is_not_resolved(tmp_path):
+    # Both end in src/util.c, neither is closer to the target path
+    _gcno(tmp_path, 'build/Led/src/util.c.gcno', 'build/Timer/src/util.c.gcno')
+    resolver = PathResolver(build_dirs=[str(tmp_path / 'build')])
+    assert resolver.resolve('/ci/work/Fan/src/util.c.gcda') is None
+
+
+def test_unresolved_blocks_keep_the_target_path(tmp_path):
+    [gcda_path] = _gcno(tmp_path, 'build/Led/led.c.gcno')
+    resolver = PathResolver(build_dirs=[str(tmp_path / 'build')])
+    blocks = [GcdaBlock('/ci/Led/led.c.gcda', 0, b''), GcdaBlock('/ci/Led/fan.c.gcda', 0, b''),
+              GcdaBlock(None, 0, b'')]
+    assert [block.path for block in resolver.resolve_blocks(blocks)] == [gcda_path, '/ci/Led/fan.c.gcda', None]
+
+
+def test_config_file(tmp_path):
+    [gcda_path] = _gcno(tmp_path, 'build/Led/led.c.gcno')
+    config_path = tmp_path / 'path_map.json'
+    # Build directories are relative to the config
+    config_path.write_text(json.dumps({'rewrite': [['/ci/', '/home/me/']], 'build_dirs': ['build'],
+                                       'application': r'/(\w+)/led'}))
+    resolver = PathResolver.from_config(str(config_path))
+    assert resolver.resolve('/ci/Led/led.c.gcda') == gcda_path
+    assert resolver.rewrite_path('/ci/src/led.c') == '/home/me/src/led.c'
+    assert resolver.application_name('/ci/Led/led.c.gcda') == 'Led'
+    assert PathResolver().application_name('/ci/Application/Led/build/led.c.gcda') == 'Led'
+
+
+def test_scan_is_reused_until_the_tree_changes(tmp_path):
+    _gcno(tmp_path, 'build/Led/led.c.gcno')
+    build_dirs = [str(tmp_path / 'build')]
+    assert list(PathResolver(build_dirs=build_dirs).scan()) == ['led.c.gcno']
+
+    # Only the directory mtimes are checked: with the old one back, the
+    # saved scan is used and the new object is not seen
+    directory = str(tmp_path / 'build' / 'Led')
+    stat = os.stat(directory)
+    open(os.path.join(directory, 'fan.c.gcno'), 'wb').close()
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert list(PathResolver(build_dirs=build_dirs).scan()) == ['led.c.gcno']
+
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert sorted(PathResolver(build_dirs=build_dirs).scan()) == ['fan.c.gcno', 'led.c.gcno']
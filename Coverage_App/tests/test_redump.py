@@ -0,0 +1,47 @@
+import os
+
+from conftest import split_log
+from coverage_pipeline import REDUMP_NAME, coverage_succeeded, run_coverage
+
+
+def _damage(object_lines):
+    # Flips a byte of the first data line, so only the CRC can tell
+    lines = list(object_lines)
+    offset = len("00000000: ")
+    byte = int(lines[1][offset:offset + 2], 16) ^ 0x01
+    lines[1] = lines[1][:offset] + f"{byte:02x}" + lines[1][offset + 2:]
+    return lines
+
+
+def _run(directory, log_path, lines):
+    with open(log_path, 'w') as log_file:
+        log_file.writelines(lines)
+    os.makedirs(directory / 'info', exist_ok=True)
+    return run_coverage(log_path, str(directory / 'Reports'), info_dir=str(directory / 'info'))
+
+
+def test_damaged_object_is_reported_with_a_redump_script(tmp_path):
+    log_path, head, objects, end = split_log(tmp_path)
+    lines = head + objects['m0.c.gcda'] + _damage(objects['m1.c.gcda']) + objects['m2.c.gcda'] + end
+    application_name, messages = _run(tmp_path, log_path, lines)
+
+    assert not coverage_succeeded(application_name, messages)
+    assert any(message.startswith("ERROR") and 'm1.c.gcda' in message for message in messages)
+    with open(tmp_path / 'Reports' / 'Bench' / REDUMP_NAME) as script:
+        commands = [line for line in script if line.startswith('call')]
+    assert len(commands) == 1 and 'm1.c.gcda' in commands[0]
+
+
+def test_later_dump_replaces_the_damaged_one(tmp_path):
+    log_path, head, objects, end = split_log(tmp_path)
+    damaged = head + objects['m0.c.gcda'] + _damage(objects['m1.c.gcda']) + objects['m2.c.gcda'] + end
+    _run(tmp_path, log_path, damaged)
+
+    # __gcov_dump_file's output, appended to the log
+    application_name, messages = _run(tmp_path, log_path, damaged + objects['m1.c.gcda'] + end)
+    assert coverage_succeeded(application_name, messages)
+    assert application_name == 'Bench'
+    assert "Damaged, dumped again later: m1.c.gcda" in messages
+    assert sum(message.startswith("Captured") for message in messages) == 3
+    # The script of the earlier run is gone with the damage
+    assert not os.path.exists(tmp_path / 'Reports' / 'Bench' / REDUMP_NAME)
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from progress import Progress
+from scheduler import Cancelled, CancelToken, Scheduler
+
+
+def test_task_runs_after_the_tasks_it_needs():
+    scheduler = Scheduler()
+    order = []
+    release = threading.Event()
+
+    def first(token):
+        release.wait(10)
+        order.append('first')
+        return 1
+
+    scheduler.add('second', lambda token: order.append('second'), needs=['first'])
+    scheduler.add('first', first)
+    release.set()
+    tasks = scheduler.wait()
+    assert order == ['first', 'second']
+    assert (tasks['first'].state, tasks['first'].result) == ('done', 1)
+    assert scheduler.finished
+
+
+def test_same_name_is_the_same_task():
+    scheduler = Scheduler()
+    calls = []
+    task = scheduler.add('coverage', lambda token: calls.append(1), needs=['never'])
+    assert scheduler.add('coverage', lambda token: calls.append(2)) is task
+    scheduler.add('never', lambda token: None)
+    scheduler.wait()
+    assert calls == [1]
+
+
+def test_failed_task_cancels_the_tasks_that_need_it():
+    scheduler = Scheduler()
+    ran = []
+
+    def broken(token):
+        raise OSError("no log")
+
+    scheduler.add('coverage', broken)
+    scheduler.add('summary', lambda token: ran.append('summary'), needs=['coverage'])
+    scheduler.add('tests', lambda token: ran.append('tests'))
+    tasks = scheduler.wait()
+    assert tasks['coverage'].state == 'failed' and str(tasks['coverage'].error) == "no log"
+    assert tasks['summary'].state == 'cancelled'
+    assert ran == ['tests']
+
+    reported = []
+    while not scheduler.results.empty():
+        reported.append(scheduler.results.get().name)
+    assert sorted(reported) == ['coverage', 'summary', 'tests']
+
+
+def test_cancelled_token_stops_a_running_task():
+    scheduler = Scheduler()
+    started = threading.Event()
+    checks = []
+
+    def long_stage(token):
+        started.set()
+        while True:
+            checks.append(1)
+            token.check()
+            threading.Event().wait(0.01)
+
+    scheduler.add('coverage', long_stage)
+    scheduler.add('summary', lambda token: None, needs=['coverage'])
+    assert started.wait(10)
+    scheduler.cancel()
+    tasks = scheduler.wait()
+    assert tasks['coverage'].state == 'cancelled' and tasks['coverage'].error is None
+    assert tasks['summary'].state == 'cancelled'
+    assert checks
+
+    # Nothing starts once the job is cancelled
+    assert scheduler.add('tests', lambda token: None).state == 'cancelled'
+
+
+def test_token_stops_a_pipeline_at_its_next_progress_event():
+    token = CancelToken()
+    progress = Progress(interval=0)
+    progress.subscribe(token.check)
+    progress.update('capture', 1, 10, 'objects')
+    token.cancel()
+    with pytest.raises(Cancelled):
+        progress.update('capture', 2, 10, 'objects')
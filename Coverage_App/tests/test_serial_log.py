@@ -0,0 +1,104 @@
+import base64
+import random
+import zlib
+
+from serial_log import decode_lines
+from synthetic_logs import LogConfig, make_object
+
+GCDA_PATH = '/build/Application/App/src/m0.c.gcda'
+
+
+def _data():
+    return make_object(random.Random(5), LogConfig(functions=4, blocks=6), '/build', 'm0.c', 9)[1]
+
+
+def _hexdump(data):
+    for offset in range(0, len(data), 16):
+        yield f"{offset:08x}: " + ''.join(f"{byte:02x} " for byte in data[offset:offset + 16])
+
+
+def _base64(data):
+    # GCOV_OPT_OUTPUT_SERIAL_BASE64: '~' and 64 characters per line
+    for offset in range(0, len(data), 48):
+        yield '~' + base64.b64encode(data[offset:offset + 48]).decode()
+
+
+def _log(data, data_lines, crc=None, sent=None):
+    # The lines __gcov_exit prints for one object; sent is what arrives
+    # instead of data, when the transfer damages it
+    lines = [f"Emitting {len(data)} bytes for {GCDA_PATH}"]
+    lines += data_lines(data if sent is None else sent)
+    lines.append('')
+    if crc is not None:
+        lines.append(f"CRC32 {crc:08x}")
+    lines += [GCDA_PATH, "Gcov End"]
+    return [(line + '\r\n').encode() for line in lines]
+
+
+def _blocks(lines):
+    return list(decode_lines(lines))
+
+
+def test_hexdump_with_crc():
+    data = _data()
+    [block] = _blocks(_log(data, _hexdump, zlib.crc32(data)))
+    assert block.path == GCDA_PATH
+    assert block.data == data
+    assert block.crc == zlib.crc32(data)
+    assert block.is_complete() and block.checksum_ok()
+
+
+def test_base64_with_crc():
+    data = _data()
+    [block] = _blocks(_log(data, _base64, zlib.crc32(data)))
+    assert block.data == data
+    assert block.is_complete() and block.checksum_ok()
+
+
+def test_damaged_byte_fails_the_crc():
+    data = _data()
+    damaged = bytearray(data)
+    damaged[len(data) // 2] ^= 0x10
+    for data_lines in (_hexdump, _base64):
+        [block] = _blocks(_log(data, data_lines, zlib.crc32(data), bytes(damaged)))
+        # Same size, so only the CRC tells
+        assert block.is_complete()
+        assert not block.checksum_ok()
+
+
+def test_damaged_base64_line_fails_the_crc():
+    data = _data()
+    lines = _log(data, _base64, zlib.crc32(data))
+    lines[2] = b'~' + b'!' * 10 + b'\r\n'
+    [block] = _blocks(lines)
+    assert not block.checksum_ok()
+
+
+def test_log_without_crc_is_accepted():
+    data = _data()
+    [block] = _blocks(_log(data, _hexdump))
+    assert block.crc is None
+    assert block.checksum_ok()
+
+
+def test_hex_token_of_the_wrong_length_fails_the_crc():
+    data = _data()
+    lines = _log(data, _hexdump, zlib.crc32(data))
+    # A digit of the fourth byte of a line arrived twice
+    position = len("00000010: 00 00 00 ")
+    lines[2] = lines[2][:position] + lines[2][position:position + 1] + lines[2][position:]
+    [block] = _blocks(lines)
+    assert block.is_complete()
+    assert not block.checksum_ok()
+
+
+def test_xxd_groups_of_two_bytes():
+    data = _data()
+
+    def xxd(data):
+        for offset in range(0, len(data), 16):
+            line = data[offset:offset + 16].hex()
+            yield f"{offset:08x}: " + ' '.join(line[start:start + 4] for start in range(0, len(line), 4))
+
+    [block] = _blocks(_log(data, xxd, zlib.crc32(data)))
+    assert block.data == data and block.checksum_ok()
@@ -0,0 +1,83 @@
+import os
+import random
+import struct
+
+import pytest
+
+from conftest import DATA_DIR
+from gcov_format import GCOV_TAG_COUNTER_ARCS, GCOV_TAG_SPARSE_FLAG, GcovFormatError, expand_sparse_counters
+from synthetic_logs import LogConfig, make_object
+
+# gcov_convert_to_gcda's output for three functions with one counter type
+# (arcs), built with and without GCOV_OPT_SPARSE_COUNTERS on a little
+# endian host:
+#   function 1: 0, 5, 0, 0, 0x100000002, 0, 0, 7  -> sparse, the last
+#               counter is one of the nonzero ones
+#   function 2: 0, 0, 0, 0                        -> sparse, no pairs
+#   function 3: 1, 2                              -> full, sparse is larger
+SPARSE_WORDS = [
+    0x67636461, 0x4232342a, 0x12345678,
+    0x01000000, 0x00000003, 0x00000001, 0x11111111, 0x22222222,
+    0x01a10001, 0x0000000a, 0x00000008,
+    0x00000001, 0x00000005, 0x00000000,
+    0x00000004, 0x00000002, 0x00000001,
+    0x00000007, 0x00000007, 0x00000000,
+    0x01000000, 0x00000003, 0x00000002, 0x33333333, 0x44444444,
+    0x01a10001, 0x00000001, 0x00000004,
+    0x01000000, 0x00000003, 0x00000003, 0x55555555, 0x66666666,
+    0x01a10000, 0x00000004, 0x00000001, 0x00000000, 0x00000002, 0x00000000]
+
+FULL_WORDS = [
+    0x67636461, 0x4232342a, 0x12345678,
+    0x01000000, 0x00000003, 0x00000001, 0x11111111, 0x22222222,
+    0x01a10000, 0x00000010,
+    0x00000000, 0x00000000, 0x00000005, 0x00000000, 0x00000000, 0x00000000, 0x00000000, 0x00000000,
+    0x00000002, 0x00000001, 0x00000000, 0x00000000, 0x00000000, 0x00000000, 0x00000007, 0x00000000,
+    0x01000000, 0x00000003, 0x00000002, 0x33333333, 0x44444444,
+    0x01a10000, 0x00000008,
+    0x00000000, 0x00000000, 0x00000000, 0x00000000, 0x00000000, 0x00000000, 0x00000000, 0x00000000,
+    0x01000000, 0x00000003, 0x00000003, 0x55555555, 0x66666666,
+    0x01a10000, 0x00000004, 0x00000001, 0x00000000, 0x00000002, 0x00000000]
+
+
+def _pack(words, order='<'):
+    return struct.pack(f'{order}{len(words)}I', *words)
+
+
+@pytest.mark.parametrize('order', ['<', '>'])
+def test_sparse_dump_expands_to_the_full_dump(order):
+    sparse = _pack(SPARSE_WORDS, order)
+    assert SPARSE_WORDS[8] == GCOV_TAG_COUNTER_ARCS | GCOV_TAG_SPARSE_FLAG
+    assert expand_sparse_counters(sparse, 'x.gcda') == _pack(FULL_WORDS, order)
+
+
+def _objects(count=1):
+    rng = random.Random(3)
+    config = LogConfig(functions=8, blocks=10, zero_share=0.5)
+    return [make_object(rng, config, '/build', 'x.c', 7)[1] for _ in range(count)]
+
+
+def test_data_without_sparse_records_is_passed_through():
+    data = _pack(FULL_WORDS)
+    assert expand_sparse_counters(data, 'x.gcda') is data
+    data = _objects()[0]
+    assert expand_sparse_counters(data, 'x.gcda') is data
+
+
+def test_libgcov_data_is_left_alone():
+    with open(os.path.join(DATA_DIR, 'tiny.gcda'), 'rb') as gcda_file:
+        data = gcda_file.read()
+    assert expand_sparse_counters(data, 'tiny.gcda') is data
+
+
+def test_counter_index_past_the_count_is_a_format_error():
+    words = list(SPARSE_WORDS)
+    # The last pair of function 1 names counter 8 of 8
+    words[17] = 8
+    with pytest.raises(GcovFormatError, match='sparse counter'):
+        expand_sparse_counters(_pack(words), 'x.gcda')
+
+
+def test_cut_sparse_record_is_a_format_error():
+    with pytest.raises(GcovFormatError, match='bad sparse counter record'):
+        expand_sparse_counters(_pack(SPARSE_WORDS[:16]), 'x.gcda')
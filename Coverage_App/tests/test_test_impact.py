@@ -0,0 +1,83 @@
+from conftest import split_log
+from log_index import load_index
+from test_impact import build_test_map, dump_owners, select_tests
+
+
+def _per_test_log(directory):
+    # A log whose target dumped after every test, after every suite and
+    # once more at the end:
+    #   dump 0  before the first test, no owner
+    #   dump 1  Led.On          m0
+    #   dump 2  Led.Off         m1
+    #   dump 3  suite Led       m0, m1
+    #   dump 4  Timer.Tick      m1
+    #   dump 5  global teardown m0, goes to the last suite
+    log_path, head, objects, end = split_log(directory, objects=2)
+    start = [line for line in head if not line.startswith('[')]
+    m0, m1 = objects['m0.c.gcda'], objects['m1.c.gcda']
+    lines = (start + m0 + end
+             + ["[==========] Running 3 tests from 2 test suites.\n",
+                "[----------] Global test environment set-up.\n",
+                "[----------] 2 tests from Led\n",
+                "[ RUN      ] Led.On\n"] + m0 + end
+             + ["[       OK ] Led.On (1 ms)\n",
+                "[ RUN      ] Led.Off\n"] + m1 + end
+             + ["[       OK ] Led.Off (2 ms)\n",
+                "[----------] 2 tests from Led (3 ms total)\n"] + m0 + m1 + end
+             + ["\n",
+                "[----------] 1 test from Timer\n",
+                "[ RUN      ] Timer.Tick\n"] + m1 + end
+             + ["[       OK ] Timer.Tick (1 ms)\n",
+                "[----------] 1 test from Timer (1 ms total)\n",
+                "\n",
+                "[----------] Global test environment tear-down\n",
+                "[==========] 3 tests from 2 test suites ran. (4 ms total)\n",
+                "[  PASSED  ] 3 tests.\n"] + m0 + end)
+    with open(log_path, 'w') as log_file:
+        log_file.writelines(lines)
+    return log_path
+
+
+def _sources(sources):
+    return sorted(source.rsplit('/', 1)[-1] for source in sources)
+
+
+def test_dumps_belong_to_the_test_or_suite_before_them(tmp_path):
+    log_path = _per_test_log(tmp_path)
+    owners = dump_owners(log_path, load_index(log_path))
+    assert owners == {1: ('test', 'Led.On'), 2: ('test', 'Led.Off'), 3: ('suite', 'Led'),
+                      4: ('test', 'Timer.Tick'), 5: ('suite', 'Timer')}
+
+
+def test_map_holds_the_lines_each_owner_ran(tmp_path):
+    log_path = _per_test_log(tmp_path)
+    test_map, messages = build_test_map(log_path, jobs=2)
+    assert not messages
+    assert sorted(test_map['tests']) == ['Led.Off', 'Led.On', 'Timer.Tick']
+    assert sorted(test_map['suites']) == ['Led', 'Timer']
+    assert _sources(test_map['tests']['Led.On']) == ['m0.c']
+    assert _sources(test_map['tests']['Led.Off']) == ['m1.c']
+    assert _sources(test_map['suites']['Led']) == ['m0.c', 'm1.c']
+    assert _sources(test_map['suites']['Timer']) == ['m0.c']
+
+
+def test_changed_line_selects_the_tests_that_run_it(tmp_path):
+    log_path = _per_test_log(tmp_path)
+    test_map, _ = build_test_map(log_path)
+    [line, *_] = next(lines for source, lines in test_map['tests']['Led.Off'].items() if source.endswith('m1.c'))
+
+    selected, affected, untested = select_tests(test_map, [('src/m1.c', {line}), ('src/other.c', None)])
+    assert affected == [('suite', 'Led'), ('test', 'Led.Off'), ('test', 'Timer.Tick')]
+    # One run of the line is enough, the suite runs Led.Off with it
+    assert len(selected) == 1 and selected[0] in affected
+    assert untested == ['src/other.c']
+
+
+def test_smallest_set_covers_every_changed_line():
+    test_map = {'tests': {'A.One': {'/b/a.c': [1, 2]}, 'A.Two': {'/b/a.c': [2, 3]}, 'B.All': {'/b/a.c': [1, 2, 3]},
+                          'B.None': {'/b/c.c': [1]}},
+                'suites': {}}
+    selected, affected, untested = select_tests(test_map, [('a.c', {1, 2, 3})])
+    assert selected == [('test', 'B.All')]
+    assert affected == [('test', 'A.One'), ('test', 'A.Two'), ('test', 'B.All')]
+    assert untested == []
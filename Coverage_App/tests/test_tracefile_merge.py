@@ -0,0 +1,35 @@
+import os
+
+from conftest import DATA_DIR
+from tracefile_merge import merge_tracefiles
+
+# data/merge_a_b.info is `lcov -a merge_a.info -a merge_b.info` (lcov
+# 1.14): lines, functions and taken counts summed, '-' + n = n, and the
+# sources of either file kept.
+INPUTS = [os.path.join(DATA_DIR, 'merge_a.info'), os.path.join(DATA_DIR, 'merge_b.info')]
+
+
+def _records(text):
+    # {source: record lines}
+    records = {}
+    for record in text.split('end_of_record\n'):
+        if record.strip():
+            lines = record.splitlines()
+            records[next(line for line in lines if line.startswith('SF:'))] = lines
+    return records
+
+
+def test_merge_equals_lcov_add(tmp_path):
+    output = str(tmp_path / 'merged.info')
+    assert merge_tracefiles(INPUTS, output, patterns=None) == 3
+    with open(output) as merged, open(os.path.join(DATA_DIR, 'merge_a_b.info')) as expected:
+        assert merged.read() == expected.read()
+
+
+def test_merge_keeps_the_application_sources(tmp_path):
+    output = str(tmp_path / 'merged.info')
+    assert merge_tracefiles(INPUTS, output) == 2
+    with open(output) as merged, open(os.path.join(DATA_DIR, 'merge_a_b.info')) as expected:
+        kept = _records(merged.read())
+        assert kept == {source: lines for source, lines in _records(expected.read()).items()
+                        if '/Application/' in source}
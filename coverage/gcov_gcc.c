@@ -224,6 +224,9 @@ size_t gcov_convert_to_gcda(gcov_unsigned_t *buffer, struct gcov_info *gi_ptr)
 	unsigned int fi_idx;
 	unsigned int ct_idx;
 	unsigned int cv_idx;
+#ifdef GCOV_OPT_SPARSE_COUNTERS
+	unsigned int nonzero;
+#endif // GCOV_OPT_SPARSE_COUNTERS
 	size_t pos = 0; /* offset in buffer, in buffer data type units */
 
 	/* File header. */
@@ -255,6 +258,32 @@ size_t gcov_convert_to_gcda(gcov_unsigned_t *buffer, struct gcov_info *gi_ptr)
 				continue;
 			}
 
+#ifdef GCOV_OPT_SPARSE_COUNTERS
+			nonzero = 0;
+			for (cv_idx = 0; cv_idx < ci_ptr->num; cv_idx++) {
+				if (ci_ptr->values[cv_idx])
+					nonzero++;
+			}
+
+			if (GCOV_TAG_SPARSE_LENGTH(nonzero) < GCOV_TAG_COUNTER_LENGTH(ci_ptr->num)) {
+				/* Sparse counter record. */
+				pos += store_gcov_tag_length(buffer, pos,
+						      GCOV_TAG_FOR_COUNTER(ct_idx) | GCOV_TAG_SPARSE_FLAG,
+						      GCOV_TAG_SPARSE_LENGTH(nonzero));
+				pos += store_gcov_unsigned(buffer, pos, ci_ptr->num);
+
+				for (cv_idx = 0; cv_idx < ci_ptr->num; cv_idx++) {
+					if (!ci_ptr->values[cv_idx])
+						continue;
+					pos += store_gcov_unsigned(buffer, pos, cv_idx);
+					pos += store_gcov_counter(buffer, pos,
+							      ci_ptr->values[cv_idx]);
+				}
+				ci_ptr++;
+				continue;
+			}
+#endif // GCOV_OPT_SPARSE_COUNTERS
+
 			/* Counter record. */
 			pos += store_gcov_tag_length(buffer, pos,
 					      GCOV_TAG_FOR_COUNTER(ct_idx),
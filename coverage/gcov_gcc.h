@@ -86,6 +86,13 @@
 #define GCOV_TAG_COUNTER_LENGTH(NUM) ((NUM) * 2)
 #define GCOV_TAG_FOR_COUNTER(count) (GCOV_TAG_COUNTER_BASE + ((gcov_unsigned_t) (count) << 17))
 
+/* Our own creation, for GCOV_OPT_SPARSE_COUNTERS.
+ * The low 16 bits of every gcc tag are zero, so this bit marks a
+ * counter record sent as: number of counters, then index and
+ * 64-bit value of each nonzero counter. */
+#define GCOV_TAG_SPARSE_FLAG	((gcov_unsigned_t) 0x00000001)
+#define GCOV_TAG_SPARSE_LENGTH(NONZERO) (1 + (NONZERO) * 3)
+
 /* Interface to access gcov_info data  */
 /* Our own creation */
 const char *gcov_info_filename(struct gcov_info *info);
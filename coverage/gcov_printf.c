@@ -37,7 +37,11 @@
  * @return -1 if error, otherwise returns byte count written to UART
  */
 #include <stdio.h>
+#ifdef GCOV_OPT_BULK_WRITE_BYTES
+#define write_bytes(fd, buf, n) fwrite((buf), 1, (n), stdout)
+#else
 #define write_bytes(fd, buf, n) putchar((int)(*(buf)))
+#endif
 
 /***********************************************************************
  * The following functions support gcov_printf and are not meant to be
@@ -135,14 +139,23 @@ static void gcov_putchw(int n, char z, char* bf);
 static void gcov_putchw(int n, char z, char* bf)
 {
 	char fc=z? '0' : ' ';
-	char ch;
 	char* p=bf;
-	while (*p++ && n > 0)
+	while (*p && n > 0) {
+		p++;
 		n--;
+	}
+	while (*p)
+		p++;
 	while (n-- > 0)
 		write_bytes(1,&fc,1);
-	while ((ch= *bf++))
-		write_bytes(1,&ch,1);
+#ifdef GCOV_OPT_BULK_WRITE_BYTES
+	/* The whole string in one call, a base64 line is one UART write */
+	if (p != bf)
+		write_bytes(1,bf,(unsigned int)(p - bf));
+#else
+	while (bf != p)
+		write_bytes(1,bf++,1);
+#endif
 }
 
 
@@ -63,7 +63,7 @@ typedef unsigned int u32;
 	#include <stdlib.h>
 #endif
 
-#if defined(GCOV_OPT_PRINT_STATUS) || defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP)
+#if defined(GCOV_OPT_PRINT_STATUS) || defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP) || defined(GCOV_OPT_OUTPUT_SERIAL_BASE64)
 	/* Include any header files needed for serial port I/O */
 	/* Not always stdio.h for highly embedded systems */
 	#include <stdio.h>
@@ -97,6 +97,81 @@ static gcov_unsigned_t gcov_GcovIndex = 0;
 gcov_unsigned_t gcov_buf[8192];
 #endif // not GCOV_OPT_USE_MALLOC
 
+#if defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP) || defined(GCOV_OPT_OUTPUT_SERIAL_BASE64)
+/* ----------------------------------------------------------- */
+/*
+ * The serial outputs end each file with "CRC32 " and the CRC-32
+ * (as zlib computes it) of all its bytes.
+ */
+
+/* CRC-32 (IEEE 802.3, reflected) remainders of the 16 nibble values,
+ * a 64 byte table instead of the usual 1 kB one */
+static const u32 gcov_crc32_nibbles[16] =
+{
+	0x00000000u, 0x1DB71064u, 0x3B6E20C8u, 0x26D930ACu,
+	0x76DC4190u, 0x6B6B51F4u, 0x4DB26158u, 0x5005713Cu,
+	0xEDB88320u, 0xF00F9344u, 0xD6D6A3E8u, 0xCB61B38Cu,
+	0x9B64C2B0u, 0x86D3D2D4u, 0xA00AE278u, 0xBDBDF21Cu
+};
+
+static u32 gcov_crc32(const unsigned char* data, u32 length)
+{
+	u32 crc = 0xFFFFFFFFu;
+
+	for(u32 i = 0; i < length; i++)
+	{
+		crc ^= data[i];
+		crc = (crc >> 4) ^ gcov_crc32_nibbles[crc & 0x0F];
+		crc = (crc >> 4) ^ gcov_crc32_nibbles[crc & 0x0F];
+	}
+	return crc ^ 0xFFFFFFFFu;
+}
+#endif // GCOV_OPT_OUTPUT_SERIAL_HEXDUMP or GCOV_OPT_OUTPUT_SERIAL_BASE64
+
+#ifdef GCOV_OPT_OUTPUT_SERIAL_BASE64
+/* ----------------------------------------------------------- */
+/*
+ * Base64 output: each file is sent as lines of "~" followed by
+ * the base64 of up to GCOV_BASE64_LINE_BYTES data bytes, then
+ * the CRC-32 line.
+ * The "Emitting" line before and the filename line after are
+ * the same as for the hexdump.
+ */
+static const char gcov_base64_digits[] =
+	"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+
+static void gcov_print_base64(const unsigned char* data, u32 length)
+{
+	/* "~", the digits, newline and terminating null */
+	char line[1 + GCOV_BASE64_LINE_BYTES / 3 * 4 + 2];
+
+	for(u32 start = 0; start < length; start += GCOV_BASE64_LINE_BYTES)
+	{
+		u32 end = (length - start > GCOV_BASE64_LINE_BYTES) ? start + GCOV_BASE64_LINE_BYTES : length;
+		char* out = line;
+
+		*out++ = '~';
+		for(u32 i = start; i < end; i += 3)
+		{
+			u32 group = (u32)data[i] << 16;
+
+			if(i + 1 < end)
+				group |= (u32)data[i + 1] << 8;
+			if(i + 2 < end)
+				group |= (u32)data[i + 2];
+
+			*out++ = gcov_base64_digits[(group >> 18) & 0x3F];
+			*out++ = gcov_base64_digits[(group >> 12) & 0x3F];
+			*out++ = (i + 1 < end) ? gcov_base64_digits[(group >> 6) & 0x3F] : '=';
+			*out++ = (i + 2 < end) ? gcov_base64_digits[group & 0x3F] : '=';
+		}
+		*out++ = '\n';
+		*out = '\0';
+		GCOV_PRINT_STR(line);
+	}
+}
+#endif // GCOV_OPT_OUTPUT_SERIAL_BASE64
+
 /* ----------------------------------------------------------- */
 /*
  * __gcov_init is called by gcc-generated constructor code for each
@@ -220,10 +295,31 @@ void __gcov_call_constructors(void)
 
 /* ----------------------------------------------------------- */
 /*
- * __gcov_exit needs to be called in your code at the point
- * where you want to generate coverage data for extraction.
+ * True if filename is wanted, or ends with "/" and wanted,
+ * so that "foo.c.gcda" selects ".../CMakeFiles/x.dir/foo.c.gcda".
  */
-void __gcov_exit(void)
+static int gcov_name_matches(const char* filename, const char* wanted)
+{
+	const char* f = filename;
+	const char* w = wanted;
+
+	while(*f)
+		f++;
+	while(*w)
+		w++;
+	while(f > filename && w > wanted)
+	{
+		if(*--f != *--w)
+			return 0;
+	}
+	return (w == wanted) && (f == filename || *(f - 1) == '/');
+}
+
+/* ----------------------------------------------------------- */
+/*
+ * Dump the files whose name matches wanted, or all if wanted is NULL.
+ */
+static void gcov_dump(const char* wanted)
 {
 	GcovInfo* listptr = gcov_headGcov;
 
@@ -267,6 +363,12 @@ void __gcov_exit(void)
 			NULL; // Need buffer to be 32-bit-aligned for type-safe internal usage
 		u32 bytesNeeded;
 
+		if(wanted && !gcov_name_matches(gcov_info_filename(listptr->info), wanted))
+		{
+			listptr = listptr->next;
+			continue;
+		}
+
 		/* Do pretend conversion to see how many bytes are needed */
 		bytesNeeded = gcov_convert_to_gcda(NULL, listptr->info);
 
@@ -299,7 +401,7 @@ void __gcov_exit(void)
 		/* Do the real conversion into buffer */
 		gcov_convert_to_gcda(buffer, listptr->info);
 
-#if defined(GCOV_OPT_PRINT_STATUS) || defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP)
+#if defined(GCOV_OPT_PRINT_STATUS) || defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP) || defined(GCOV_OPT_OUTPUT_SERIAL_BASE64)
 		GCOV_PRINT_STR("Emitting ");
 		GCOV_PRINT_NUM(bytesNeeded);
 		GCOV_PRINT_STR(" bytes for ");
@@ -325,7 +427,7 @@ void __gcov_exit(void)
 		(void)GCOV_WRITE_BYTE(file, bf);
 		bf = (unsigned char)(bytesNeeded / 65536);
 		(void)GCOV_WRITE_BYTE(file, bf);
-		bf = (unsigned char)(bytesNeeded / 255);
+		bf = (unsigned char)(bytesNeeded / 256);
 		(void)GCOV_WRITE_BYTE(file, bf);
 		bf = (unsigned char)(bytesNeeded);
 		(void)GCOV_WRITE_BYTE(file, bf);
@@ -352,7 +454,7 @@ void __gcov_exit(void)
 		/* we don't know endianness, so use division for consistent MSB first */
 		gcov_output_buffer[gcov_output_index++] = (unsigned char)(bytesNeeded / 16777216);
 		gcov_output_buffer[gcov_output_index++] = (unsigned char)(bytesNeeded / 65536);
-		gcov_output_buffer[gcov_output_index++] = (unsigned char)(bytesNeeded / 255);
+		gcov_output_buffer[gcov_output_index++] = (unsigned char)(bytesNeeded / 256);
 		gcov_output_buffer[gcov_output_index++] = (unsigned char)(bytesNeeded);
 
 		/* copy the data */
@@ -375,10 +477,22 @@ void __gcov_exit(void)
 				GCOV_PRINT_STR("\n");
 		}
 		GCOV_PRINT_STR("\n");
+		GCOV_PRINT_STR("CRC32 ");
+		GCOV_PRINT_CRC32(gcov_crc32((unsigned char*)buffer, bytesNeeded));
+		GCOV_PRINT_STR("\n");
 		GCOV_PRINT_STR(gcov_info_filename(listptr->info));
 		GCOV_PRINT_STR("\n");
 #endif // GCOV_OPT_OUTPUT_SERIAL_HEXDUMP
 
+#ifdef GCOV_OPT_OUTPUT_SERIAL_BASE64
+		gcov_print_base64((unsigned char*)buffer, bytesNeeded);
+		GCOV_PRINT_STR("CRC32 ");
+		GCOV_PRINT_CRC32(gcov_crc32((unsigned char*)buffer, bytesNeeded));
+		GCOV_PRINT_STR("\n\n");
+		GCOV_PRINT_STR(gcov_info_filename(listptr->info));
+		GCOV_PRINT_STR("\n");
+#endif // GCOV_OPT_OUTPUT_SERIAL_BASE64
+
 		/* Other output methods might be imagined,
 		 * if you have flash that can be written directly,
 		 * or the luxury of a filesystem, etc.
@@ -427,12 +541,36 @@ void __gcov_exit(void)
 	gcov_output_buffer[gcov_output_index++] = '\0';
 #endif // GCOV_OPT_OUTPUT_BINARY_MEMORY
 
-#if defined(GCOV_OPT_PRINT_STATUS) || defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP)
+#if defined(GCOV_OPT_PRINT_STATUS) || defined(GCOV_OPT_OUTPUT_SERIAL_HEXDUMP) || defined(GCOV_OPT_OUTPUT_SERIAL_BASE64)
 	GCOV_PRINT_STR("Gcov End");
 	GCOV_PRINT_STR("\n");
 #endif
 }
 
+/* ----------------------------------------------------------- */
+/*
+ * __gcov_exit needs to be called in your code at the point
+ * where you want to generate coverage data for extraction.
+ */
+void __gcov_exit(void)
+{
+	gcov_dump(NULL);
+}
+
+/* ----------------------------------------------------------- */
+#ifdef GCOV_OPT_PROVIDE_REDUMP
+/*
+ * __gcov_dump_file dumps one file again, in the same format as
+ * __gcov_exit, for example from the debugger:
+ *   call __gcov_dump_file("foo.c.gcda")
+ * The name is the full path or its last part(s).
+ */
+void __gcov_dump_file(const char* filename)
+{
+	gcov_dump(filename);
+}
+#endif // GCOV_OPT_PROVIDE_REDUMP
+
 /* ----------------------------------------------------------- */
 #ifdef GCOV_OPT_PROVIDE_CLEAR_COUNTERS
 /*